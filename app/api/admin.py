@@ -4,8 +4,8 @@ import traceback
 from fastapi import APIRouter, Depends, Response, Request
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import or_, and_, desc
-from sqlalchemy.orm import Session
-from app.db.utils import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.utils import get_read_db
 from app.schemas.auth import Token
 from app.utils.string_utils import check_uuid4
 from app.api.utility.exc import (
@@ -14,6 +14,7 @@ from app.api.utility.exc import (
 )
 from app.api.utility.user import (
     get_active_admin_user,
+    get_active_admin_read_user,
 )
 from app.schemas.lobbyist.review_new_lobbyist import (
     ReviewNewLobbyist
@@ -29,9 +30,9 @@ from app.models.users import User
 from app.models.entities import (
     LOBBYIST_TYPES
 )
-from app.models.crud.filer import (
-    get_all_filer_ids_by_start_of_last_name
-)
+from app.core.config import TYPEAHEAD_LIMIT
+from app.utils.typeahead import search_typeahead
+from app.utils.disk_cache import document_cache
 
 router = APIRouter()
 
@@ -41,24 +42,19 @@ logger = logging.getLogger("general")
 @router.get("/filer-search")
 async def filer_search(
     search_str: str,
-    user: User = Depends(get_active_admin_user),
-    db_session: Session = Depends(get_db),
+    limit: int = TYPEAHEAD_LIMIT,
+    user: User = Depends(get_active_admin_read_user),
+    db_session: AsyncSession = Depends(get_read_db),
 ):
 
-    # ultimate:
-    # last name,
-    # org name
-    # org id
-    # filer id
-
+    # filer names, lobbying entity names, human readable ids and
+    # e-filing ids, by prefix
     try:
 
         data = []
         if len(search_str) > 1:
-        
-            # this is preliminary
-            data = await get_all_filer_ids_by_start_of_last_name(
-                db_session, search_str
+            data = await search_typeahead(
+                db_session, search_str, min(max(limit, 1), 50)
             )
 
         return {"success": True, "data": data}
@@ -67,6 +63,14 @@ async def filer_search(
         logger.exception(traceback.format_exc())
         handle_exc(e)
 
+
+@router.get("/document-cache")
+async def document_cache_stats(
+    user: User = Depends(get_active_admin_user),
+):
+    # this worker's document cache: size, hits, misses, evictions
+    return {"success": True, "data": document_cache.stats()}
+
     
 
 
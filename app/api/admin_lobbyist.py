@@ -4,8 +4,8 @@ import traceback
 from fastapi import APIRouter, Depends, Response, Request
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import or_, and_, desc
-from sqlalchemy.orm import Session
-from app.db.utils import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.utils import get_db, get_read_db
 from app.schemas.auth import Token
 from app.utils.string_utils import check_uuid4
 from app.api.utility.exc import (
@@ -14,6 +14,7 @@ from app.api.utility.exc import (
 )
 from app.api.utility.user import (
     get_active_admin_user,
+    get_active_admin_read_user,
 )
 from app.schemas.lobbyist.review_new_lobbyist import (
     ReviewNewLobbyist
@@ -40,8 +41,8 @@ logger = logging.getLogger("fastapi")
 @router.get("/{lobbying_entity_id}")
 async def get_lobbyist(
     lobbying_entity_id: str,
-    user: User = Depends(get_active_admin_user),
-    db_session: Session = Depends(get_db),
+    user: User = Depends(get_active_admin_read_user),
+    db_session: AsyncSession = Depends(get_read_db),
 ):
 
     # check that we got a UUID
@@ -88,7 +89,7 @@ async def get_lobbyist(
 async def lobbyist_resend_confirm_email(
     lobbying_entity_id: str,
     user: User = Depends(get_active_admin_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     pass
@@ -98,7 +99,7 @@ async def lobbyist_resend_confirm_email(
 async def lobbyist_welcome_confirm_email(
     lobbying_entity_id: str,
     user: User = Depends(get_active_admin_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     pass
@@ -109,7 +110,7 @@ async def post_review_new_lobbyist(
     lobbying_entity_id: str,
     body: ReviewNewLobbyist,
     user: User = Depends(get_active_admin_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
@@ -133,7 +134,7 @@ async def post_update_lobbyist(
     lobbying_entity_id: str,
     body: UpdateLobbyingEntity,
     user: User = Depends(get_active_admin_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
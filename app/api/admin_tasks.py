@@ -4,8 +4,8 @@ import traceback
 from fastapi import APIRouter, Depends, Response, Request
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import or_, and_, desc
-from sqlalchemy.orm import Session
-from app.db.utils import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.utils import get_read_db
 from app.schemas.auth import Token
 from app.api.utility.exc import (
     handle_exc,
@@ -13,7 +13,7 @@ from app.api.utility.exc import (
 )
 
 from app.api.utility.user import (
-    get_active_admin_user,
+    get_active_admin_read_user,
 )
 from app.models.users import User
 from app.models.crud.tasks import (
@@ -27,8 +27,8 @@ logger = logging.getLogger("fastapi")
 
 @router.get("/open")
 async def get_open_tasks(
-    user: User = Depends(get_active_admin_user),
-    db_session: Session = Depends(get_db),
+    user: User = Depends(get_active_admin_read_user),
+    db_session: AsyncSession = Depends(get_read_db),
 ):
 
     try:
@@ -9,7 +9,7 @@ from fastapi import (
 )
 from starlette.responses import RedirectResponse, PlainTextResponse
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi_jwt_auth import AuthJWT
 from fastapi_jwt_auth.exceptions import AuthJWTException
 from app.core.config import (
@@ -51,13 +51,9 @@ from app.api.utility.exc import (
     CREDENTIALS_EXCEPTION,
     AccountException
 )
-from saml2 import (
-    BINDING_HTTP_POST,
-    BINDING_HTTP_REDIRECT,
-    entity,
-)
 from app.utils.auth_saml import (
-    saml_client
+    saml_client,
+    BINDING_HTTP_POST
 )
 
 router = APIRouter()
@@ -73,7 +69,7 @@ def get_config():
 @router.get("/me")
 async def read_users_me(
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
@@ -92,12 +88,12 @@ async def admin_login(
     request: Request,
     form: Login,
     Authorize: AuthJWT = Depends(),
-    db_session: Session = Depends(get_db)
+    db_session: AsyncSession = Depends(get_db)
 ):
     
     try:
         admin_logger.info(f"Admin login attempt: {form.username}")
-        user = authenticate_admin_user(db_session, form.username, form.password)
+        user = await authenticate_admin_user(db_session, form.username, form.password)
         if user is None or not user:
             raise CREDENTIALS_EXCEPTION
         access_token = Authorize.create_access_token(
@@ -123,12 +119,12 @@ async def filer_login(
     request: Request,
     form: Login,
     Authorize: AuthJWT = Depends(),
-    db_session: Session = Depends(get_db)
+    db_session: AsyncSession = Depends(get_db)
 ):
     
     try:
         user_logger.info(f"Login attempt: {form.username}")
-        user = authenticate_filer_user(db_session, form.username, form.password)
+        user = await authenticate_filer_user(db_session, form.username, form.password)
         if user is None or not user:
             raise CREDENTIALS_EXCEPTION
         access_token = Authorize.create_access_token(
@@ -180,7 +176,7 @@ async def saml_idp_initiated(
     request: Request,
     response: Response,
     Authorize: AuthJWT = Depends(),
-    db_session: Session = Depends(get_db)
+    db_session: AsyncSession = Depends(get_db)
 ):
 
     try:
@@ -189,13 +185,13 @@ async def saml_idp_initiated(
         
         authn_response = saml_c.parse_authn_request_response(
             res['SAMLResponse'],
-            entity.BINDING_HTTP_POST)
+            BINDING_HTTP_POST)
         authn_response.get_identity()
         user_info = authn_response.get_subject()
         username = user_info.text
 
         admin_logger.info(f"Admin SAML login attempt: {username}")
-        user = saml_verify_admin_user(db_session, username)
+        user = await saml_verify_admin_user(db_session, username)
         if user is None or not user:
             raise Exception("User unknown or not a City user.")
 
@@ -275,7 +271,7 @@ async def refresh(
 @router.post('/set-password', operation_id="noauth")
 async def set_reset_password(
     payload: UserResetPassword,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
@@ -290,7 +286,7 @@ async def set_reset_password(
 @router.post('/reset-password-request', operation_id="noauth")
 async def reset_password_request(
     payload: ResetPasswordRequest,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
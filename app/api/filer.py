@@ -4,7 +4,7 @@ import traceback
 from fastapi import APIRouter, Depends, Response, Request
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import or_, and_, desc
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import ENFORCE_RECAPTCHA
 from app.db.utils import get_db
 from app.utils.date_utils import (
@@ -12,7 +12,8 @@ from app.utils.date_utils import (
     is_valid_date
 )
 from app.core.config import (
-    FRONTEND_ROUTES
+    FRONTEND_ROUTES,
+    S3_PRIVATE_BUCKET
 )
 from app.schemas.filer.filer import (
     FilerContactInfoSchema
@@ -46,6 +47,17 @@ from app.api.utility.exc import (
 from app.api.utility.user import (
     get_active_user
 )
+from app.api.utility.search import (
+    invalidate_public_caches
+)
+from app.api.utility.uploads import (
+    UPLOAD_DOC_TYPES,
+    receive_upload
+)
+from app.models.crud.documents import (
+    upsert_document
+)
+from app.utils.aws import AwsS3
 
 router = APIRouter()
 
@@ -55,7 +67,7 @@ logger = logging.getLogger("fastapi")
 @router.get("/info")
 async def filer_info(
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db)
+    db_session: AsyncSession = Depends(get_db)
 ):
 
     try:
@@ -149,7 +161,7 @@ async def filer_info(
 async def filer_info(
     payload: FilerContactInfoSchema,
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db)
+    db_session: AsyncSession = Depends(get_db)
 ):        
 
     try:
@@ -179,12 +191,17 @@ async def filer_info(
         if payload.effective_date is None or not is_valid_date(payload.effective_date):
             payload.effective_date = today()
         
+        # the public index shows first and last name, nothing else of it
+        renamed = (user.first_name, user.last_name) != (payload.first_name, payload.last_name)
+
         res = await update_filer_contact_info(db_session, filer, payload)
         if res:
             user.first_name = payload.first_name
             user.last_name = payload.last_name
             user.middle_name = payload.middle_name
-            db_session.commit()
+            await db_session.commit()
+            if renamed:
+                await invalidate_public_caches(filer_ids=[filer.filer_id])
         
         return {"success": res}
         
@@ -198,3 +215,66 @@ async def filer_info(
         
     
     return None
+
+
+@router.post("/document")
+async def upload_document(
+    request: Request,
+    doc_type: str = "filer upload",
+    filename: str = None,
+    user: User = Depends(get_active_user),
+    db_session: AsyncSession = Depends(get_db),
+):
+    # the body is the file (Content-Type its type, ?filename=) or
+    # multipart/form-data with a file part. It goes to storage as it
+    # arrives, never whole in memory or on disk.
+    try:
+        # user must be filer
+        if user.account_type != 'filer':
+            raise AccountPermissionException()
+
+        filer = await get_filer_by_user_id(db_session, user.id)
+        if filer is None:
+            raise AccountPermissionException()
+
+        if doc_type not in UPLOAD_DOC_TYPES:
+            raise Http400("Document type must be one of: " + ", ".join(UPLOAD_DOC_TYPES) + ".")
+
+        # don't hold a connection while the body streams
+        await db_session.commit()
+
+        s3 = AwsS3()
+        doc_id = uuid.uuid4().hex
+        key = f"uploads/{user.id}/{doc_id}"
+
+        sink, filename = await receive_upload(
+            request.stream(),
+            request.headers.get("content-type"),
+            request.headers.get("content-length"),
+            lambda mime_type: s3.open_multipart(
+                S3_PRIVATE_BUCKET, key, mime_type, {"uploader_user_id": user.id}),
+            filename=filename,
+        )
+
+        await upsert_document(
+            db_session, doc_id, doc_type=doc_type, mime_type=sink.mime_type,
+            size_bytes=sink.size, filename=filename, s3bucket=S3_PRIVATE_BUCKET,
+            s3key=key, sha256=sink.sha256.hexdigest(), public=False,
+            uploader_user_id=user.id)
+        await db_session.commit()
+
+        return {"success": True, "data": {
+            "doc_id": doc_id,
+            "filename": filename,
+            "mime_type": sink.mime_type,
+            "size_bytes": sink.size,
+            "sha256": sink.sha256.hexdigest(),
+        }}
+
+    except AccountPermissionException as e:
+        # we don't log this
+        raise
+
+    except Exception as e:
+        logger.exception(traceback.format_exc())
+        handle_exc(e)
@@ -4,7 +4,7 @@ import uuid
 from fastapi import APIRouter, Depends, Response, Request
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import or_, and_, desc
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import ENFORCE_RECAPTCHA
 from app.db.utils import get_db
 from app.schemas.auth import Token
@@ -59,6 +59,9 @@ from app.api.utility.lobbyist import (
     calculate_filing_fees,
     finalize_lobbyist_filing
 )
+from app.models.crud.documents import (
+    get_latest_render_job
+)
 
 
 router = APIRouter()
@@ -69,7 +72,7 @@ logger = logging.getLogger("fastapi")
 async def register_lobbyist_confirm_email(
     req: Request,
     token: Token,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
     try:
         res = await register_lobbyist_check_email_confirm(db_session, token)
@@ -85,7 +88,7 @@ async def register_lobbyist_confirm_email(
 async def register_lobbyist(
     req: Request,
     form: NewLobbyistRegistration,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
     try:
         xd = await req.json()
@@ -108,7 +111,7 @@ async def create_filing(
     filing_type: str,
     payload: NewLobbyistFiling,
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
@@ -175,7 +178,7 @@ async def get_filing(
     filing_type: str,
     filing_id: str,
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
@@ -236,7 +239,7 @@ async def put_filing(
     filing_id: str,
     payload: UpdateFilingInProgress,
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
@@ -277,6 +280,7 @@ async def put_filing(
             raise Http400(detail="Filing doesn't match filing type.")
 
         await update_filing_in_progress(db_session, filing, payload)
+        await db_session.commit()
 
         return { "success": True }
 
@@ -298,7 +302,7 @@ async def get_filing_fees(
     filing_type: str,
     filing_id: str,
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
@@ -343,7 +347,7 @@ async def finalize_filing(
     filing_id: str,
     payload: UpdateFilingInProgress,
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
 ):
 
     try:
@@ -383,11 +387,56 @@ async def finalize_filing(
         handle_exc(e)
         
 
+@router.get("/filing/{filing_type}/{filing_id}/render-status")
+async def get_filing_render_status(
+    filing_type: str,
+    filing_id: str,
+    user: User = Depends(get_active_user),
+    db_session: AsyncSession = Depends(get_db),
+):
+    # whether the pdfs of a finalized filing are ready: queued,
+    # rendering (retries go back to queued), done or failed
+    try:
+        if not is_uuid(filing_id):
+            raise Http400("Filing ID must be UUID")
+
+        # user must be filer
+        if user.account_type != 'filer':
+            raise AccountPermissionException()
+
+        filing = await get_filing_by_id(db_session, filing_id)
+        if filing is None:
+            raise Http400(detail="Filing not found")
+
+        # user must be associated with this lobbying entity id
+        entity = await get_lobbying_entity_by_id(db_session, filing.entity_id)
+        if entity is None:
+            raise EntityNotFoundException()
+
+        filer = await get_lobbyist_filer_user(db_session, entity, user)
+        if filer is None:
+            raise AccountPermissionException()
+
+        job = await get_latest_render_job(db_session, filing_id)
+        data = {
+            "status": job.status if job else None,
+            "attempts": job.attempts if job else 0,
+            "updated": job.updated if job else None,
+            "doc_public": filing.doc_public,
+        }
+
+        return {"success": True, "data": jsonable_encoder(data)}
+
+    except Exception as e:
+        logger.exception(traceback.format_exc())
+        handle_exc(e)
+
+
 @router.get("/entity/{lobbying_entity_id}")
 async def get_lobbying_entity_info(
     lobbying_entity_id: str,
     user: User = Depends(get_active_user),
-    db_session: Session = Depends(get_db)
+    db_session: AsyncSession = Depends(get_db)
 ):
 
     try:
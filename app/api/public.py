@@ -1,24 +1,25 @@
 import logging
-from typing import Optional
+from typing import Optional, List
 import traceback
-from fastapi import APIRouter, Depends, Response, Request
+from fastapi import APIRouter, Depends, Response, Request, Query
+from fastapi.responses import StreamingResponse
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
-from app.db.utils import get_db
-from app.models.crud.filings import (
-    get_filing_by_public_doc,
-    get_lobbyist_filing_by_public_doc,
-    get_filing_by_id,
-)
-from app.models.filings import FILING_TYPE_MAPPING, FILING_TYPE_DESCRIPTION
-from app.api.utility.misc import generate_doc_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.utils import get_read_db
+from app.core.config import DOCUMENT_URL_BATCH_LIMIT
+from app.models.crud.documents import get_public_doc_id_by_filing_id
 from app.api.utility.search import (
-    get_all_filings,
-    get_all_lobbyist_filings,
-    convert_amend_ids_to_efile_ids,
-    get_filing_url_by_public_doc_id,
+    EXPORT_FORMATS,
+    search_public_filings,
+    export_public_filings,
     get_metadata,
 )
+from app.api.utility.documents import (
+    resolve_document_urls,
+    document_url_response,
+    resolve_document_location,
+    document_content_response,
+)
 
 from app.api.utility.exc import (
     handle_exc,
@@ -37,45 +38,59 @@ async def search(
     query: str,
     start_date: str = None,
     end_date: str = None,
-    db_session: Session = Depends(get_db),
+    sort: str = "-filing_date",
+    limit: int = None,
+    cursor: str = None,
+    fuzzy: bool = False,
+    phonetic: bool = False,
+    lineage: bool = False,
+    db_session: AsyncSession = Depends(get_read_db),
 ):
     try:
         if query is None:
             raise Http400("Search cannot be empty.")
 
-        # get filers that match query by last name
-        filings = await get_all_filings(db_session, query, start_date, end_date)
-        lobbyist_filings = await get_all_lobbyist_filings(
-            db_session, query, start_date, end_date
+        # filers and lobbying entities matching the query, one page of
+        # their filings, decorated, in one query. Pass next_cursor back
+        # as cursor for the next page. fuzzy=true tolerates misspelled
+        # names, phonetic=true (with fuzzy) also matches by sound.
+        # lineage=true adds the filings each filing amends.
+        page = await search_public_filings(
+            db_session, query, start_date, end_date,
+            sort=sort, limit=limit, cursor=cursor,
+            fuzzy=fuzzy, phonetic=phonetic, lineage=lineage,
         )
 
-        if len(filings) == 0 and len(lobbyist_filings) == 0:
-            return {"success": "true", "data": []}
-
-        for filing in filings:
-            filing["description"] = (
-                FILING_TYPE_DESCRIPTION[filing["filing_type"]]
-                + "; "
-                + filing["filing_subtype"]
-            )
-            filing["filing_type"] = FILING_TYPE_MAPPING[filing["filing_type"]]
-            if filing["doc_public"] == None:
-                # filing not electronically filed
-                filing["filing_type"] += "; Not electronically filed."
-            filing["filer"] = filing["last_name"] + ", " + filing["first_name"]
+        return {"success": "true", **page}
 
-        for lobbyist in lobbyist_filings:
-            lobbyist["description"] = FILING_TYPE_DESCRIPTION[lobbyist["filing_type"]]
-            lobbyist["filing_type"] = FILING_TYPE_MAPPING[lobbyist["filing_type"]]
-            if lobbyist["doc_public"] == None:
-                # filing not electronically filed
-                lobbyist["filing_type"] += "; Not electronically filed."
-
-        filings.extend(lobbyist_filings)
+    except Exception as e:
+        logger.exception(traceback.format_exc())
+        handle_exc(e)
 
-        await convert_amend_ids_to_efile_ids(db_session, filings)
 
-        return {"success": "true", "data": filings}
+@router.get("/search/export")
+async def search_export(
+    query: str,
+    start_date: str = None,
+    end_date: str = None,
+    format: str = "ndjson",
+    fuzzy: bool = False,
+    phonetic: bool = False,
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    # everything /search finds, streamed, for bulk downloads
+    try:
+        if format not in EXPORT_FORMATS:
+            raise Http400("Format must be one of: " + ", ".join(EXPORT_FORMATS) + ".")
+
+        return StreamingResponse(
+            export_public_filings(db_session, query, start_date, end_date,
+                                  format, fuzzy, phonetic),
+            media_type=EXPORT_FORMATS[format],
+            headers={
+                "Content-Disposition": f'attachment; filename="efile-search.{format}"'
+            },
+        )
 
     except Exception as e:
         logger.exception(traceback.format_exc())
@@ -84,39 +99,73 @@ async def search(
 
 @router.get("/document")
 async def get_document(
+    request: Request,
     doc_id: str = None,
     filing_id: str = None,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_read_db),
 ):
     try:
         if doc_id is None and filing_id is None:
             raise Http400("A document id or filing id must be provided.")
 
-        if doc_id is not None:
-            url = await get_filing_url_by_public_doc_id(db_session, doc_id)
-
-            if url is None:
+        if doc_id is None:
+            doc_id = await get_public_doc_id_by_filing_id(db_session, filing_id)
+            if doc_id is None:
                 raise Http404("Filing document was not found.")
 
-            return {"success": "true", "data": {"url": url}}
+        # a presigned url, good for at least DOCUMENT_URL_REFRESH_MARGIN
+        # seconds, cacheable until then
+        resolved = (await resolve_document_urls(db_session, [doc_id]))[doc_id]
+        if resolved is None:
+            raise Http404("Filing document was not found.")
 
-        else:
+        return document_url_response(
+            request, {"success": "true", "data": resolved}, resolved["expires"])
 
-            original_filing = await get_filing_by_id(db_session, filing_id)
+    except Exception as e:
+        logger.exception(traceback.format_exc())
+        handle_exc(e)
 
-            original_filing_json = jsonable_encoder(original_filing)
 
-            if len(original_filing_json) == 0:
-                raise Http404("Filing document was not found.")
+@router.get("/documents")
+async def get_documents(
+    request: Request,
+    doc_id: List[str] = Query(...),
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    # /document for many: ?doc_id=a&doc_id=b, null for the ones not found
+    try:
+        if len(doc_id) > DOCUMENT_URL_BATCH_LIMIT:
+            raise Http400(f"At most {DOCUMENT_URL_BATCH_LIMIT} documents at a time.")
 
-            doc_id = original_filing_json["doc_public"]
+        resolved = await resolve_document_urls(db_session, doc_id)
+        expires = min((r["expires"] for r in resolved.values() if r), default=None)
 
-            url = await get_filing_url_by_public_doc_id(db_session, doc_id)
+        return document_url_response(
+            request, {"success": "true", "data": resolved}, expires)
 
-            if url is None:
-                raise Http404("Filing document was not found.")
+    except Exception as e:
+        logger.exception(traceback.format_exc())
+        handle_exc(e)
 
-            return {"success": "true", "data": {"url": url}}
+
+@router.get("/document/{doc_id}/content")
+async def get_document_content(
+    doc_id: str,
+    request: Request,
+    db_session: AsyncSession = Depends(get_read_db),
+):
+    # the document itself, for clients that can't follow the url from
+    # /document. Range requests get 206 and just those bytes.
+    try:
+        location = await resolve_document_location(db_session, doc_id)
+        if location is None:
+            raise Http404("Filing document was not found.")
+
+        # don't hold a connection while the body streams
+        await db_session.close()
+
+        return await document_content_response(request, *location)
 
     except Exception as e:
         logger.exception(traceback.format_exc())
@@ -127,7 +176,7 @@ async def get_document(
 async def get_document_metadata(
     doc_id: str = None,
     filing_id: str = None,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_read_db),
 ):
 
     try:
@@ -140,18 +189,10 @@ async def get_document_metadata(
             return {"success": "true", "data": metadata}
 
         else:
-            # need to make this into its own function
-            original_filing = await get_filing_by_id(db_session, filing_id)
-
-            original_filing_json = jsonable_encoder(original_filing)
-
-            if len(original_filing_json) == 0:
+            doc_id = await get_public_doc_id_by_filing_id(db_session, filing_id)
+            if doc_id is None:
                 raise Http404("Filing document was not found.")
 
-            doc_id = original_filing_json["doc_public"]
-
-            # up to here
-
             metadata = await get_metadata(db_session, doc_id)
 
             return {"success": "true", "data": metadata}
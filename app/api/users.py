@@ -3,7 +3,7 @@ import logging
 from fastapi import APIRouter, Depends, Response
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import or_, and_, desc
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.utils import get_db
 from app.models.users import User
 from app.models.messages import Message
@@ -0,0 +1,359 @@
+import os
+import re
+import time
+import json
+import asyncio
+import hashlib
+import logging
+import traceback
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import (
+    S3_PUBLIC_BUCKET,
+    CACHE_MAX_ENTRIES,
+    DOCUMENT_URL_TTL,
+    DOCUMENT_URL_REFRESH_MARGIN,
+    DOCUMENT_STREAM_CHUNK_SIZE,
+)
+from app.models.crud.documents import get_public_documents
+from app.utils.aws import AwsS3, s3_executor
+from app.utils.disk_cache import document_cache
+from app.api.utility.exc import Http404
+
+
+logger = logging.getLogger("fastapi")
+
+
+def document_key(filing_type, doc_id):
+    # where filings without a document row keep their pdf
+    if filing_type in ["fppc801", "fppc802", "fppc803", "fppc806"]:
+        return "ser800/" + doc_id + ".pdf"
+    elif filing_type in ["fppc700"]:
+        return "sei/fppc700/" + doc_id + ".pdf"
+    elif filing_type in [
+        "ec601",
+        "ec602",
+        "ec603",
+        "ec604",
+        "ec605",
+    ]:
+        return "lobbyist/" + filing_type + "/" + doc_id + ".pdf"
+
+
+def document_location(row):
+    if row.s3bucket and row.s3key:
+        return row.s3bucket, row.s3key
+
+    key = document_key(row.filing_type, row.doc_id)
+    if key is None:
+        return None
+    return S3_PUBLIC_BUCKET, key
+
+
+def sign_with_s3(bucket, key, expires_in):
+    from app.utils.aws import AwsS3
+    return AwsS3().presigned_url(bucket, key, expires_in)
+
+
+class PresignedUrlCache:
+    """Presigned GET urls per (bucket, key), per worker.
+
+    A url is reused until margin seconds before it expires, so repeat
+    requests get the same url and browsers / the CDN can cache the
+    document behind it, and a url handed out always has at least margin
+    seconds left.
+    """
+
+    def __init__(self, ttl=DOCUMENT_URL_TTL, margin=DOCUMENT_URL_REFRESH_MARGIN,
+                 max_entries=CACHE_MAX_ENTRIES, sign=sign_with_s3):
+        self.ttl = ttl
+        self.margin = margin
+        self.max_entries = max_entries
+        self.sign = sign
+        self.entries = OrderedDict()
+
+    def get(self, bucket, key, now=None):
+        """(url, expires), expires in epoch seconds."""
+        now = time.time() if now is None else now
+
+        entry = self.entries.get((bucket, key))
+        if entry is None or entry[1] - self.margin <= now:
+            entry = (self.sign(bucket, key, self.ttl), now + self.ttl)
+            self.entries[(bucket, key)] = entry
+        self.entries.move_to_end((bucket, key))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+        return entry
+
+
+presigned_urls = PresignedUrlCache()
+
+
+async def resolve_document_urls(db_session: AsyncSession, doc_ids: list,
+                                urls=None) -> dict:
+    """doc_id -> {"url", "expires"} for each of doc_ids, None for the ones
+    that are not public (or not known)."""
+    urls = urls or presigned_urls
+
+    resolved = {doc_id: None for doc_id in doc_ids}
+    for row in await get_public_documents(db_session, list(resolved)):
+        location = document_location(row)
+        if location is None:
+            continue
+        url, expires = urls.get(*location)
+        resolved[row.doc_id] = {"url": url, "expires": int(expires)}
+
+    return resolved
+
+
+def document_url_response(request: Request, content: dict, expires, margin=None):
+    """content with the headers that let a CDN answer repeat requests:
+    cacheable while the urls in it stay good, an ETag to revalidate."""
+    margin = DOCUMENT_URL_REFRESH_MARGIN if margin is None else margin
+
+    body = json.dumps(content, sort_keys=True)
+    etag = '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+    max_age = max(0, int(expires - margin - time.time())) if expires else 0
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content, headers=headers)
+
+
+async def resolve_document_location(db_session: AsyncSession, doc_id: str):
+    """(bucket, key) of a public document, None if there is none."""
+    rows = await get_public_documents(db_session, [doc_id])
+    if not rows:
+        return None
+    return document_location(rows[0])
+
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def single_range(header):
+    """header if it is one byte range, None otherwise: several ranges
+    and ranges we don't understand get the whole document, which is
+    what a server that ignores Range does."""
+    m = RANGE_RE.match((header or "").strip())
+    if m is None:
+        return None
+    first, last = m.groups()
+    if not first and not last:
+        return None
+    if first and last and int(last) < int(first):
+        return None
+    return header.strip()
+
+
+def parse_range(header, size):
+    """(start, end), end inclusive, of a single range header against an
+    object of size bytes, None for the whole object."""
+    header = single_range(header)
+    if header is None:
+        return None
+
+    first, last = RANGE_RE.match(header).groups()
+    if not first:
+        # the last n bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - int(last)), size - 1
+
+    start = int(first)
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def range_not_satisfiable(size=None):
+    headers = {"Content-Range": f"bytes */{size}"} if size is not None else {}
+    return Response(status_code=416, headers=headers)
+
+
+def content_headers(size, byte_range=None):
+    headers = {"Accept-Ranges": "bytes"}
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+    else:
+        start, end = byte_range
+        headers["Content-Length"] = str(end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return headers
+
+
+class FileRangeResponse(Response):
+    """byte_range of an open file, or all of it. The file is sent with
+    the ASGI zero copy extension (sendfile) where the server has it,
+    otherwise read in chunks off the event loop. Closes fd."""
+
+    def __init__(self, fd, size, byte_range=None, media_type="application/pdf",
+                 chunk_size=DOCUMENT_STREAM_CHUNK_SIZE):
+        self.fd = fd
+        self.start, self.end = byte_range or (0, size - 1)
+        self.chunk_size = chunk_size
+        self.status_code = 200 if byte_range is None else 206
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(content_headers(size, byte_range))
+
+    async def __call__(self, scope, receive, send):
+        file = os.fdopen(self.fd, "rb")
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+
+            count = self.end - self.start + 1
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+                return
+
+            loop = asyncio.get_event_loop()
+            offset = self.start
+            while count > 0:
+                chunk = await loop.run_in_executor(
+                    None, os.pread, self.fd, min(self.chunk_size, count), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk,
+                            "more_body": count > 0})
+            if count > 0:
+                # the file was shorter than it said, end the response
+                await send({"type": "http.response.body", "body": b"",
+                            "more_body": False})
+        finally:
+            file.close()
+
+
+def object_size(obj):
+    # "bytes 0-1023/4096" for a range, else the whole length
+    content_range = obj.get("ContentRange")
+    if content_range:
+        return int(content_range.rsplit("/", 1)[1])
+    return obj["ContentLength"]
+
+
+async def stream_object(obj, writer=None, chunk_size=DOCUMENT_STREAM_CHUNK_SIZE):
+    """The body of a get_object response, chunk by chunk as it arrives,
+    also into writer (committed once complete) if given."""
+    body = obj["Body"]
+    loop = asyncio.get_event_loop()
+
+    def read():
+        chunk = body.read(chunk_size)
+        if chunk and writer is not None:
+            writer.write(chunk)
+        return chunk
+
+    try:
+        while True:
+            chunk = await loop.run_in_executor(s3_executor(), read)
+            if not chunk:
+                break
+            yield chunk
+
+        if writer is not None:
+            writer.commit()
+            writer = None
+    finally:
+        if writer is not None:
+            writer.abort()
+        body.close()
+
+
+# cache keys with a fill running, per worker
+_filling = set()
+
+
+def schedule_fill(s3, bucket, key, size, cache):
+    # a range request missed: get the whole document in the background,
+    # the viewer's next ranges will come from disk
+    cache_key = bucket + "/" + key
+    if cache_key in _filling:
+        return
+    writer = cache.writer(cache_key, size)
+    if writer is None:
+        return
+
+    async def fill():
+        try:
+            obj = await s3.async_get_filedata(bucket, key)
+            async for _ in stream_object(obj, writer):
+                pass
+        except Exception:
+            writer.abort()
+            logger.exception(traceback.format_exc())
+        finally:
+            _filling.discard(cache_key)
+
+    _filling.add(cache_key)
+    asyncio.ensure_future(fill())
+
+
+async def document_content_response(request: Request, bucket, key, cache=None,
+                                    s3=None):
+    """The document, or the byte range the request asks for, from the
+    disk cache, or streamed from storage as it arrives (and cached)."""
+    cache = cache or document_cache
+    cache_key = bucket + "/" + key
+    range_header = request.headers.get("range")
+
+    hit = cache.open(cache_key)
+    if hit is not None:
+        fd, size = hit
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            os.close(fd)
+            return range_not_satisfiable(size)
+        return FileRangeResponse(fd, size, byte_range)
+
+    from botocore.exceptions import ClientError
+    s3 = s3 or AwsS3()
+    byte_range = single_range(range_header)
+    try:
+        obj = await s3.async_get_filedata(bucket, key, byte_range)
+    except ClientError as e:
+        error = e.response.get("Error", {})
+        if error.get("Code") == "InvalidRange":
+            return range_not_satisfiable(error.get("ActualObjectSize"))
+        if error.get("Code") in ["NoSuchKey", "404"]:
+            Http404("Filing document was not found.")
+        raise
+
+    size = object_size(obj)
+    media_type = obj.get("ContentType") or "application/pdf"
+    if "ContentRange" in obj:
+        start, end = obj["ContentRange"].split(" ", 1)[1].split("/")[0].split("-")
+        schedule_fill(s3, bucket, key, size, cache)
+        return StreamingResponse(
+            stream_object(obj), status_code=206, media_type=media_type,
+            headers=content_headers(size, (int(start), int(end))))
+
+    return StreamingResponse(
+        stream_object(obj, cache.writer(cache_key, size)), media_type=media_type,
+        headers=content_headers(size))
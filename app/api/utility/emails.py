@@ -1,5 +1,6 @@
 import logging
-from sqlalchemy.orm import Session
+import traceback
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.messages import (
     MessageTemplate
 )
@@ -17,6 +18,16 @@ from app.utils.email_utils import (
 
 logger = logging.getLogger("fastapi")
 
+
+async def log_message(db_session: AsyncSession, **kwargs):
+    # the email is already out, failing to record it shouldn't
+    # roll back the rest of the caller's transaction
+    try:
+        async with db_session.begin_nested():
+            await insert_message(db_session=db_session, **kwargs)
+    except Exception:
+        logger.exception(traceback.format_exc())
+
 async def send_pcg_email(
     *,
     data: dict,
@@ -35,7 +46,7 @@ async def send_pcg_email(
 
 async def send_templated_email_disk(
     *,
-    db_session: Session,
+    db_session: AsyncSession,
     data: dict,
     template_name: str,
     message_type: str,
@@ -54,7 +65,7 @@ async def send_templated_email_disk(
                                      template_name)
 
     if recipients_group is not None and recipients_group == "admin":
-        admin_users = get_all_active_admin_users(Session)
+        admin_users = await get_all_active_admin_users(db_session)
         recipients = [x.email for x in admin_users]
 
     meta = send_message(sender, recipients, subject, html)
@@ -63,8 +74,8 @@ async def send_templated_email_disk(
 
     html = " ".join(html.split()).strip()
 
-    await insert_message(
-        db_session=db_session,
+    await log_message(
+        db_session,
         sender=sender,
         recipients=recipients,
         subject=subject,
@@ -84,7 +95,7 @@ async def send_templated_email_disk(
 
 async def send_templated_email_db(
     *,
-    db_session: Session,
+    db_session: AsyncSession,
     data: dict,
     template: MessageTemplate,
     message_type: str,
@@ -103,7 +114,7 @@ async def send_templated_email_db(
                                    template)
 
     if recipients_group is not None and recipients_group == "admin":
-        admin_users = get_all_active_admin_users(Session)
+        admin_users = await get_all_active_admin_users(db_session)
         recipients = [x.email for x in admin_users]
 
     meta = send_message(sender, recipients, subject, html)
@@ -112,8 +123,8 @@ async def send_templated_email_db(
 
     html = " ".join(html.split()).strip()
 
-    await insert_message(
-        db_session=db_session,
+    await log_message(
+        db_session,
         sender=sender,
         recipients=recipients,
         subject=subject,
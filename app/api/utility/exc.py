@@ -29,6 +29,14 @@ def Http404(detail: str = "Not Found"):
     HttpExc(status_code=404, detail=detail)
 
 
+def Http413(detail: str = "Payload Too Large"):
+    HttpExc(status_code=413, detail=detail)
+
+
+def Http415(detail: str = "Unsupported Media Type"):
+    HttpExc(status_code=415, detail=detail)
+
+
 def Http500(detail: str = "Internal Server Error"):
     HttpExc(status_code=500, detail=detail)
 
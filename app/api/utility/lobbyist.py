@@ -7,7 +7,7 @@ import json
 from typing import Optional
 import pytz
 from dateutil.parser import parse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.encoders import jsonable_encoder
 from app.core.config import (
     FRONTEND_ROUTES,
@@ -80,7 +80,9 @@ from app.models.crud.filings import (
     get_filing_by_id_and_type,
     create_new_filing,
     upsert_raw_filing,
-    get_raw_filing_by_id
+    get_raw_filing_by_id,
+    upsert_filing_lineage,
+    set_latest_filing_version
 )
 from app.api.utility.exc import (
     handle_exc,
@@ -131,6 +133,13 @@ from app.models.filers import (
 from app.models.filings import (
     Filing
 )
+from app.api.utility.search import (
+    invalidate_public_caches
+)
+from app.api.utility.render_jobs import (
+    queue_filing_render,
+    pdf_renderer
+)
 from app.api.utility.lobbyist_validate_ingest import (
     validate_lobbyist_filing
 )
@@ -138,7 +147,7 @@ from app.api.utility.lobbyist_validate_ingest import (
 logger = logging.getLogger("fastapi")
 
 async def review_new_lobbyist(
-    db_session: Session,
+    db_session: AsyncSession,
     form: ReviewNewLobbyist,
     user: User
 ):
@@ -231,8 +240,6 @@ async def review_new_lobbyist(
         task.complete = True
         task.completed_by_user_id = user.id
 
-        db_session.commit()
-
         # get message template
         template = await get_message_template_by_message_type(db_session,
                                                         "lobbyist_new_reject")
@@ -257,13 +264,13 @@ async def review_new_lobbyist(
 
 
 
-    db_session.commit()
+    await db_session.commit()
 
     return True
 
 
 async def register_lobbyist_check_email_confirm(
-    db_session: Session,
+    db_session: AsyncSession,
     token: str
 ):
 
@@ -271,7 +278,7 @@ async def register_lobbyist_check_email_confirm(
     if res.get('filer'):
 
         # get filer user
-        user = get_filer_user_by_email(db_session, res['sub'])
+        user = await get_filer_user_by_email(db_session, res['sub'])
 
         if not user:
             raise CREDENTIALS_EXCEPTION
@@ -304,8 +311,6 @@ async def register_lobbyist_check_email_confirm(
         user.email_confirmed = True
         entity.filer_email_confirmed = True
 
-        db_session.commit()
-
     else:
         raise CREDENTIALS_EXCEPTION
 
@@ -345,7 +350,7 @@ async def register_lobbyist_check_email_confirm(
         meta=task_meta
     )
 
-    admins = get_all_active_admin_users(db_session)
+    admins = await get_all_active_admin_users(db_session)
     recipients = [x.email for x in admins]
 
     await send_templated_email_disk(
@@ -361,21 +366,30 @@ async def register_lobbyist_check_email_confirm(
         entity_id=entity.entity_id
     )
 
+    await db_session.commit()
 
     return {"success": True}
 
 
 async def update_lobbyist(
-    db_session: Session,
+    db_session: AsyncSession,
     form: UpdateLobbyingEntity
 ):
 
-    return await update_lobbying_entity(db_session, form)
+    # the public index shows the name, nothing else of the contact info
+    current = await get_lobbying_entity_current_contact_info_by_id(db_session, form.entity_id)
+    renamed = current is None or current.name != form.entity_name
+
+    await update_lobbying_entity(db_session, form)
+
+    await db_session.commit()
+    if renamed:
+        await invalidate_public_caches(entity_ids=[form.entity_id])
 
 
 
 async def register_new_lobbyist(
-    db_session: Session,
+    db_session: AsyncSession,
     form: NewLobbyistRegistration,
 ):
 
@@ -406,7 +420,7 @@ async def register_new_lobbyist(
 
 
     # check if we know the user
-    user = get_filer_user_by_email(db_session, form.filer_email)
+    user = await get_filer_user_by_email(db_session, form.filer_email)
 
 
     if user is None:
@@ -481,11 +495,11 @@ async def register_new_lobbyist(
     # add filing type to user
     # save message in message db
 
-    db_session.commit()
+    await db_session.commit()
 
 
 async def get_lobbyist_filer_user(
-    db_session: Session,
+    db_session: AsyncSession,
     lobbying_entity: LobbyingEntity,
     user: User
 ) -> Optional[Filer]:
@@ -502,7 +516,7 @@ async def get_lobbyist_filer_user(
         return None
 
 async def create_new_lobbyist_filing(
-    db_session: Session,
+    db_session: AsyncSession,
     filing_id: str,
     entity: LobbyingEntity,
     filer: Filer,
@@ -530,6 +544,7 @@ async def create_new_lobbyist_filing(
             amendment_number = 1
 
     period_start, period_end = get_period_start_end(payload.year, payload.quarter)
+    period_start, period_end = parse(period_start).date(), parse(period_end).date()
 
     # create the filing dict
     filing_dict = {
@@ -564,10 +579,11 @@ async def create_new_lobbyist_filing(
         if deadline_config is None:
             raise Http400(detail="Could not determine deadline")
 
-        filing_dict['deadline'] = deadline_config.value
+        filing_dict['deadline'] = parse(deadline_config.value).date()
 
 
     filing = await create_new_filing(db_session, filing_dict)
+    await upsert_filing_lineage(db_session, [filing.filing_id])
 
     if payload.filing_type == 'ec601':
         if not filing.amendment:
@@ -593,10 +609,12 @@ async def create_new_lobbyist_filing(
 
     filing_raw = await upsert_raw_filing(db_session, form)
 
+    await db_session.commit()
+
     return None
 
 async def get_filing_in_progress(
-    db_session: Session,
+    db_session: AsyncSession,
     filing: Filing,
     filer: Filer
 ):
@@ -651,7 +669,7 @@ async def get_filing_in_progress(
     return raw_dict
 
 async def update_filing_in_progress(
-    db_session: Session,
+    db_session: AsyncSession,
     filing: Filing,
     payload: UpdateFilingInProgress
 ):
@@ -660,8 +678,6 @@ async def update_filing_in_progress(
 
     res = await upsert_raw_filing(db_session, payload.form)
 
-    db_session.commit()
-
     return True
 
 mfd_a = [
@@ -705,7 +721,7 @@ mfd_dir = {
 
 
 async def calculate_filing_fees(
-    db_session: Session,
+    db_session: AsyncSession,
     filing: Filing
 ):
 
@@ -801,7 +817,7 @@ async def calculate_filing_fees(
         return None
 
 async def finalize_lobbyist_filing(
-    db_session: Session,
+    db_session: AsyncSession,
     filing: Filing,
     filer: Filer,
     payload: UpdateFilingInProgress
@@ -823,14 +839,23 @@ async def finalize_lobbyist_filing(
     if payload.form['lobbying_entity_contact_info_change']:
         contact_info = payload.form['lobbying_entity_contact_info']
         contact_info['entity_id'] = filing.entity_id
+        if isinstance(contact_info.get('effective_date'), str):
+            contact_info['effective_date'] = parse(
+                contact_info['effective_date']).date()
         await insert_lobbying_entity_contact_info(db_session, contact_info)
 
     # need to change this for fees
     filing.status = "filed"
     filing.date = today()
     filing.filer_id = filer.filer_id
+    await set_latest_filing_version(db_session, filing)
+
+    # the pdfs are rendered in the background, poll render-status
+    await queue_filing_render(db_session, filing)
 
-    db_session.commit()
+    await db_session.commit()
+    await invalidate_public_caches([filing])
+    pdf_renderer.request()
 
     return True
     
@@ -1,5 +1,5 @@
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import (
     FILING_FORM_NAMES_VERSIONS
 )
@@ -24,7 +24,7 @@ from app.models.filings import (
 )
 
 async def populate_lobbyist_amendment_form(
-    db_session: Session,
+    db_session: AsyncSession,
     payload: NewLobbyistFiling,
     filing: Filing
 ):
@@ -66,7 +66,7 @@ async def populate_lobbyist_amendment_form(
     return form
 
 async def populate_core_new_lobbyist_form(
-    db_session: Session,
+    db_session: AsyncSession,
     payload: NewLobbyistFiling,
     filing_type: str,
     form: dict,
@@ -122,7 +122,7 @@ def map_entity(obj):
     
 
 async def get_registered_data(
-    db_session: Session,
+    db_session: AsyncSession,
     filing: Filing,
     form: dict
 ):
@@ -182,7 +182,7 @@ async def get_registered_data(
     return xd
 
 async def populate_quarterly_registered_data(
-    db_session: Session,
+    db_session: AsyncSession,
     filing_type: str,
     form: dict,
     filing: Filing
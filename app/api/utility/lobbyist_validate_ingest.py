@@ -1,6 +1,6 @@
 import json
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.lobbyist.forms import (
     Ec601
 )
@@ -28,7 +28,7 @@ async def validate_cleanup_ec601(payload):
     return payload
 
 async def validate_lobbyist_filing(
-    db_session: Session,
+    db_session: AsyncSession,
     filing: Filing,
     payload: UpdateFilingInProgress,
 ):
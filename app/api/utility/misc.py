@@ -1,8 +1,7 @@
 import logging
-import aiohttp
 import urllib
 from tenacity import retry, stop_after_attempt, wait_fixed
-from app.core.config import RECAPTCHA_SECRET_KEY, S3_PUBLIC_BUCKET, S3_AWS_REGION
+from app.core.config import RECAPTCHA_SECRET_KEY
 
 logger = logging.getLogger("fastapi")
 
@@ -13,24 +12,9 @@ async def check_recaptcha_response(g_recaptcha_response: str):
     encdata = urllib.parse.urlencode(data)
     url = "https://www.google.com/recaptcha/api/siteverify"
 
+    import aiohttp
     async with aiohttp.ClientSession() as session:
         async with session.post(url, params=encdata) as res:
             res = await res.json()
 
     return res["success"]
-
-
-def generate_doc_url(filing_type, doc_id):
-    url_domain = "https://" + "efile-sd-public-dev" + ".s3-us-west-2.amazonaws.com/"
-    if filing_type in ["fppc801", "fppc802", "fppc803", "fppc806"]:
-        return url_domain + "ser800/" + doc_id + ".pdf"
-    elif filing_type in ["fppc700"]:
-        return url_domain + "sei/fppc700/" + doc_id + ".pdf"
-    elif filing_type in [
-        "ec601",
-        "ec602",
-        "ec603",
-        "ec604",
-        "ec605",
-    ]:
-        return url_domain + "lobbyist/" + filing_type + "/" + doc_id + ".pdf"
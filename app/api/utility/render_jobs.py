@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import logging
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import (
+    S3_PUBLIC_BUCKET,
+    S3_PRIVATE_BUCKET,
+    RENDER_PROCESSES,
+    RENDER_MAX_ATTEMPTS,
+    RENDER_RETRY_DELAY,
+    RENDER_STALE_AFTER,
+)
+from app.models.filings import FILING_TYPE_MAPPING, FILING_TYPE_DESCRIPTION
+from app.models.crud.filings import get_filing_by_id, get_raw_filing_by_id
+from app.models.crud.documents import (
+    upsert_document,
+    insert_render_job,
+    claim_render_jobs,
+    seconds_until_next_render_job,
+    finish_render_job,
+)
+from app.utils.pdf_templates import latest_template_version
+from app.utils.pdf_render import render_filing_pdf
+from app.api.utility.documents import document_key
+from app.api.utility.search import invalidate_public_caches
+
+
+logger = logging.getLogger("fastapi")
+
+
+async def queue_filing_render(db_session: AsyncSession, filing):
+    """Queue rendering filing's documents, in the transaction that files
+    it. Call pdf_renderer.request() after the commit."""
+    version = latest_template_version(filing.filing_type)
+    if version is None:
+        return None
+    return await insert_render_job(db_session, filing.filing_id,
+                                   filing.filing_type, version)
+
+
+def filing_doc_ids(filing_id):
+    # stable per filing: a retry or re-render overwrites the same
+    # documents, the urls handed out stay good
+    public = hashlib.md5(str(filing_id).encode()).hexdigest()
+    private = hashlib.md5(f"{filing_id}:private".encode()).hexdigest()
+    return public, private
+
+
+def render_header(filing) -> dict:
+    header = {
+        "title": (FILING_TYPE_MAPPING.get(filing.filing_type, filing.filing_type)
+                  + " " + FILING_TYPE_DESCRIPTION.get(filing.filing_type, "")).strip(),
+        "e_filing_id": filing.e_filing_id,
+        "filing_date": filing.filing_date.date().isoformat() if filing.filing_date else None,
+    }
+    if filing.period_start and filing.period_end:
+        header["period"] = f"{filing.period_start.isoformat()} - {filing.period_end.isoformat()}"
+    if filing.amendment:
+        header["amendment"] = str(filing.amendment_number or "Yes")
+    return header
+
+
+def retry_delay(attempts, delay=RENDER_RETRY_DELAY):
+    return delay * 2 ** (attempts - 1)
+
+
+class PdfRenderer:
+    """Renders the documents of filed filings, off the request path.
+
+    Jobs live in render_job. request() (after the commit that queued one,
+    and at startup) starts a loop that claims due jobs, renders the public
+    and private pdf in a process pool, stores them, records the document
+    rows and the filing's doc_public / doc_private, until nothing is due.
+    Failures are retried with backoff, then left failed.
+    """
+
+    def __init__(self, session_factory=None, storage=None, processes=RENDER_PROCESSES,
+                 max_attempts=RENDER_MAX_ATTEMPTS, stale_after=RENDER_STALE_AFTER,
+                 render=render_filing_pdf, published=invalidate_public_caches):
+        self.session_factory = session_factory
+        self.storage = storage
+        self.processes = processes
+        self.max_attempts = max_attempts
+        self.stale_after = stale_after
+        self.render = render
+        self.published = published
+        self.pool = None
+        self.task = None
+
+    def request(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._run())
+
+    def session(self):
+        if self.session_factory is None:
+            from app.db.session import AsyncLocalSession
+            self.session_factory = AsyncLocalSession
+        return self.session_factory()
+
+    def executor(self):
+        if self.pool is None:
+            # spawn: a fork would copy the event loop and the db pool
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"))
+        return self.pool
+
+    def store(self):
+        if self.storage is None:
+            from app.utils.aws import AwsS3
+            self.storage = AwsS3()
+        return self.storage
+
+    async def _run(self):
+        try:
+            while True:
+                async with self.session() as db_session:
+                    jobs = await claim_render_jobs(db_session, self.processes,
+                                                   self.stale_after)
+                    await db_session.commit()
+
+                if jobs:
+                    await asyncio.gather(*[self._render_job(job) for job in jobs])
+                    continue
+
+                async with self.session() as db_session:
+                    wait = await seconds_until_next_render_job(db_session,
+                                                               self.stale_after)
+                if wait is None:
+                    return
+                await asyncio.sleep(min(max(wait, 0.1), 60))
+        except Exception:
+            # the jobs stay queued, the next request picks them up
+            logger.error("pdf rendering stopped")
+            logger.exception(traceback.format_exc())
+        finally:
+            self.task = None
+
+    async def _render_job(self, job):
+        try:
+            if job.attempts > self.max_attempts:
+                raise RuntimeError("no attempts left")
+            await self._render(job)
+        except Exception as e:
+            logger.exception(traceback.format_exc())
+            retry = job.attempts < self.max_attempts
+            async with self.session() as db_session:
+                await finish_render_job(
+                    db_session, job.id, "queued" if retry else "failed",
+                    error=str(e)[:1000] or type(e).__name__,
+                    retry_in=retry_delay(job.attempts) if retry else None,
+                )
+                await db_session.commit()
+
+    async def _render(self, job):
+        async with self.session() as db_session:
+            filing = await get_filing_by_id(db_session, job.filing_id)
+            raw = await get_raw_filing_by_id(db_session, job.filing_id)
+        if filing is None or raw is None:
+            raise RuntimeError(f"filing {job.filing_id} not found")
+
+        header = render_header(filing)
+        loop = asyncio.get_event_loop()
+        public_pdf, private_pdf = await asyncio.gather(*[
+            loop.run_in_executor(self.executor(), self.render, job.template,
+                                 job.template_version, header, raw.raw_json, public)
+            for public in [True, False]
+        ])
+
+        doc_public, doc_private = filing_doc_ids(filing.filing_id)
+        name = (filing.e_filing_id or filing.filing_type) + ".pdf"
+        documents = [
+            {"doc_id": doc_public, "public": True, "bucket": S3_PUBLIC_BUCKET,
+             "key": document_key(filing.filing_type, doc_public), "pdf": public_pdf},
+            {"doc_id": doc_private, "public": False, "bucket": S3_PRIVATE_BUCKET,
+             "key": document_key(filing.filing_type, doc_private), "pdf": private_pdf},
+        ]
+        await self.store().async_put_many([
+            {"bucket": d["bucket"], "key": d["key"], "filedata": d["pdf"],
+             "filename": name, "other_metadata": {"filing_id": filing.filing_id}}
+            for d in documents
+        ])
+
+        async with self.session() as db_session:
+            for d in documents:
+                await upsert_document(
+                    db_session, d["doc_id"], doc_type="electronic filing",
+                    mime_type="application/pdf", size_bytes=len(d["pdf"]),
+                    filename=name, s3bucket=d["bucket"], s3key=d["key"],
+                    public=d["public"])
+
+            filing = await get_filing_by_id(db_session, job.filing_id)
+            filing.doc_public = doc_public
+            filing.doc_private = doc_private
+            await finish_render_job(db_session, job.id, "done")
+            await db_session.commit()
+
+        await self.published([filing])
+
+
+pdf_renderer = PdfRenderer()
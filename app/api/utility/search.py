@@ -1,181 +1,354 @@
+import io
+import csv
+import json
+import base64
+import binascii
+import datetime
 from fastapi import APIRouter, Depends, Response, Request
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
-from app.models.crud.filer import get_all_filer_ids_by_last_name
-from app.models.crud.filings import (
-    get_filing_by_id,
-    get_all_lobbyist_filings_by_all_filer_ids,
-    get_all_filings_by_all_filer_ids,
-    get_filing_by_public_doc,
-    get_filing_metadata_by_public_doc,
-    get_lobbyist_filing_metadata_by_public_doc,
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import (
+    SEARCH_MAX_MATCHES,
+    SEARCH_PAGE_SIZE,
+    SEARCH_PAGE_MAX,
+    SEARCH_COUNT_CAP,
+    SEARCH_EXPORT_BATCH_SIZE,
+    SEARCH_FUZZY_THRESHOLD,
+    AMENDMENT_CHAIN_MAX_DEPTH,
 )
-from app.models.crud.lobbyist import (
-    get_lobbying_entity_filer_ids_by_company,
+from app.models.crud.search import (
+    SEARCH_SORTS,
+    to_prefix_tsquery,
+    normalize_name,
+    search_filings,
+    stream_search_filings,
+    get_public_filing_by_doc,
 )
-from app.models.crud.humane_ids import (
-    get_e_filer_id_by_orig_amendment,
-    get_e_filer_id_by_prev_amendment,
+from app.models.crud.filings import (
+    get_amendment_chains,
 )
 from app.models.filings import FILING_TYPE_MAPPING, FILING_TYPE_DESCRIPTION
-from app.api.utility.misc import generate_doc_url
-
-
-async def get_all_filings(
-    db_session: Session,
-    query: str,
-    start_date: str,
-    end_date: str,
-) -> list:
-    filers = await get_all_filer_ids_by_last_name(db_session, query)
-
-    # get all filings for each id
-    all_filings = await get_all_filings_by_all_filer_ids(
-        db_session, filers, start_date, end_date
-    )
-
-    filings_json = jsonable_encoder(all_filings)
+from app.api.utility.exc import Http400, Http404
+from app.utils.string_utils import check_uuid4
+from app.utils.cache import cache_key, cached
+from app.utils.public_index import SEARCH_TAG, public_index_refresher
+
+
+NOT_EFILED_ID = "Not electronically filed"
+
+
+def amended_id(filing_id, e_filing_id, key: str) -> dict:
+    return {key: filing_id, "human_id": e_filing_id or NOT_EFILED_ID}
+
+
+def decorate_search_row(row) -> dict:
+    # the filing shape /public/search has always returned
+    filing = {
+        "filing_date": row.filing_date,
+        "filing_type": row.filing_type,
+        "doc_public": row.doc_public,
+        "amendment": row.amendment,
+        "amends_orig_id": row.amends_orig_id,
+        "amends_prev_id": row.amends_prev_id,
+        "amendment_number": row.amendment_number,
+    }
+    if row.amendment:
+        filing["amends_orig_id"] = amended_id(
+            row.amends_orig_id, row.orig_e_filing_id, "orig_id")
+        filing["amends_prev_id"] = amended_id(
+            row.amends_prev_id, row.prev_e_filing_id, "prev_id")
+
+    description = FILING_TYPE_DESCRIPTION[row.filing_type]
+    filing_type = FILING_TYPE_MAPPING[row.filing_type]
+    if row.doc_public is None:
+        # filing not electronically filed
+        filing_type += "; Not electronically filed."
+    filing["filing_type"] = filing_type
+
+    if row.kind == 0:
+        filing["filing_subtype"] = row.filing_subtype
+        filing["first_name"] = row.first_name
+        filing["last_name"] = row.last_name
+        filing["description"] = description + "; " + row.filing_subtype
+        filing["filer"] = row.last_name + ", " + row.first_name
+    else:
+        filing["filer"] = row.filer
+        filing["description"] = description
 
-    return filings_json
+    return jsonable_encoder(filing)
 
 
-async def get_all_lobbyist_filings(
-    db_session: Session,
-    query: str,
-    start_date: str,
-    end_date: str,
-) -> list:
-    lobbyist = await get_lobbying_entity_filer_ids_by_company(db_session, query)
+def encode_search_cursor(sort: str, row) -> str:
+    # opaque to clients, the keyset of the last row on the page
+    data = [sort, row.sort_date.isoformat(), row.filing_id]
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
 
-    all_lobbyist_filings = await get_all_lobbyist_filings_by_all_filer_ids(
-        db_session, lobbyist, start_date, end_date
-    )
 
-    all_lobbyist_filings_json = jsonable_encoder(all_lobbyist_filings)
+def decode_search_cursor(sort: str, cursor: str) -> tuple:
+    try:
+        cursor_sort, sort_date, filing_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        after = (datetime.datetime.fromisoformat(sort_date), filing_id)
+        if not check_uuid4(filing_id):
+            raise ValueError(filing_id)
+    except (ValueError, TypeError, binascii.Error):
+        Http400("Invalid cursor.")
 
-    return all_lobbyist_filings_json
+    if cursor_sort != sort:
+        Http400("The cursor belongs to a different sort order.")
 
+    return after
 
-async def convert_amend_ids_to_efile_ids(
-    db_session: Session,
-    filings: list,
-):
-    # change ammend to e_filing_id
-    amendment_orig = []
-    amendment_prev = []
-    for each in filings:
-        # We need to convert these values
-        if each["amendment"]:
-            amendment_orig.append(each["amends_orig_id"])
-            amendment_prev.append(each["amends_prev_id"])
-
-    amendment_orig_efile_ids = await get_e_filer_id_by_orig_amendment(
-        db_session, amendment_orig
-    )
 
-    amendment_prev_efile_ids = await get_e_filer_id_by_prev_amendment(
-        db_session, amendment_prev
+async def search_public_filings(
+    db_session: AsyncSession,
+    query: str,
+    start_date: str = None,
+    end_date: str = None,
+    sort: str = "-filing_date",
+    limit: int = None,
+    cursor: str = None,
+    fuzzy: bool = False,
+    phonetic: bool = False,
+    lineage: bool = False,
+) -> dict:
+    """One page of filer and lobbyist filings matching query.
+
+    One query, see app.models.crud.search.SEARCH_FILINGS_SQL. The total
+    is only counted for the first page (no cursor), up to
+    SEARCH_COUNT_CAP. fuzzy: names similar to the query rather than
+    starting with its words, phonetic: or sounding like them. lineage
+    adds the amendment chain of every filing, one more query a page.
+    """
+    if sort not in SEARCH_SORTS:
+        Http400("Sort must be one of: " + ", ".join(SEARCH_SORTS) + ".")
+
+    limit = min(max(limit or SEARCH_PAGE_SIZE, 1), SEARCH_PAGE_MAX)
+    after = decode_search_cursor(sort, cursor) if cursor else None
+
+    terms = normalize_name(query) if fuzzy else to_prefix_tsquery(query)
+    key = cache_key("search", terms, start_date, end_date, sort, limit,
+                    cursor, fuzzy, fuzzy and phonetic, lineage)
+    tags = []
+
+    async def compute():
+        # one extra row tells if there is a next page
+        rows = await search_filings(
+            db_session, query, start_date, end_date,
+            matches=SEARCH_MAX_MATCHES,
+            sort=sort,
+            limit=limit + 1,
+            after=after,
+            count_cap=SEARCH_COUNT_CAP,
+            fuzzy=fuzzy,
+            phonetic=phonetic,
+            threshold=SEARCH_FUZZY_THRESHOLD,
+        )
+        tags.extend(search_cache_tags(rows))
+
+        data = [decorate_search_row(row) for row in rows[:limit]]
+        if lineage:
+            await add_amendment_chains(db_session, rows[:limit], data)
+
+        page = {
+            "data": data,
+            "next_cursor": None,
+            "total_estimate": None,
+            "total_exact": None,
+        }
+        if len(rows) > limit:
+            page["next_cursor"] = encode_search_cursor(sort, rows[limit - 1])
+        if after is None:
+            total = rows[0].total if rows else 0
+            page["total_estimate"] = total
+            page["total_exact"] = total < SEARCH_COUNT_CAP
+
+        return page
+
+    return await cached(key, compute, lambda page: tags)
+
+
+async def add_amendment_chains(db_session: AsyncSession, rows, filings):
+    # filings: rows, decorated
+    chains = await get_amendment_chains(
+        db_session,
+        [row.filing_id for row in rows if row.amendment],
+        AMENDMENT_CHAIN_MAX_DEPTH,
     )
-
-    amendment_orig_efile_ids_list = jsonable_encoder(amendment_orig_efile_ids)
-    amendment_prev_efile_ids_list = jsonable_encoder(amendment_prev_efile_ids)
-
-    amendment_orig_efile_ids_dict = {}
-    amendment_prev_efile_ids_dict = {}
-
-    for each in amendment_orig_efile_ids_list:
-        amendment_orig_efile_ids_dict[each["amends_orig_id"]] = each["e_filing_id"]
-
-    for each in amendment_prev_efile_ids_list:
-        amendment_prev_efile_ids_dict[each["amends_prev_id"]] = each["e_filing_id"]
-
-    for each in filings:
-        if each["amendment"] == True:
-            if each["amends_orig_id"] in amendment_orig_efile_ids_dict:
-                each["amends_orig_id"] = {
-                    "orig_id": each["amends_orig_id"],
-                    "human_id": amendment_orig_efile_ids_dict[each["amends_orig_id"]],
-                }
-            else:
-                each["amends_orig_id"] = {
-                    "orig_id": each["amends_orig_id"],
-                    "human_id": "Not electronically filed",
-                }
-    for each in filings:
-        if each["amendment"] == True:
-            if each["amends_prev_id"] in amendment_prev_efile_ids_dict:
-                each["amends_prev_id"] = {
-                    "prev_id": each["amends_prev_id"],
-                    "human_id": amendment_prev_efile_ids_dict[each["amends_prev_id"]],
-                }
-            else:
-                each["amends_prev_id"] = {
-                    "prev_id": each["amends_prev_id"],
-                    "human_id": "Not electronically filed",
-                }
-
-
-async def get_filing_url_by_public_doc_id(db_session: Session, public_doc_id):
-    filing = await get_filing_by_public_doc(db_session, public_doc_id)
-
-    filing_json = jsonable_encoder(filing)
-
-    if filing_json is None:
-        return filing_json
-
-    return generate_doc_url(filing_json["filing_type"], public_doc_id)
-
-
-async def get_filing_metadata_by_public_doc_id(db_session: Session, public_doc_id):
-    filing_metadata = await get_filing_metadata_by_public_doc(db_session, public_doc_id)
-
-    filing_metadata_json = jsonable_encoder(filing_metadata)
-
-    return filing_metadata_json
-
-
-async def get_lobbyist_filing_metadata_by_public_doc_id(
-    db_session: Session, public_doc_id
+    for row, filing in zip(rows, filings):
+        filing["amendment_chain"] = [
+            amended_id(x.filing_id, x.e_filing_id, "filing_id")
+            for x in chains.get(row.filing_id, [])
+        ]
+
+
+def search_cache_tags(rows) -> list:
+    # every filer the search matched, not just the ones on this page: a
+    # new filing of any of them can change the page. SEARCH_TAG for the
+    # filers it doesn't match yet, empty pages included
+    if not rows:
+        return [SEARCH_TAG]
+    tags = {SEARCH_TAG}
+    tags.update(f"filer:{filer_id}" for filer_id in rows[0].matched_filer_ids)
+    tags.update(f"entity:{row.entity_id}" for row in rows if row.entity_id)
+    return sorted(tags)
+
+
+def filing_cache_tags(filing) -> list:
+    tags = [f"filing:{filing.filing_id}"]
+    if filing.filer_id is not None:
+        tags.append(f"filer:{filing.filer_id}")
+    if filing.entity_id is not None:
+        tags.append(f"entity:{filing.entity_id}")
+    return tags
+
+
+async def invalidate_public_caches(filings=(), entity_ids=(), filer_ids=()):
+    """Publish a committed write to the public search and metadata.
+
+    Call after the commit of a write that changes public rows (a filing
+    filed or published, a displayed name changed), drafts don't show:
+    each call costs a refresh of the whole view. public_filing_index is
+    refreshed (debounced, in the background), then the cached results
+    carrying the tags of the filings / entities / filers are dropped.
+    """
+    tags = [tag for filing in filings for tag in filing_cache_tags(filing)]
+    tags.extend(f"entity:{entity_id}" for entity_id in entity_ids)
+    tags.extend(f"filer:{filer_id}" for filer_id in filer_ids)
+    public_index_refresher.request(tags)
+
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_CSV_COLUMNS = [
+    "filing_date",
+    "filing_type",
+    "description",
+    "filer",
+    "first_name",
+    "last_name",
+    "filing_subtype",
+    "doc_public",
+    "amendment",
+    "amendment_number",
+    "amends_orig_id",
+    "amends_orig_e_filing_id",
+    "amends_prev_id",
+    "amends_prev_e_filing_id",
+]
+
+
+def flatten_search_filing(filing: dict) -> dict:
+    # csv has no nesting, amended ids get their own columns
+    flat = dict(filing)
+    for key, id_key in [("amends_orig_id", "orig_id"),
+                        ("amends_prev_id", "prev_id")]:
+        amended = flat[key]
+        if isinstance(amended, dict):
+            flat[key] = amended[id_key]
+            flat[key.replace("_id", "_e_filing_id")] = amended["human_id"]
+    return flat
+
+
+async def export_public_filings(
+    db_session: AsyncSession,
+    query: str,
+    start_date: str = None,
+    end_date: str = None,
+    export_format: str = "ndjson",
+    fuzzy: bool = False,
+    phonetic: bool = False,
 ):
-    lobbyist_filing_metadata = await get_lobbyist_filing_metadata_by_public_doc(
-        db_session, public_doc_id
-    )
-
-    lobbyist_filing_metadata_json = jsonable_encoder(lobbyist_filing_metadata)
-
-    return lobbyist_filing_metadata_json
-
-
-async def get_all_previous_filing_amendments(db_session: Session, filing_id: str):
-    # Dangerous Code!
-    # Must definitely refactor this!
-    amendments = []
-    index = 0
-    id = await get_filing_by_id(db_session, filing_id)
-    amendments.append(jsonable_encoder(id))
-    while True:
-        if not amendments[index]["amendment"]:
-            break
-        id = await get_filing_by_id(db_session, amendments[index]["amends_prev_id"])
-        amendments.append(jsonable_encoder(id))
-        index += 1
-
-    # remove first as it is original
-    amendments.pop(0)
-
-    return amendments
-
-
-async def get_metadata(db_session: Session, public_doc_id):
-    metadata = await get_filing_metadata_by_public_doc_id(db_session, public_doc_id)
-
-    if metadata is None:
-        metadata = await get_lobbyist_filing_metadata_by_public_doc_id(
-            db_session, public_doc_id
-        )
+    """Every filing matching a public search, as chunks of ndjson / csv.
+
+    Rows are decorated like /public/search and written out a batch at a
+    time, memory use does not grow with the result.
+    """
+    buffer = io.StringIO()
+    writer = None
+    if export_format == "csv":
+        writer = csv.DictWriter(buffer, EXPORT_CSV_COLUMNS,
+                                extrasaction="ignore")
+        writer.writeheader()
+
+    n = 0
+    async for row in stream_search_filings(
+        db_session, query, start_date, end_date,
+        matches=SEARCH_MAX_MATCHES,
+        batch_size=SEARCH_EXPORT_BATCH_SIZE,
+        fuzzy=fuzzy,
+        phonetic=phonetic,
+        threshold=SEARCH_FUZZY_THRESHOLD,
+    ):
+        filing = decorate_search_row(row)
+        if writer is None:
+            buffer.write(json.dumps(filing) + "\n")
+        else:
+            writer.writerow(flatten_search_filing(filing))
+
+        n += 1
+        if n % SEARCH_EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+AMENDMENT_COLUMNS = [
+    "filing_id",
+    "e_filing_id",
+    "filing_date",
+    "filing_type",
+    "status",
+    "doc_public",
+    "amendment",
+    "amendment_number",
+    "amends_orig_id",
+    "amends_prev_id",
+]
+
+
+def amendment_chain_json(chain: list) -> list:
+    return jsonable_encoder([
+        {column: getattr(row, column) for column in AMENDMENT_COLUMNS}
+        for row in chain
+    ])
+
+
+async def get_all_previous_filing_amendments(db_session: AsyncSession, filing_id: str):
+    # the filings filing_id amends, newest first, down to the original
+    chains = await get_amendment_chains(
+        db_session, [filing_id], AMENDMENT_CHAIN_MAX_DEPTH)
+    return amendment_chain_json(chains.get(str(filing_id), []))
+
+
+async def load_metadata(db_session: AsyncSession, public_doc_id):
+    filing = await get_public_filing_by_doc(db_session, public_doc_id)
+    if filing is None:
+        Http404("Filing document was not found.")
+
+    metadata = {
+        "filing_date": filing.filing_date,
+        "filing_type": filing.filing_type,
+        "amendment": filing.amendment,
+        "filing_id": filing.filing_id,
+        "e_filing_id": filing.e_filing_id,
+    }
+    if filing.kind == 0:
+        metadata["filing_subtype"] = filing.filing_subtype
+        metadata["first_name"] = filing.first_name
+        metadata["last_name"] = filing.last_name
+        metadata["name"] = filing.last_name + ", " + filing.first_name
     else:
-        # We know not a series 600
-        metadata["name"] = metadata["last_name"] + ", " + metadata["first_name"]
+        # series 600
+        metadata["name"] = filing.filer
+    metadata = jsonable_encoder(metadata)
 
     metadata["filing_description"] = FILING_TYPE_DESCRIPTION[metadata["filing_type"]]
     metadata["filing_type"] = FILING_TYPE_MAPPING[metadata["filing_type"]]
@@ -189,3 +362,18 @@ async def get_metadata(db_session: Session, public_doc_id):
         metadata["all_amendments"] = all_amendments
 
     return metadata
+
+
+def metadata_cache_tags(metadata: dict) -> list:
+    tags = [f"filing:{metadata['filing_id']}"]
+    tags.extend(f"filing:{amendment['filing_id']}"
+                for amendment in metadata.get("all_amendments", []))
+    return tags
+
+
+async def get_metadata(db_session: AsyncSession, public_doc_id):
+    return await cached(
+        cache_key("metadata", public_doc_id),
+        lambda: load_metadata(db_session, public_doc_id),
+        metadata_cache_tags,
+    )
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+from multipart.multipart import (
+    MultipartParser,
+    MultipartParseError,
+    parse_options_header,
+)
+from app.core.config import UPLOAD_MAX_BYTES, UPLOAD_MIME_TYPES
+from app.api.utility.exc import Http400, Http413, Http415
+
+
+logger = logging.getLogger("fastapi")
+
+UPLOAD_DOC_TYPES = ["filer upload", "portal attachment"]
+
+# what the first bytes of an accepted type must be
+MIME_SIGNATURES = {
+    "application/pdf": [b"%PDF-"],
+    "image/png": [b"\x89PNG\r\n\x1a\n"],
+    "image/jpeg": [b"\xff\xd8\xff"],
+}
+SIGNATURE_BYTES = 8
+
+# room for the multipart framing around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSink:
+    """Where an upload's bytes go, as they arrive: the storage writer,
+    the sha256 and the size. Refuses more than max_bytes and content that
+    doesn't start like its declared type."""
+
+    def __init__(self, writer, mime_type, max_bytes=UPLOAD_MAX_BYTES):
+        self.writer = writer
+        self.mime_type = mime_type
+        self.max_bytes = max_bytes
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+    def check_head(self, final=False):
+        signatures = MIME_SIGNATURES.get(self.mime_type)
+        if not signatures or (len(self.head) < SIGNATURE_BYTES and not final):
+            return
+        if not any(self.head.startswith(s) for s in signatures):
+            Http415(f"File content is not {self.mime_type}.")
+
+    async def write(self, data):
+        if not data:
+            return
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            Http413(f"Files can be at most {self.max_bytes} bytes.")
+        if len(self.head) < SIGNATURE_BYTES:
+            self.head += data[:SIGNATURE_BYTES - len(self.head)]
+            self.check_head()
+        self.sha256.update(data)
+        await self.writer.write(data)
+
+    async def complete(self):
+        if self.size == 0:
+            Http400("The file is empty.")
+        self.check_head(final=True)
+        await self.writer.complete()
+
+
+def check_mime_type(mime_type, mime_types=UPLOAD_MIME_TYPES):
+    mime_type = (mime_type or "").split(";")[0].strip().lower()
+    if mime_type not in mime_types:
+        Http415("Files must be one of: " + ", ".join(mime_types) + ".")
+    return mime_type
+
+
+def check_length(content_length, max_bytes, overhead=0):
+    # before reading anything
+    if content_length and content_length.isdigit() \
+       and int(content_length) > max_bytes + overhead:
+        Http413(f"Files can be at most {max_bytes} bytes.")
+
+
+class MultipartEvents:
+    """MultipartParser callbacks, recorded: the parser calls them
+    synchronously, the data has to go to storage asynchronously. Holds
+    at most one chunk's worth of data."""
+
+    def __init__(self, boundary):
+        self.events = []
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": lambda: self.events.append(("begin", None)),
+            "on_header_field": self.on("field"),
+            "on_header_value": self.on("value"),
+            "on_header_end": lambda: self.events.append(("header_end", None)),
+            "on_headers_finished": lambda: self.events.append(("headers", None)),
+            "on_part_data": self.on("data"),
+            "on_part_end": lambda: self.events.append(("end", None)),
+        })
+
+    def on(self, kind):
+        return lambda data, start, end: self.events.append((kind, data[start:end]))
+
+    def feed(self, chunk):
+        self.events = []
+        try:
+            self.parser.write(chunk)
+        except MultipartParseError:
+            Http400("Malformed multipart body.")
+        return self.events
+
+
+async def receive_upload(chunks, content_type, content_length, open_writer,
+                         filename=None, max_bytes=UPLOAD_MAX_BYTES,
+                         mime_types=UPLOAD_MIME_TYPES):
+    """Stream an upload from chunks (the request body) into storage.
+
+    The body is either the file itself, its type in content_type, or
+    multipart/form-data whose first part with a filename is the file.
+    open_writer(mime_type) gives the storage writer (write / complete /
+    abort). Size and type are refused as early as they are known:
+    Content-Length before reading, the declared type before the first
+    byte is stored, the content's signature in the first bytes.
+
+    Returns the UploadSink and the filename.
+    """
+    declared, options = parse_options_header(content_type or "")
+    declared = declared.decode("latin-1").lower()
+    multipart = declared == "multipart/form-data"
+
+    check_length(content_length, max_bytes, MULTIPART_OVERHEAD if multipart else 0)
+
+    sink = None
+    try:
+        if not multipart:
+            sink = UploadSink(open_writer(check_mime_type(declared, mime_types)),
+                              declared, max_bytes)
+            async for chunk in chunks:
+                await sink.write(chunk)
+            await sink.complete()
+            return sink, filename
+
+        if b"boundary" not in options:
+            Http400("Multipart body without a boundary.")
+        events = MultipartEvents(options[b"boundary"])
+
+        headers, field, value = {}, b"", b""
+        in_file = done = False
+        received = 0
+        async for chunk in chunks:
+            # whatever comes around the file is bounded too
+            received += len(chunk)
+            if received > max_bytes + MULTIPART_OVERHEAD:
+                Http413(f"Files can be at most {max_bytes} bytes.")
+            for kind, data in events.feed(chunk):
+                if done:
+                    break
+                if kind == "begin":
+                    headers, field, value = {}, b"", b""
+                elif kind == "field":
+                    field += data
+                elif kind == "value":
+                    value += data
+                elif kind == "header_end":
+                    headers[field.decode("latin-1").lower()] = value
+                    field, value = b"", b""
+                elif kind == "headers":
+                    disposition, params = parse_options_header(
+                        headers.get("content-disposition", b""))
+                    if sink is None and params.get(b"filename"):
+                        filename = filename or params[b"filename"].decode("utf-8", "replace")
+                        mime_type = check_mime_type(
+                            headers.get("content-type", b"").decode("latin-1"), mime_types)
+                        sink = UploadSink(open_writer(mime_type), mime_type, max_bytes)
+                        in_file = True
+                elif kind == "data" and in_file:
+                    await sink.write(data)
+                elif kind == "end" and in_file:
+                    in_file, done = False, True
+            if done:
+                # the rest of the body is not read
+                break
+
+        if sink is None:
+            Http400("No file in the upload.")
+        if not done:
+            Http400("The upload ended before the file did.")
+        await sink.complete()
+        return sink, filename
+
+    except BaseException:
+        if sink is not None:
+            try:
+                await sink.writer.abort()
+            except Exception:
+                logger.exception("aborting an upload failed")
+        raise
@@ -11,7 +11,7 @@ from fastapi import (
     Request,
     Response,
 )
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi_jwt_auth import AuthJWT
 from app.api.utility.exc import (
     CREDENTIALS_EXCEPTION,
@@ -37,6 +37,8 @@ from app.core.security import (
     get_password_hash
 )
 from app.db.utils import get_db
+from app.db.session import AsyncLocalSession
+from app.db.instrumentation import session_info
 from app.utils.auth import (
     create_access_token,
     check_access_token
@@ -69,10 +71,24 @@ def get_config():
 async def get_current_user(
     request: Request,
     response: Response,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
     Authorize: AuthJWT = Depends()
 ):
 
+    return await user_from_token(db_session, Authorize)
+
+
+async def get_current_primary_user(Authorize: AuthJWT = Depends()):
+    # for routes on get_read_db: active / account_type come from the
+    # primary, a replica behind would let a deactivated admin in. The
+    # session is closed before the route opens its read session, the
+    # request holds one connection at a time
+    async with AsyncLocalSession(info=session_info()) as db_session:
+        return await user_from_token(db_session, Authorize)
+
+
+async def user_from_token(db_session: AsyncSession, Authorize: AuthJWT):
+
     try:
         Authorize.jwt_required()
     except Exception as e:
@@ -84,14 +100,14 @@ async def get_current_user(
     # admin user
     admin = token.get('admin', False)
     if admin:
-        user = get_admin_user_by_email(db_session, token.get('sub'))
+        user = await get_admin_user_by_email(db_session, token.get('sub'))
         if user is None:
             raise CREDENTIALS_EXCEPTION
         return user
 
     filer = token.get('filer', False)
     if filer:
-        user = get_filer_user_by_email(db_session, token.get('sub'))
+        user = await get_filer_user_by_email(db_session, token.get('sub'))
         if user is None:
             raise CREDENTIALS_EXCEPTION
         return user
@@ -106,6 +122,15 @@ async def get_active_user(user: User = Depends(get_current_user) ):
     return user
 
 async def get_active_admin_user(user: User = Depends(get_current_user) ):
+    return check_active_admin(user)
+
+
+async def get_active_admin_read_user(user: User = Depends(get_current_primary_user) ):
+    # for routes on get_read_db, checked on the primary
+    return check_active_admin(user)
+
+
+def check_active_admin(user: User) -> User:
     if not user.active:
         raise HTTPException(status_code=400, detail="Inactive user.")
     if not user.account_type == "admin":
@@ -115,7 +140,7 @@ async def get_active_admin_user(user: User = Depends(get_current_user) ):
 
 async def get_active_user_from_cookie(
     request: Request,
-    db_session: Session = Depends(get_db),
+    db_session: AsyncSession = Depends(get_db),
     Authorize: AuthJWT = Depends()
 ):
 
@@ -125,14 +150,14 @@ async def get_active_user_from_cookie(
     # admin user
     admin = token.get('admin', False)
     if admin:
-        user = get_admin_user_by_email(db_session, token.get('sub'))
+        user = await get_admin_user_by_email(db_session, token.get('sub'))
         if user is None or not user.active:
             raise CREDENTIALS_EXCEPTION
         return user
 
     filer = token.get('filer', False)
     if filer:
-        user = get_filer_user_by_email(db_session, token.get('sub'))
+        user = await get_filer_user_by_email(db_session, token.get('sub'))
         if user is None or not user.active:
             raise CREDENTIALS_EXCEPTION
         return user
@@ -143,18 +168,18 @@ async def get_active_user_from_cookie(
 
 # authentication
 
-def authenticate_admin_user(
-    db_session: Session, email: str, password: str):
-    user = get_admin_user_by_email(db_session, email)
+async def authenticate_admin_user(
+    db_session: AsyncSession, email: str, password: str):
+    user = await get_admin_user_by_email(db_session, email)
     if not user:
         return False
     if not verify_password(password, user.password_hash):
         return False
     return user
 
-def authenticate_filer_user(
-    db_session: Session, email: str, password: str):
-    user = get_filer_user_by_email(db_session, email)
+async def authenticate_filer_user(
+    db_session: AsyncSession, email: str, password: str):
+    user = await get_filer_user_by_email(db_session, email)
     if not user:
         return False
     if not verify_password(password, user.password_hash):
@@ -162,11 +187,11 @@ def authenticate_filer_user(
     return user
 
 
-def saml_verify_admin_user(
-    db_session: Session,
+async def saml_verify_admin_user(
+    db_session: AsyncSession,
     email: str
 ):
-    user = get_admin_user_by_email(db_session, email)
+    user = await get_admin_user_by_email(db_session, email)
     if not user or not user.city:
         return False
     return user
@@ -185,8 +210,8 @@ def create_access_token(*, data: dict, expires_delta: datetime.timedelta = None)
     return encoded_jwt
 
 
-def get_access_token(db_session: Session, form):
-    user = authenticate_user(db_session, form.username, form.password)
+async def get_access_token(db_session: AsyncSession, form):
+    user = await authenticate_user(db_session, form.username, form.password)
 
     if not user:
         logging.info("Unregistered user attempted login: '%s'", form.username)
@@ -201,17 +226,17 @@ def get_access_token(db_session: Session, form):
         try:
             user.last_login = datetime.datetime.now(tz=pytz.utc)
             db_session.add(user)
-            db_session.commit()
+            await db_session.commit()
         except Exception as inst:
             logging.error("Exception: e = %s", inst)
-            db_session.rollback()
+            await db_session.rollback()
 
     logging.info("Access token granted to user '%s'", form.username)
     return access_token
 
 
 async def set_user_password(
-    db_session: Session,
+    db_session: AsyncSession,
     payload: UserResetPassword
 ):
 
@@ -225,7 +250,7 @@ async def set_user_password(
     user_email = res['sub']
     email_code = res['email_code']
 
-    user = get_user_by_email(db_session, user_email)
+    user = await get_user_by_email(db_session, user_email)
 
     if user is None:
         logger.info(f"User {email} does not exist. Password reset fail.")
@@ -248,16 +273,16 @@ async def set_user_password(
     hashed_password = get_password_hash(payload.password)
     user.password_hash = hashed_password
 
-    db_session.commit()
+    await db_session.commit()
 
     return True
 
 async def user_password_reset_request(
-    db_session: Session,
+    db_session: AsyncSession,
     payload: ResetPasswordRequest
 ):
     user_email = payload.email
-    user = get_user_by_email(db_session, user_email)
+    user = await get_user_by_email(db_session, user_email)
 
     # we don't tell the submitter if the account doesn't exist
     if user is None:
@@ -316,7 +341,8 @@ async def user_password_reset_request(
         recipients=recipients,
         to_id=user.id,
     )
-    
+
+    await db_session.commit()
 
     return True
     
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 from pydantic import BaseModel
 #from fastapi.security import OAuth2PasswordBearer
@@ -46,8 +47,62 @@ class AuthJWTSettings(BaseModel):
 # [Database]
 
 PG_URI = os.getenv("PG_URI")
+PG_ASYNC_URI = os.getenv("PG_ASYNC_URI")
+if PG_ASYNC_URI is None and PG_URI is not None:
+    # same database, asyncpg driver
+    PG_ASYNC_URI = "postgresql+asyncpg://" + PG_URI.split("://", 1)[1]
 PG_BACKUP_USER_PASS = os.getenv("PG_BACKUP_USER_PASS","postgres:")
 
+# read replica for the public / read only endpoints,
+# reads go to the primary if this isn't set
+PG_REPLICA_URI = os.getenv("PG_REPLICA_URI") or None
+if PG_REPLICA_URI is not None and "+asyncpg" not in PG_REPLICA_URI:
+    PG_REPLICA_URI = "postgresql+asyncpg://" + PG_REPLICA_URI.split("://", 1)[1]
+
+# pool settings, per engine
+PG_POOL_SIZE = int(os.getenv("PG_POOL_SIZE", 5))
+PG_MAX_OVERFLOW = int(os.getenv("PG_MAX_OVERFLOW", 10))
+PG_POOL_RECYCLE = int(os.getenv("PG_POOL_RECYCLE", 1800))
+PG_REPLICA_POOL_SIZE = int(os.getenv("PG_REPLICA_POOL_SIZE", PG_POOL_SIZE))
+PG_REPLICA_MAX_OVERFLOW = int(os.getenv("PG_REPLICA_MAX_OVERFLOW", PG_MAX_OVERFLOW))
+PG_REPLICA_POOL_RECYCLE = int(os.getenv("PG_REPLICA_POOL_RECYCLE", PG_POOL_RECYCLE))
+
+# warn when one statement shape runs more than this many times
+# in a single request (0 turns the check off)
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", 5))
+
+# most filers / lobbying entities a public search returns filings for,
+# the best ranked ones
+SEARCH_MAX_MATCHES = int(os.getenv("SEARCH_MAX_MATCHES", 100))
+# filings per search page, default and cap, and how far the total counts
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", 50))
+SEARCH_PAGE_MAX = int(os.getenv("SEARCH_PAGE_MAX", 200))
+SEARCH_COUNT_CAP = int(os.getenv("SEARCH_COUNT_CAP", 1000))
+# rows fetched from the server side cursor at a time by the export
+SEARCH_EXPORT_BATCH_SIZE = int(os.getenv("SEARCH_EXPORT_BATCH_SIZE", 500))
+# seconds a write waits before public_filing_index is refreshed, writes
+# in between share the refresh
+PUBLIC_INDEX_REFRESH_DELAY = float(os.getenv("PUBLIC_INDEX_REFRESH_DELAY", 5))
+# longest amendment chain followed (document metadata, search lineage)
+AMENDMENT_CHAIN_MAX_DEPTH = int(os.getenv("AMENDMENT_CHAIN_MAX_DEPTH", 100))
+# fuzzy=true search: least trigram word similarity (0-1) of a name
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", 0.5))
+# admin filer search: results per keystroke, and how often (seconds) the
+# in memory index picks up changed filers / lobbying entities
+TYPEAHEAD_LIMIT = int(os.getenv("TYPEAHEAD_LIMIT", 10))
+TYPEAHEAD_SYNC_INTERVAL = int(os.getenv("TYPEAHEAD_SYNC_INTERVAL", 5))
+
+# [Cache]
+
+# public search / document metadata results: "redis" (shared, REDIS_URL),
+# "none", or "memory" (per worker LRU, only for a single worker: other
+# workers never see its invalidations). redis when REDIS_URL is set,
+# otherwise none.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND") or ("redis" if os.getenv("REDIS_URL") else "none")
+CACHE_TTL = int(os.getenv("CACHE_TTL", 300))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+REDIS_URL = os.getenv("REDIS_URL") or "redis://localhost:6379/0"
+
 # [Authentication]
 
 SAML_ACS_URL_ADMIN = API_HOST+API_PREFIX+"/auth/admin/saml/sso/csd"
@@ -58,11 +113,24 @@ SAML_ENTITY_ID_ADMIN = API_HOST+API_PREFIX+"/auth/admin/saml/metadata"
 SAML_ENTITY_ID_FILER = API_HOST+API_PREFIX+"/auth/filer/saml/metadata"
 SAML_SP_METADATA_ADMIN = os.getenv("SAML_SP_METADATA_ADMIN")
 SAML_SP_METADATA_FILER = os.getenv("SAML_SP_METADATA_FILER")
+# IdP metadata / client cache, seconds. After the ttl the cached client
+# is still served while it is refreshed in the background, after
+# max stale logins wait for a fresh copy. A failed fetch is not retried
+# for retry after seconds, logins in the meantime get its error.
+SAML_METADATA_TTL = int(os.getenv("SAML_METADATA_TTL", 3600))
+SAML_METADATA_MAX_STALE = int(os.getenv("SAML_METADATA_MAX_STALE", 86400))
+SAML_METADATA_RETRY_AFTER = int(os.getenv("SAML_METADATA_RETRY_AFTER", 30))
 
 # [AWS]
 S3_AWS_ACCESS_KEY_ID = os.getenv("S3_AWS_ACCESS_KEY_ID")
 S3_AWS_SECRET_ACCESS_KEY = os.getenv("S3_AWS_SECRET_ACCESS_KEY")
 S3_AWS_REGION = os.getenv("S3_AWS_REGION")
+# an S3 compatible server instead of AWS (minio, moto server, ...)
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+# S3 requests in flight per worker, and the size from which uploads
+# are multipart (also the part size)
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", 10))
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024))
 
 if EFILE_ENV in ['prod','production']:
     S3_PUBLIC_BUCKET = "efile-sd-public"
@@ -71,6 +139,34 @@ else:
     S3_PUBLIC_BUCKET = "efile-sd-public-"+EFILE_ENV
     S3_PRIVATE_BUCKET = "efile-sd-private-"+EFILE_ENV
 
+# presigned document urls: lifetime, reused until this many seconds
+# before they expire (what clients and the CDN may cache them for)
+DOCUMENT_URL_TTL = int(os.getenv("DOCUMENT_URL_TTL", 3600))
+DOCUMENT_URL_REFRESH_MARGIN = int(os.getenv("DOCUMENT_URL_REFRESH_MARGIN", 300))
+DOCUMENT_URL_BATCH_LIMIT = int(os.getenv("DOCUMENT_URL_BATCH_LIMIT", 100))
+# /public/document/{doc_id}/content: on disk LRU of whole documents, and
+# the chunk size documents are streamed in
+DOCUMENT_CACHE_DIR = (os.getenv("DOCUMENT_CACHE_DIR")
+                      or os.path.join(tempfile.gettempdir(), "efile-documents"))
+DOCUMENT_CACHE_MAX_BYTES = int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+DOCUMENT_CACHE_MAX_ITEM_BYTES = int(os.getenv("DOCUMENT_CACHE_MAX_ITEM_BYTES", 64 * 1024 * 1024))
+DOCUMENT_STREAM_CHUNK_SIZE = int(os.getenv("DOCUMENT_STREAM_CHUNK_SIZE", 256 * 1024))
+
+# filer uploads (/filer/document): largest file, accepted types
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+UPLOAD_MIME_TYPES = os.getenv(
+    "UPLOAD_MIME_TYPES", "application/pdf,image/png,image/jpeg").split(",")
+
+# [Rendering]
+# filed filings' pdfs are rendered in this many processes per worker.
+# A failed render is retried after RENDER_RETRY_DELAY seconds, doubling,
+# until RENDER_MAX_ATTEMPTS; one running for RENDER_STALE_AFTER seconds
+# is taken to have died with its worker and run again.
+RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES", 2))
+RENDER_MAX_ATTEMPTS = int(os.getenv("RENDER_MAX_ATTEMPTS", 5))
+RENDER_RETRY_DELAY = int(os.getenv("RENDER_RETRY_DELAY", 30))
+RENDER_STALE_AFTER = int(os.getenv("RENDER_STALE_AFTER", 600))
+
 # [User creds]
 HUMAN_READABLE_ID_PREFIX = "CSD"
 
@@ -0,0 +1,117 @@
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import DB_N_PLUS_ONE_THRESHOLD
+from app.db.session import async_engine, read_async_engine
+
+
+# per request sql stats
+#
+# the middleware sets a DbStats for the request, get_db hands it to
+# the session (session.info), and the session passes it on to the
+# connection it checks out. The cursor hooks only look at the connection,
+# which works the same inside sqlalchemy's async greenlets.
+
+request_db_stats = ContextVar("request_db_stats", default=None)
+
+
+class DbStats:
+
+    def __init__(self):
+        self.statements = 0
+        self.time_ms = 0.0
+        self.rows = 0
+        self.shapes = Counter()
+
+    def add(self, statement, elapsed_ms, rowcount):
+        self.statements += 1
+        self.time_ms += elapsed_ms
+        if rowcount is not None and rowcount > 0:
+            self.rows += rowcount
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold=DB_N_PLUS_ONE_THRESHOLD):
+        # statement shapes that ran more than threshold times
+        if not threshold:
+            return []
+        return [(shape, n) for shape, n in self.shapes.most_common()
+                if n > threshold]
+
+
+def start_request_stats():
+    stats = DbStats()
+    token = request_db_stats.set(stats)
+    return stats, token
+
+
+def end_request_stats(token):
+    request_db_stats.reset(token)
+
+
+def session_info():
+    # info dict for a new request session
+    return {"db_stats": request_db_stats.get()}
+
+
+# statement normalization
+
+_WS_RE = re.compile(r"\s+")
+_PARAM_RE = re.compile(r"\$\d+|%\(\w+\)s|%s|\?|:\w+")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+def statement_shape(statement):
+    shape = _WS_RE.sub(" ", statement).strip()
+    shape = _PARAM_RE.sub("?", shape)
+    shape = _LITERAL_RE.sub("?", shape)
+    # IN (?, ?, ?) -> IN (?), the list length shouldn't make a new shape
+    shape = _IN_LIST_RE.sub("(?)", shape)
+    return shape
+
+
+# event hooks
+
+def _after_begin(session, transaction, connection):
+    connection.info["db_stats"] = session.info.get("db_stats")
+
+
+def cursor_rows(cursor):
+    """Rows a statement returned, or changed when it returns none."""
+    if cursor.description is not None and not getattr(cursor, "server_side", False):
+        # the asyncpg adapter fetches a result up front but leaves
+        # rowcount at -1 for SELECT, count what it fetched
+        rows = getattr(cursor, "_rows", None)
+        if rows is not None:
+            return len(rows)
+    return getattr(cursor, "rowcount", None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = conn.info["query_start"].pop()
+    stats = conn.info.get("db_stats")
+    if stats is None:
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    stats.add(statement, elapsed_ms, cursor_rows(cursor))
+
+
+def instrument_engine(engine):
+    if not event.contains(engine, "before_cursor_execute",
+                          _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+event.listen(Session, "after_begin", _after_begin)
+instrument_engine(async_engine.sync_engine)
+instrument_engine(read_async_engine.sync_engine)
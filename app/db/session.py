@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import scoped_session, sessionmaker
 from app.core import config
 
@@ -13,3 +14,36 @@ db_session = scoped_session(
 
 LocalSession = sessionmaker(autocommit=False, autoflush=False,
                             bind=engine, future=True)
+
+# async db used by the api, the sync engine above is kept
+# for scripts and db management helpers
+
+async_engine = create_async_engine(config.PG_ASYNC_URI,
+                                   pool_pre_ping=True,
+                                   pool_size=config.PG_POOL_SIZE,
+                                   max_overflow=config.PG_MAX_OVERFLOW,
+                                   pool_recycle=config.PG_POOL_RECYCLE)
+
+# we don't expire on commit, otherwise every attribute access
+# after a commit would need another (awaited) round trip
+AsyncLocalSession = sessionmaker(autocommit=False, autoflush=False,
+                                 bind=async_engine, class_=AsyncSession,
+                                 expire_on_commit=False)
+
+# read replica, used by the public and read only admin endpoints.
+# without a replica reads share the primary engine (and its pool)
+
+if config.PG_REPLICA_URI is not None:
+    read_async_engine = create_async_engine(
+        config.PG_REPLICA_URI,
+        pool_pre_ping=True,
+        pool_size=config.PG_REPLICA_POOL_SIZE,
+        max_overflow=config.PG_REPLICA_MAX_OVERFLOW,
+        pool_recycle=config.PG_REPLICA_POOL_RECYCLE
+    )
+else:
+    read_async_engine = async_engine
+
+AsyncReadSession = sessionmaker(autocommit=False, autoflush=False,
+                                bind=read_async_engine, class_=AsyncSession,
+                                expire_on_commit=False)
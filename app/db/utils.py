@@ -1,3 +1,4 @@
+import os
 import sys
 from sqlalchemy import create_engine, inspect
 from sqlalchemy.schema import CreateSchema
@@ -9,20 +10,35 @@ from app.db.helpers import (
 )
 from app.core.config import PG_URI
 from app.db.session import (
-    LocalSession
+    AsyncLocalSession,
+    AsyncReadSession
 )
+from app.db.instrumentation import session_info
 
 # helpers
 
 
-def get_db():
-    try:
-        db_session = LocalSession()
+async def get_db():
+    async with AsyncLocalSession(info=session_info()) as db_session:
         yield db_session
-    finally:
-        db_session.close()
 
 
+async def get_read_db():
+    # read only, may be served by the replica
+    async with AsyncReadSession(info=session_info()) as db_session:
+        yield db_session
+
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini")
+
+
+def migrate_db(revision="head"):
+    # imported here, only needed for db management
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(ALEMBIC_INI), revision)
+
 
 def create_db():
     if not check_if_db_exists(PG_URI):
@@ -30,6 +46,10 @@ def create_db():
     engine = create_engine(PG_URI)
     CustomBase.metadata.create_all(engine)
 
+    # indexes etc. live in the migrations, they are idempotent
+    # so this is fine on a fresh db as well
+    migrate_db()
+
     return engine
     
 
@@ -1,7 +1,9 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_jwt_auth.exceptions import AuthJWTException
 import logging
+import logging.config
 from app.utils.exception_handlers import authjwt_exception_handler
 from app.core.config import API_PREFIX
 from app.api import (
@@ -20,9 +22,11 @@ from app.api import (
 #from app.core.config import users_router_prefix
 from app.utils.openapi_schema import make_custom_openapi
 from app.middlewares.custom_logger import CustomLoggerMiddleware
+from app.utils.auth_saml import saml_client_cache
+from app.utils.typeahead import typeahead_index
+from app.api.utility.render_jobs import pdf_renderer
 
 app = FastAPI(root_path=API_PREFIX)
-logging.config.fileConfig('app/core/logging.conf', disable_existing_loggers=False)
 
 origins = [
     "https://efile.pasadev.com",
@@ -55,4 +59,28 @@ app.include_router(public.router, prefix="/public", tags=["public"])
 
 app.add_exception_handler(AuthJWTException, authjwt_exception_handler)
 
+
+@app.on_event("startup")
+async def configure_logging():
+    # at startup rather than import, so importing the app stays cheap
+    logging.config.fileConfig('app/core/logging.conf', disable_existing_loggers=False)
+
+
+@app.on_event("startup")
+async def warm_up_saml():
+    # in the background: an unreachable IdP takes its retries, startup
+    # doesn't wait for them
+    asyncio.ensure_future(saml_client_cache.warm_up())
+
+
+@app.on_event("startup")
+async def warm_up_typeahead():
+    typeahead_index.warm_up()
+
+
+@app.on_event("startup")
+async def resume_rendering():
+    # jobs queued or cut short before this worker started
+    pdf_renderer.request()
+
 app.openapi = make_custom_openapi(app)
@@ -7,6 +7,7 @@ from fastapi_jwt_auth.exceptions import AuthJWTException
 from starlette.middleware.base import BaseHTTPMiddleware
 import json
 from app.core.config import AuthJWTSettings
+from app.db.instrumentation import start_request_stats, end_request_stats
 
 # this needs to be in each file
 @AuthJWT.load_config
@@ -37,11 +38,22 @@ class CustomLoggerMiddleware(BaseHTTPMiddleware):
             except AuthJWTException as e:
                 username = None
 
-        response = await call_next(request)
+        db_stats, token = start_request_stats()
+        try:
+            response = await call_next(request)
+        finally:
+            end_request_stats(token)
         process_time = (time.time() - start_time) * 1000
         response.headers["X-Process-Time"] = f"{process_time:.2f}"
+        response.headers["X-DB-Statements"] = str(db_stats.statements)
+        response.headers["X-DB-Time"] = f"{db_stats.time_ms:.2f}"
+        response.headers["X-DB-Rows"] = str(db_stats.rows)
 
-        general_logger.info(f"{request.client.host} {request.method} {request.url.path} {response.status_code} {process_time:.2f}")
+        general_logger.info(f"{request.client.host} {request.method} {request.url.path} {response.status_code} {process_time:.2f} "
+                            f"db={db_stats.statements} db_time={db_stats.time_ms:.2f} db_rows={db_stats.rows}")
+
+        for shape, count in db_stats.repeated():
+            general_logger.warning(f"possible n+1: {request.method} {request.url.path} ran {count}x: {shape[:300]}")
 
         if username != None:
             msg = f"{request.client.host} {username} {request.method} {request.url.path} {response.status_code} {process_time:.2f}"
@@ -0,0 +1,67 @@
+import os
+import sys
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+sys.path.append(os.getcwd())
+from app.core.config import PG_URI
+from app.models.bases import CustomBase
+
+# import all models so the metadata is complete
+from app.models import (  # noqa: F401
+    authorization,
+    config as models_config,
+    documents,
+    entities,
+    filers,
+    filings,
+    forms,
+    humane_ids,
+    lobbyist_detail,
+    master_data,
+    messages,
+    notes,
+    search,
+    tasks,
+    users,
+)
+
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = CustomBase.metadata
+
+
+def run_migrations_offline():
+    # emit sql to stdout instead of running it
+    context.configure(
+        url=PG_URI,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    engine = create_engine(PG_URI, poolclass=pool.NullPool)
+
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,93 @@
+"""performance indexes for the crud filters
+
+Revision ID: 0001
+Revises:
+Create Date: 2021-03-01
+
+Indexes are built with CREATE INDEX CONCURRENTLY so the migration can
+run against a live database. Concurrent builds can't run inside a
+transaction, hence the autocommit block. IF NOT EXISTS keeps this safe
+to re-run, e.g. after a failed concurrent build was dropped.
+
+Already covered by primary keys / unique constraints and not repeated
+here: filing_raw.filing_id, e_filing_id.filing_id,
+human_readable_id.object_id, message_template_message_type.message_type.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns / expressions)
+INDEXES = [
+    # filing
+    ("idx_filing_doc_public", "filing", "(doc_public)"),
+    ("idx_filing_amends_prev_id", "filing", "(amends_prev_id)"),
+    ("idx_filing_amends_orig_id", "filing", "(amends_orig_id)"),
+    # latest filing by entity / type / year, also serves entity_id alone
+    ("idx_filing_entity_type_period", "filing",
+     "(entity_id, filing_type, period_start)"),
+    # public search: filer_id IN (...) ORDER BY filing_date DESC
+    ("idx_filing_filer_filing_date", "filing", "(filer_id, filing_date DESC)"),
+    ("idx_filing_subtype_filing_id", "filing_subtype", "(filing_id)"),
+
+    # filers, lower(last_name) = x and lower(last_name) LIKE 'x%'
+    ("idx_filer_contact_info_lower_last_name", "filer_contact_info",
+     "(lower(last_name) text_pattern_ops)"),
+    ("idx_filer_contact_info_filer_id", "filer_contact_info", "(filer_id)"),
+    ("idx_filer_user_id", "filer", "(user_id)"),
+    ("idx_filer_email", "filer", "(email)"),
+    ("idx_filer_netfile_user_id", "filer", "(netfile_user_id)"),
+    ("idx_filer_filer_type_filer_id", "filer_filer_type", "(filer_id)"),
+
+    # users
+    ("idx_user_email_account_type", '"user"', "(email, account_type)"),
+
+    # tasks
+    ("idx_task_task_ref", "task", "(task_ref)"),
+    ("idx_task_admin_complete_updated", "task",
+     "(admin_task, complete, updated)"),
+
+    # lobbying entities
+    ("idx_lobbying_entity_contact_info_entity_updated",
+     "lobbying_entity_contact_info", "(entity_id, updated DESC)"),
+    ("idx_lobbying_entity_contact_info_lower_name",
+     "lobbying_entity_contact_info", "(lower(name))"),
+    ("idx_lobbying_entity_filer_filer_entity", "lobbying_entity_filer",
+     "(filer_id, entity_id)"),
+    ("idx_lobbying_entity_lobbyist_type_entity_id",
+     "lobbying_entity_lobbyist_type", "(entity_id)"),
+
+    # registration details, read by filing_id ordered by ordinal
+    ("idx_lobbying_filing_lobbyist_filing_ordinal", "lobbying_filing_lobbyist",
+     "(filing_id, ordinal)"),
+    ("idx_lobbying_filing_client_filing_ordinal", "lobbying_filing_client",
+     "(filing_id, ordinal)"),
+    ("idx_lobbying_filing_muni_decision_filing_ordinal",
+     "lobbying_filing_muni_decision", "(filing_id, ordinal)"),
+
+    # config lookup
+    ("idx_filing_config_lookup", "filing_config",
+     "(filing_group, filing_type, filing_year, key)"),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} {columns}"
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,112 @@
+"""full text search documents for the public search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2021-03-08
+
+One row per filer / lobbying entity with a tsvector over every name it
+was filed under plus its human readable and e-filing ids. The app keeps
+the rows current (app.models.crud.search), this creates the table,
+backfills it and adds the GIN index.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# the backfill as of this revision, frozen: the app's copies
+# (app.models.crud.search) may change, this revision must not
+
+FILER_DOCUMENTS_SQL = """
+INSERT INTO search_document (object_type, object_id, filer_id, names,
+                             document, updated)
+SELECT 'filer', f.filer_id, f.filer_id, n.names,
+       setweight(to_tsvector('simple', coalesce(n.last_names, '')), 'A')
+       || setweight(to_tsvector('simple', coalesce(n.other_names, '')), 'B')
+       || setweight(to_tsvector('simple', concat_ws(' ', hr.hr_id, e.ids)),
+                    'C'),
+       now()
+FROM filer f
+LEFT JOIN LATERAL (
+    SELECT string_agg(DISTINCT ci.last_name, ' ') AS last_names,
+           string_agg(DISTINCT concat_ws(' ', ci.first_name, ci.middle_name),
+                      ' ') AS other_names,
+           string_agg(DISTINCT concat_ws(' ', ci.first_name, ci.last_name),
+                      '; ') AS names
+    FROM filer_contact_info ci
+    WHERE ci.filer_id = f.filer_id
+) n ON true
+LEFT JOIN human_readable_id hr ON hr.object_id = f.filer_id
+LEFT JOIN LATERAL (
+    SELECT string_agg(fi.e_filing_id, ' ') AS ids
+    FROM filing fi
+    WHERE fi.filer_id = f.filer_id AND fi.entity_id IS NULL
+) e ON true
+WHERE true
+ON CONFLICT (object_type, object_id) DO UPDATE
+SET filer_id = EXCLUDED.filer_id, names = EXCLUDED.names,
+    document = EXCLUDED.document, updated = EXCLUDED.updated
+"""
+
+LOBBYING_ENTITY_DOCUMENTS_SQL = """
+INSERT INTO search_document (object_type, object_id, filer_id, names,
+                             document, updated)
+SELECT 'lobbying_entity', le.entity_id, le.netfile_filer_id, n.names,
+       setweight(to_tsvector('simple', coalesce(n.names, '')), 'A')
+       || setweight(to_tsvector('simple', concat_ws(' ', hr.hr_id, e.ids)),
+                    'C'),
+       now()
+FROM lobbying_entity le
+LEFT JOIN LATERAL (
+    SELECT string_agg(DISTINCT ci.name, '; ') AS names
+    FROM lobbying_entity_contact_info ci
+    WHERE ci.entity_id = le.entity_id
+) n ON true
+LEFT JOIN human_readable_id hr ON hr.object_id = le.entity_id
+LEFT JOIN LATERAL (
+    SELECT string_agg(fi.e_filing_id, ' ') AS ids
+    FROM filing fi
+    WHERE fi.entity_id = le.entity_id
+) e ON true
+WHERE true
+ON CONFLICT (object_type, object_id) DO UPDATE
+SET filer_id = EXCLUDED.filer_id, names = EXCLUDED.names,
+    document = EXCLUDED.document, updated = EXCLUDED.updated
+"""
+
+
+def upgrade():
+    # create_db may have made the table already, from the model
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS search_document (
+            object_type VARCHAR NOT NULL,
+            object_id UUID NOT NULL,
+            filer_id UUID,
+            names VARCHAR,
+            document TSVECTOR NOT NULL,
+            updated TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+            PRIMARY KEY (object_type, object_id)
+        )
+    """)
+
+    op.execute(FILER_DOCUMENTS_SQL)
+    op.execute(LOBBYING_ENTITY_DOCUMENTS_SQL)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_search_document_document "
+            "ON search_document USING GIN (document)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_search_document_filer_id "
+            "ON search_document (filer_id)"
+        )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS search_document")
@@ -0,0 +1,32 @@
+"""index for the keyset paged public search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2021-03-10
+
+/public/search pages on (filing date, filing_id) per matched filer,
+null filing dates sort as the oldest.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_filing_filer_sort_date "
+            "ON filing (filer_id, COALESCE(filing_date, '-infinity'::timestamp) "
+            "DESC, filing_id DESC)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_filing_filer_sort_date")
@@ -0,0 +1,53 @@
+"""fuzzy and phonetic name matching for the search
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2021-03-14
+
+Trigram index on the names of the search documents (every name a filer
+/ lobbying entity was filed under), and the double metaphone keys of
+those names behind an expression index, for search ... fuzzy=true.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS fuzzystrmatch")
+
+    # immutable, it is indexed. Schema qualified, index expressions must
+    # not depend on the search_path.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION search_phonetic_keys(names TEXT)
+        RETURNS TEXT[] LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT COALESCE(array_agg(DISTINCT public.dmetaphone(w)), '{}')
+            FROM regexp_split_to_table(lower(names), '[^[:alnum:]]+') w
+            WHERE public.dmetaphone(w) <> ''
+        $$
+    """)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_search_document_names_trgm "
+            "ON search_document USING GIN (names public.gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_search_document_phonetic "
+            "ON search_document USING GIN (public.search_phonetic_keys(names))"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_search_document_phonetic")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_search_document_names_trgm")
+
+    op.execute("DROP FUNCTION IF EXISTS search_phonetic_keys(TEXT)")
@@ -0,0 +1,53 @@
+"""filing lineage
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2021-03-16
+
+One row per filing: the original of its amendment chain, its version
+and whether it is the latest filed version. The app writes the rows with
+the filings (app.models.crud.filings), this creates the table, backfills
+it and adds the indexes. app/scripts/backfill_lineage.py re-runs the
+backfill, e.g. after bulk loads.
+
+"""
+from alembic import op
+from app.models.crud.filings import backfill_filing_lineage_sql
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_db may have made the table already, from the model
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS filing_lineage (
+            filing_id UUID NOT NULL REFERENCES filing (filing_id),
+            orig_id UUID NOT NULL,
+            version INTEGER NOT NULL,
+            latest BOOLEAN DEFAULT false NOT NULL,
+            updated TIMESTAMP WITH TIME ZONE NOT NULL,
+            PRIMARY KEY (filing_id)
+        )
+    """)
+
+    for sql in backfill_filing_lineage_sql():
+        op.execute(sql)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_filing_lineage_orig "
+            "ON filing_lineage (orig_id, version)"
+        )
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+            "idx_filing_lineage_latest ON filing_lineage (orig_id) WHERE latest"
+        )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS filing_lineage")
@@ -0,0 +1,76 @@
+"""public filing index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2021-03-18
+
+Materialized view with one row per public filing and what the public
+search and document metadata show of it. The unique index on filing_id
+is what lets the app refresh it concurrently.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# the view as of this revision, frozen: the app's copy
+# (app.models.crud.search) may change, later versions are new revisions
+PUBLIC_FILING_INDEX_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS public_filing_index AS
+SELECT f.filing_id,
+       CASE WHEN f.entity_id IS NULL THEN 0 ELSE 1 END AS kind,
+       f.filer_id, f.entity_id, f.filing_date,
+       COALESCE(f.filing_date, '-infinity'::timestamp) AS sort_date,
+       f.period_start, f.filing_type, f.doc_public, f.e_filing_id,
+       f.amendment, f.amends_orig_id, f.amends_prev_id, f.amendment_number,
+       fs.filing_subtype, ci.first_name, ci.last_name, lci.name AS filer,
+       orig.e_filing_id AS orig_e_filing_id,
+       prev.e_filing_id AS prev_e_filing_id
+FROM filing f
+LEFT JOIN LATERAL (
+    SELECT string_agg(DISTINCT s.filing_subtype, ', ') AS filing_subtype
+    FROM filing_subtype s WHERE s.filing_id = f.filing_id
+) fs ON f.entity_id IS NULL
+LEFT JOIN LATERAL (
+    SELECT c.first_name, c.last_name FROM filer_contact_info c
+    WHERE c.filer_id = f.filer_id
+    ORDER BY c.effective_date DESC NULLS LAST, c.id DESC LIMIT 1
+) ci ON f.entity_id IS NULL
+LEFT JOIN LATERAL (
+    SELECT c.entity_id, c.name FROM lobbying_entity_contact_info c
+    WHERE c.entity_id = f.entity_id
+    ORDER BY c.effective_date DESC NULLS LAST, c.id DESC LIMIT 1
+) lci ON f.entity_id IS NOT NULL
+LEFT JOIN e_filing_id orig
+       ON f.amendment AND orig.filing_id = f.amends_orig_id
+LEFT JOIN e_filing_id prev
+       ON f.amendment AND prev.filing_id = f.amends_prev_id
+WHERE fs.filing_subtype IS NOT NULL OR lci.entity_id IS NOT NULL
+"""
+
+
+def upgrade():
+    op.execute(PUBLIC_FILING_INDEX_SQL)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+            "idx_public_filing_index_filing_id ON public_filing_index (filing_id)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_public_filing_index_filer "
+            "ON public_filing_index (filer_id, kind, sort_date DESC, filing_id DESC)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_public_filing_index_doc "
+            "ON public_filing_index (doc_public)"
+        )
+
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS public_filing_index")
@@ -0,0 +1,52 @@
+"""render jobs
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2021-03-22
+
+The queue of filed filings whose documents still need rendering
+(app.api.utility.render_jobs). Workers claim due jobs with SKIP LOCKED, the
+partial index keeps that scan to the jobs that are not finished.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_db may have made the table already, from the model
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS render_job (
+            id SERIAL NOT NULL,
+            filing_id UUID NOT NULL REFERENCES filing (filing_id),
+            template VARCHAR NOT NULL,
+            template_version INTEGER NOT NULL,
+            status VARCHAR DEFAULT 'queued' NOT NULL,
+            attempts INTEGER DEFAULT '0' NOT NULL,
+            error VARCHAR,
+            run_after TIMESTAMP WITH TIME ZONE NOT NULL,
+            created TIMESTAMP WITH TIME ZONE NOT NULL,
+            updated TIMESTAMP WITH TIME ZONE NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_render_job_filing_id "
+            "ON render_job (filing_id)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_render_job_due "
+            "ON render_job (run_after, id) WHERE status IN ('queued', 'rendering')"
+        )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS render_job")
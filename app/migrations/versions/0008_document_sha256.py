@@ -0,0 +1,26 @@
+"""document sha256
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2021-03-24
+
+The SHA-256 of a document's content, computed while it is stored
+(filer uploads, the NetFile import).
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE document ADD COLUMN IF NOT EXISTS sha256 VARCHAR")
+
+
+def downgrade():
+    op.execute("ALTER TABLE document DROP COLUMN IF EXISTS sha256")
@@ -0,0 +1,33 @@
+"""drop the filing sort index of the keyset paged search
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2021-03-26
+
+The public search pages over public_filing_index (0006) and its own
+index now, nothing reads the index 0003 added on filing, every write
+to filing still had to maintain it.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_filing_filer_sort_date")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_filing_filer_sort_date "
+            "ON filing (filer_id, COALESCE(filing_date, '-infinity'::timestamp) "
+            "DESC, filing_id DESC)"
+        )
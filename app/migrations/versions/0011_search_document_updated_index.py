@@ -0,0 +1,33 @@
+"""index search documents by type and update time
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2021-03-29
+
+The typeahead sync (get_typeahead_entries) reads the documents of a
+type updated since its last run, every TYPEAHEAD_SYNC_INTERVAL
+seconds. Without an index on updated each due sync scanned
+search_document.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_search_document_updated "
+            "ON search_document (object_type, updated)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_search_document_updated")
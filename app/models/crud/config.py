@@ -1,24 +1,24 @@
 from typing import Optional
 from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.config import (
     FilingConfig
 )
 
 async def get_filing_config_key(
-    db_session: Session,
+    db_session: AsyncSession,
     key: str,
     filing_group: str,
     filing_type: str,
     year: str,
 ) -> Optional[FilingConfig]:
-    res = db_session.execute(
+    res = (await db_session.execute(
         select(FilingConfig)
         .filter(FilingConfig.filing_group == filing_group)
         .filter(FilingConfig.filing_type == filing_type)
         .filter(FilingConfig.filing_year == year)
         .filter(FilingConfig.key == key)
-    ).unique().scalar()
+    )).unique().scalar()
 
     return res
     
@@ -0,0 +1,179 @@
+import logging
+import datetime
+from typing import List, Optional
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.documents import Document, RenderJob
+
+logger = logging.getLogger("fastapi")
+
+
+# where each of :doc_ids is stored, if it may be shown publicly: a
+# public document row, or the public pdf of a filing in
+# public_filing_index (filing_type locates filings filed before there
+# were document rows). One round trip for any number of ids.
+PUBLIC_DOCUMENTS_SQL = """
+SELECT ids.doc_id, d.s3bucket, d.s3key, i.filing_type
+FROM unnest(CAST(:doc_ids AS varchar[])) AS ids(doc_id)
+LEFT JOIN document d ON d.doc_id = ids.doc_id
+LEFT JOIN LATERAL (
+    SELECT filing_type FROM public_filing_index
+    WHERE doc_public = ids.doc_id
+    LIMIT 1
+) i ON true
+WHERE d.public OR i.filing_type IS NOT NULL
+"""
+
+
+async def get_public_documents(db_session: AsyncSession, doc_ids: List[str]) -> list:
+    if not doc_ids:
+        return []
+
+    res = (
+        (await db_session.execute(
+            text(PUBLIC_DOCUMENTS_SQL), {"doc_ids": list(doc_ids)}
+        ))
+        .all()
+    )
+
+    return res
+
+
+async def get_public_doc_id_by_filing_id(
+    db_session: AsyncSession, filing_id: str
+) -> Optional[str]:
+    res = (
+        (await db_session.execute(
+            text("""
+                SELECT doc_public FROM public_filing_index
+                WHERE filing_id = CAST(:filing_id AS uuid)
+            """),
+            {"filing_id": filing_id},
+        ))
+        .scalar()
+    )
+
+    return res
+
+
+async def upsert_document(db_session: AsyncSession, doc_id: str, **fields) -> Document:
+    document = (
+        (await db_session.execute(select(Document).filter(Document.doc_id == doc_id)))
+        .unique()
+        .scalar()
+    )
+
+    if document is None:
+        document = Document(doc_id=doc_id)
+    for key, value in fields.items():
+        setattr(document, key, value)
+
+    db_session.add(document)
+    await db_session.flush()
+
+    return document
+
+
+# render jobs
+async def insert_render_job(
+    db_session: AsyncSession, filing_id: str, template: str, template_version: int
+) -> RenderJob:
+
+    job = RenderJob(filing_id=filing_id, template=template,
+                    template_version=template_version, status="queued")
+    db_session.add(job)
+    await db_session.flush()
+
+    return job
+
+
+# up to :limit due jobs, for this worker: queued ones whose time has come
+# and rendering ones nobody finished within :stale seconds (the worker
+# died). SKIP LOCKED, so workers claiming at once get different jobs.
+CLAIM_RENDER_JOBS_SQL = """
+UPDATE render_job
+SET status = 'rendering', attempts = attempts + 1, updated = now()
+WHERE id IN (
+    SELECT id FROM render_job
+    WHERE (status = 'queued' AND run_after <= now())
+       OR (status = 'rendering' AND updated < now() - make_interval(secs => :stale))
+    ORDER BY run_after, id
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, CAST(filing_id AS VARCHAR) AS filing_id, template,
+          template_version, attempts
+"""
+
+
+async def claim_render_jobs(db_session: AsyncSession, limit: int, stale: int) -> list:
+    res = (
+        (await db_session.execute(
+            text(CLAIM_RENDER_JOBS_SQL), {"limit": limit, "stale": float(stale)}
+        ))
+        .all()
+    )
+
+    return res
+
+
+async def seconds_until_next_render_job(db_session: AsyncSession, stale: int):
+    """None when there is nothing left to render."""
+    res = (
+        (await db_session.execute(
+            text("""
+                SELECT EXTRACT(EPOCH FROM min(
+                    CASE WHEN status = 'queued' THEN run_after
+                         ELSE updated + make_interval(secs => :stale) END
+                ) - now())
+                FROM render_job
+                WHERE status IN ('queued', 'rendering')
+            """),
+            {"stale": float(stale)},
+        ))
+        .scalar()
+    )
+
+    return None if res is None else float(res)
+
+
+async def finish_render_job(
+    db_session: AsyncSession, job_id: int, status: str,
+    error: str = None, retry_in: int = None
+) -> Optional[RenderJob]:
+
+    job = (
+        (await db_session.execute(select(RenderJob).filter(RenderJob.id == job_id)))
+        .unique()
+        .scalar()
+    )
+
+    if job is None:
+        return None
+
+    job.status = status
+    job.error = error
+    if retry_in is not None:
+        job.run_after = (datetime.datetime.now(datetime.timezone.utc)
+                         + datetime.timedelta(seconds=retry_in))
+    await db_session.flush()
+
+    return job
+
+
+async def get_latest_render_job(
+    db_session: AsyncSession, filing_id: str
+) -> Optional[RenderJob]:
+
+    res = (
+        (await db_session.execute(
+            select(RenderJob)
+            .filter(RenderJob.filing_id == filing_id)
+            .order_by(RenderJob.id.desc())
+            .limit(1)
+        ))
+        .unique()
+        .scalar()
+    )
+
+    return res
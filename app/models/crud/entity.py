@@ -1,6 +1,6 @@
 from typing import Optional
 from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.encoders import jsonable_encoder
 from app.models.entities import (
     ENTITY_TYPES,
@@ -15,20 +15,20 @@ from app.models.entities import (
 # select
 
 async def get_current_lobbying_entity_contact_info_by_entity_id(
-    db_session: Session,
+    db_session: AsyncSession,
     entity_id: str,
 ):
-       return db_session.execute(
+       return (await db_session.execute(
             select(LobbyingEntityContactInfo)
             .filter(LobbyingEntityContactInfo.entity_id == entity_id)
             .order_by(LobbyingEntityContactInfo.created.desc())
-        ).scalars().first()
+        )).scalars().first()
 
 
 # insert
 
 async def insert_entity(
-    db_session: Session,
+    db_session: AsyncSession,
     entity_id: str,
     entity_type: str,
 ) -> Optional[Entity]:
@@ -1,20 +1,23 @@
 from typing import Optional
 from sqlalchemy import select
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from fastapi.encoders import jsonable_encoder
 from app.models.filers import Filer, FilerContactInfo, FilerFilerType
 from app.schemas.filer.filer import FilerBasic, FilerContactInfoSchema
+from app.models.crud.search import upsert_search_documents
+from app.utils.string_utils import to_date
 
 
 async def get_filer_by_netfile_user_id(
-    db_session: Session,
+    db_session: AsyncSession,
     netfile_user_id: str,
 ):
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(Filer).filter(Filer.netfile_user_id == netfile_user_id)
-        )
+        ))
         .unique()
         .scalar()
     )
@@ -22,19 +25,26 @@ async def get_filer_by_netfile_user_id(
 
 
 async def get_filer_by_email(
-    db_session: Session,
+    db_session: AsyncSession,
     email: str,
 ):
     res = (
-        db_session.execute(select(Filer).filter(Filer.email == email)).unique().scalar()
+        (await db_session.execute(select(Filer).filter(Filer.email == email)))
+        .unique()
+        .scalar()
     )
     return res
 
 
-async def get_filer_by_user_id(db_session: Session, user_id: int) -> Optional[Filer]:
+async def get_filer_by_user_id(db_session: AsyncSession, user_id: int) -> Optional[Filer]:
 
     res = (
-        db_session.execute(select(Filer).filter(Filer.user_id == user_id))
+        (await db_session.execute(
+            select(Filer)
+            .options(selectinload(Filer.filer_types),
+                     selectinload(Filer.contact_infos))
+            .filter(Filer.user_id == user_id)
+        ))
         .unique()
         .scalar()
     )
@@ -43,13 +53,13 @@ async def get_filer_by_user_id(db_session: Session, user_id: int) -> Optional[Fi
 
 
 async def get_filer_filer_type_by_filer_id(
-    db_session: Session,
+    db_session: AsyncSession,
     filer_id: str,
 ):
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(FilerFilerType).filter(FilerFilerType.filer_id == filer_id)
-        )
+        ))
         .unique()
         .scalars()
     )
@@ -58,16 +68,16 @@ async def get_filer_filer_type_by_filer_id(
 
 
 async def get_all_filer_ids_by_last_name(
-    db_session: Session,
+    db_session: AsyncSession,
     last_name: str,
 ):
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(FilerContactInfo.filer_id).filter(
                 func.lower(FilerContactInfo.last_name) == (last_name).lower()
             )
-        )
+        ))
         .unique()
         .scalars()
         .all()
@@ -76,20 +86,20 @@ async def get_all_filer_ids_by_last_name(
     return res
 
 async def get_all_filer_ids_by_start_of_last_name(
-    db_session: Session,
+    db_session: AsyncSession,
     last_name: str,
 ):
 
     search = f"{last_name.lower()}%"
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(FilerContactInfo.filer_id,
                    FilerContactInfo.first_name,
                    FilerContactInfo.last_name).filter(
                 func.lower(FilerContactInfo.last_name).like(search)
             )
-        )
+        ))
         .unique()
         .all()
     )
@@ -99,13 +109,13 @@ async def get_all_filer_ids_by_start_of_last_name(
 
 
 async def insert_new_filer_basic(
-    db_session: Session, filer: FilerBasic
+    db_session: AsyncSession, filer: FilerBasic
 ) -> Optional[Filer]:
 
     new_filer = Filer(user_id=filer.user_id)
 
     db_session.add(new_filer)
-    db_session.flush()
+    await db_session.flush()
 
     new_contact = FilerContactInfo()
     new_contact.filer_id = new_filer.filer_id
@@ -113,14 +123,15 @@ async def insert_new_filer_basic(
     new_contact.middle_name = filer.middle_name
     new_contact.last_name = filer.last_name
     db_session.add(new_contact)
+    await db_session.flush()
 
-    db_session.commit()
+    await upsert_search_documents(db_session, "filer", [new_filer.filer_id])
 
     return new_filer
 
 
 async def update_filer_contact_info(
-    db_session: Session, filer: Filer, payload: FilerContactInfo
+    db_session: AsyncSession, filer: Filer, payload: FilerContactInfo
 ) -> bool:
 
     new_ci = FilerContactInfo()
@@ -136,9 +147,16 @@ async def update_filer_contact_info(
     new_ci.phone = payload.phone
     new_ci.country = payload.country
     new_ci.hide_details = payload.hide_details
-    new_ci.effective_date = payload.effective_date
+    # asyncpg wants real dates, not iso strings
+    if isinstance(payload.effective_date, str):
+        new_ci.effective_date = to_date(payload.effective_date)
+    else:
+        new_ci.effective_date = payload.effective_date
 
     db_session.add(new_ci)
-    db_session.commit()
+    await db_session.flush()
+
+    # the old names stay searchable, the document covers the history
+    await upsert_search_documents(db_session, "filer", [filer.filer_id])
 
     return True
@@ -1,24 +1,35 @@
-from typing import Optional
-from sqlalchemy import select
-from sqlalchemy.sql import func, and_, or_
-from sqlalchemy.orm import Session
-from app.utils.date_utils import today
-from app.models.filings import Filing, FilingRaw, FilingSubtype
+import logging
+from typing import Optional, List
+from sqlalchemy import select, text, update
+from sqlalchemy.sql import func, and_
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.string_utils import to_date
+from app.models.filings import Filing, FilingRaw, FilingLineage
 from app.models.filers import Filer, FilerContactInfo
-from app.models.entities import LobbyingEntityContactInfo
 
 FILED_STATUS = ["filed fee pending", "filed"]
 
+logger = logging.getLogger("fastapi")
+
+
+def _as_date(d):
+    # asyncpg won't coerce iso strings into dates
+    if isinstance(d, str):
+        return to_date(d)
+    return d
+
+
 # pull data
 async def get_filing_by_id_and_type(
-    db_session: Session, filing_id: str, filing_type: str
+    db_session: AsyncSession, filing_id: str, filing_type: str
 ) -> Optional[Filing]:
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(Filing)
             .filter(Filing.filing_id == filing_id)
             .filter(Filing.filing_type == filing_type)
-        )
+        ))
         .unique()
         .scalar()
     )
@@ -27,11 +38,11 @@ async def get_filing_by_id_and_type(
 
 
 async def get_filing_by_id(
-    db_session: Session,
+    db_session: AsyncSession,
     filing_id: str,
 ) -> Optional[Filing]:
     res = (
-        db_session.execute(select(Filing).filter(Filing.filing_id == filing_id))
+        (await db_session.execute(select(Filing).filter(Filing.filing_id == filing_id)))
         .unique()
         .scalar()
     )
@@ -40,12 +51,12 @@ async def get_filing_by_id(
 
 
 async def get_latest_filing_by_entity_id_and_filing_type_and_year(
-    db_session: Session, entity_id: str, filing_type: str, year: str
+    db_session: AsyncSession, entity_id: str, filing_type: str, year: str
 ):
-    period_start = year + "-01-01"
-    period_end = year + "-12-31"
+    period_start = to_date(year + "-01-01")
+    period_end = to_date(year + "-12-31")
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(Filing)
             .filter(Filing.entity_id == entity_id)
             .filter(Filing.filing_type == filing_type)
@@ -56,7 +67,7 @@ async def get_latest_filing_by_entity_id_and_filing_type_and_year(
                 Filing.updated.desc(),
                 Filing.e_filing_id.desc(),
             )
-        )
+        ))
         .unique()
         .scalars()
         .first()
@@ -66,11 +77,13 @@ async def get_latest_filing_by_entity_id_and_filing_type_and_year(
 
 
 async def get_all_filings_by_filer_id(
-    db_session: Session, filer_id: str, start_date: str, end_date: str
+    db_session: AsyncSession, filer_id: str, start_date: str, end_date: str
 ) -> Optional[Filing]:
 
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(
                 Filing.filing_date,
                 FilerContactInfo.first_name,
@@ -84,7 +97,7 @@ async def get_all_filings_by_filer_id(
             .filter(
                 and_(Filing.period_start >= start_date, Filing.period_end < end_date)
             )
-        )
+        ))
         .unique()
         .all()
     )
@@ -92,194 +105,266 @@ async def get_all_filings_by_filer_id(
     return res
 
 
-async def get_all_filings_by_all_filer_ids(
-    db_session: Session, filer_ids: list, start_date: str = None, end_date: str = None
+async def get_filing_by_public_doc(
+    db_session: AsyncSession, doc_public: str
 ) -> Optional[Filing]:
+    res = (
+        (await db_session.execute(select(Filing).filter(Filing.doc_public == doc_public)))
+        .unique()
+        .scalar()
+    )
+
+    return res
 
-    if start_date is None:
-        start_date = "1970-01-01"
-    if end_date is None:
-        end_date = today().isoformat()
 
+async def get_lobbyist_filing_by_public_doc(
+    db_session: AsyncSession, doc_public: str
+) -> Optional[Filing]:
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(
-                Filing.filing_date,
                 Filing.filing_type,
-                Filing.doc_public,
-                Filing.amendment,
-                Filing.amends_orig_id,
-                Filing.amends_prev_id,
-                Filing.amendment_number,
-                FilingSubtype.filing_subtype,
-                FilerContactInfo.first_name,
-                FilerContactInfo.last_name,
+                Filing.filing_date,
             )
-            .join(FilingSubtype, FilingSubtype.filing_id == Filing.filing_id)
             .join(Filer, Filer.filer_id == Filing.filer_id)
-            .join(FilerContactInfo, FilerContactInfo.filer_id == Filer.filer_id)
-            .filter(Filing.filer_id.in_(filer_ids))
-            .filter(
-                or_(
-                    and_(
-                        Filing.filing_date >= start_date, Filing.filing_date <= end_date
-                    ),
-                    and_(
-                        Filing.period_start >= start_date,
-                        Filing.period_start <= end_date,
-                    ),
-                )
-            )
-            .order_by(
-                Filing.filing_date.desc(),
-            )
-        )
+            .filter(Filing.doc_public == doc_public)
+        ))
         .unique()
-        .all()
+        .scalar()
     )
 
     return res
 
 
-async def get_all_lobbyist_filings_by_all_filer_ids(
-    db_session: Session, filer_ids: list, start_date: str = None, end_date: str = None
-) -> Optional[Filing]:
-
-    if start_date is None:
-        start_date = "1970-01-01"
-    if end_date is None:
-        end_date = today().isoformat()
+# the filings each of :ids amends, newest first: its amends_prev_id,
+# that one's, ... down to the original, one round trip for any number of
+# chains. path holds the chain so far, a filing that would repeat (a
+# cycle in bad data) ends it, so does :max_depth.
+AMENDMENT_CHAINS_SQL = """
+WITH RECURSIVE chain (start_id, filing_id, depth, path) AS (
+    SELECT f.filing_id, f.amends_prev_id, 1, ARRAY[f.filing_id]
+    FROM filing f
+    WHERE f.filing_id = ANY(CAST(:ids AS uuid[]))
+      AND f.amendment AND f.amends_prev_id IS NOT NULL
+  UNION ALL
+    SELECT c.start_id, p.amends_prev_id, c.depth + 1, c.path || p.filing_id
+    FROM chain c
+    JOIN filing p ON p.filing_id = c.filing_id
+    WHERE p.amendment AND p.amends_prev_id IS NOT NULL
+      AND p.amends_prev_id <> ALL(c.path || p.filing_id)
+      AND c.depth < :max_depth
+)
+SELECT CAST(c.start_id AS VARCHAR) AS start_id, c.depth,
+       CAST(f.filing_id AS VARCHAR) AS filing_id, f.e_filing_id,
+       f.filing_date, f.filing_type, f.status, f.doc_public, f.amendment,
+       f.amendment_number,
+       CAST(f.amends_orig_id AS VARCHAR) AS amends_orig_id,
+       CAST(f.amends_prev_id AS VARCHAR) AS amends_prev_id
+FROM chain c
+JOIN filing f ON f.filing_id = c.filing_id
+ORDER BY c.start_id, c.depth
+"""
+
+
+async def get_amendment_chains(
+    db_session: AsyncSession,
+    filing_ids: List[str],
+    max_depth: int = 100,
+) -> dict:
+    """filing_id -> the filings it amends, newest first, for each of
+    filing_ids. Filings that amend nothing are left out."""
+
+    if not filing_ids:
+        return {}
 
     res = (
-        db_session.execute(
-            select(
-                Filing.filing_date,
-                Filing.filing_type,
-                Filing.doc_public,
-                Filing.amendment,
-                Filing.amends_orig_id,
-                Filing.amends_prev_id,
-                Filing.amendment_number,
-                LobbyingEntityContactInfo.name.label("filer"),
-            )
-            .join(
-                LobbyingEntityContactInfo,
-                LobbyingEntityContactInfo.entity_id == Filing.entity_id,
-            )
-            .filter(Filing.filer_id.in_(filer_ids))
-            .filter(
-                or_(
-                    and_(
-                        Filing.filing_date >= start_date, Filing.filing_date <= end_date
-                    ),
-                    and_(
-                        Filing.period_start >= start_date,
-                        Filing.period_start <= end_date,
-                    ),
-                )
-            )
-            .order_by(
-                Filing.filing_date.desc(),
-            )
-        )
-        .unique()
+        (await db_session.execute(
+            text(AMENDMENT_CHAINS_SQL),
+            {"ids": [str(x) for x in filing_ids], "max_depth": max_depth},
+        ))
         .all()
     )
 
-    return res
+    chains = {}
+    for row in res:
+        chains.setdefault(row.start_id, []).append(row)
+        if row.depth == max_depth:
+            logger.warning(f"amendment chain of {row.start_id} reached "
+                           f"the {max_depth} filings limit")
+
+    return chains
+
+
+# filing lineage: rows built from the filings in sql, so the same
+# statements serve the app and the backfill. The latest version of a
+# chain is its highest filed version, at most one per chain (partial
+# unique index, migration 0005).
+
+FILING_LINEAGE_SQL = """
+INSERT INTO filing_lineage (filing_id, orig_id, version, latest, updated)
+SELECT f.filing_id,
+       CASE WHEN f.amendment THEN COALESCE(f.amends_orig_id, f.filing_id)
+            ELSE f.filing_id END,
+       CASE WHEN f.amendment THEN COALESCE(f.amendment_number, 0)
+            ELSE 0 END,
+       false, now()
+FROM filing f
+{where}
+ON CONFLICT (filing_id) DO UPDATE
+SET orig_id = EXCLUDED.orig_id, version = EXCLUDED.version,
+    updated = EXCLUDED.updated
+"""
+
+# backfill only, after FILING_LINEAGE_SQL over every filing
+FILING_LINEAGE_CLEAR_LATEST_SQL = """
+UPDATE filing_lineage SET latest = false WHERE latest
+"""
+
+FILING_LINEAGE_SET_LATEST_SQL = """
+UPDATE filing_lineage l SET latest = true, updated = now()
+FROM (
+    SELECT DISTINCT ON (l.orig_id) l.filing_id
+    FROM filing_lineage l
+    JOIN filing f ON f.filing_id = l.filing_id
+    WHERE f.status IN ('filed fee pending', 'filed')
+    ORDER BY l.orig_id, l.version DESC, f.filing_date DESC NULLS LAST
+) x
+WHERE l.filing_id = x.filing_id
+"""
+
+
+def filing_lineage_sql(ids: bool = True) -> str:
+    # ids=False (re)builds the rows of every filing (backfill)
+    where = "WHERE f.filing_id = ANY(CAST(:ids AS uuid[]))" if ids else ""
+    return FILING_LINEAGE_SQL.format(where=where)
+
+
+def backfill_filing_lineage_sql() -> list:
+    return [filing_lineage_sql(False), FILING_LINEAGE_CLEAR_LATEST_SQL,
+            FILING_LINEAGE_SET_LATEST_SQL]
+
+
+async def upsert_filing_lineage(
+    db_session: AsyncSession, filing_ids: List[str]
+) -> None:
+
+    if not filing_ids:
+        return
+
+    await db_session.execute(
+        text(filing_lineage_sql()),
+        {"ids": [str(x) for x in filing_ids]},
+    )
 
 
-async def get_filing_by_public_doc(
-    db_session: Session, doc_public: str
-) -> Optional[Filing]:
+async def set_latest_filing_version(
+    db_session: AsyncSession, filing: Filing
+) -> None:
+    # filing was just filed: it is the latest version of its chain
+
+    await upsert_filing_lineage(db_session, [filing.filing_id])
+    lineage = await get_filing_lineage(db_session, filing.filing_id)
+
+    # lock the chain, concurrent amendments of it queue here
+    await db_session.execute(
+        select(FilingLineage.filing_id)
+        .filter(FilingLineage.orig_id == lineage.orig_id)
+        .with_for_update()
+    )
+
+    # two statements, the unique index is checked row by row
+    await db_session.execute(
+        update(FilingLineage)
+        .filter(FilingLineage.orig_id == lineage.orig_id)
+        .filter(FilingLineage.latest)
+        .values(latest=False)
+        .execution_options(synchronize_session=False)
+    )
+    await db_session.execute(
+        update(FilingLineage)
+        .filter(FilingLineage.filing_id == filing.filing_id)
+        .values(latest=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_filing_lineage(
+    db_session: AsyncSession, filing_id: str
+) -> Optional[FilingLineage]:
     res = (
-        db_session.execute(select(Filing).filter(Filing.doc_public == doc_public))
-        .unique()
+        (await db_session.execute(
+            select(FilingLineage).filter(FilingLineage.filing_id == filing_id)
+        ))
         .scalar()
     )
 
     return res
 
 
-async def get_filing_metadata_by_public_doc(
-    db_session: Session, doc_public: str
-) -> Optional[Filing]:
+async def get_filing_versions(
+    db_session: AsyncSession, filing_id: str
+) -> List[FilingLineage]:
+    # every version of filing_id's chain, the original first
+    this = aliased(FilingLineage)
     res = (
-        db_session.execute(
-            select(
-                Filing.filing_date,
-                Filing.filing_type,
-                Filing.amendment,
-                Filing.filing_id,
-                Filing.e_filing_id,
-                FilingSubtype.filing_subtype,
-                FilerContactInfo.first_name,
-                FilerContactInfo.last_name,
-            )
-            .join(Filer, Filer.filer_id == Filing.filer_id)
-            .join(FilingSubtype, FilingSubtype.filing_id == Filing.filing_id)
-            .join(FilerContactInfo, FilerContactInfo.filer_id == Filer.filer_id)
-            .filter(Filing.doc_public == doc_public)
-        )
-        .unique()
-        .first()
+        (await db_session.execute(
+            select(FilingLineage)
+            .join(this, this.orig_id == FilingLineage.orig_id)
+            .filter(this.filing_id == filing_id)
+            .order_by(FilingLineage.version)
+        ))
+        .scalars()
+        .all()
     )
 
     return res
 
 
-async def get_lobbyist_filing_metadata_by_public_doc(
-    db_session: Session, doc_public: str
+async def get_latest_filing_version(
+    db_session: AsyncSession, filing_id: str
 ) -> Optional[Filing]:
-
+    # the latest filed version of filing_id's chain, None if none is filed
+    this = aliased(FilingLineage)
     res = (
-        db_session.execute(
-            select(
-                Filing.filing_date,
-                Filing.filing_type,
-                Filing.amendment,
-                Filing.e_filing_id,
-                Filing.filing_id,
-                LobbyingEntityContactInfo.name,
-            )
-            .join(
-                LobbyingEntityContactInfo,
-                LobbyingEntityContactInfo.entity_id == Filing.entity_id,
-            )
-            .filter(Filing.doc_public == doc_public)
-        )
+        (await db_session.execute(
+            select(Filing)
+            .join(FilingLineage, FilingLineage.filing_id == Filing.filing_id)
+            .join(this, this.orig_id == FilingLineage.orig_id)
+            .filter(this.filing_id == filing_id)
+            .filter(FilingLineage.latest)
+        ))
         .unique()
-        .first()
+        .scalar()
     )
 
     return res
 
 
-async def get_lobbyist_filing_by_public_doc(
-    db_session: Session, doc_public: str
-) -> Optional[Filing]:
+async def is_filing_superseded(
+    db_session: AsyncSession, filing_id: str
+) -> bool:
+    # a later version of the chain was filed
+    this = aliased(FilingLineage)
     res = (
-        db_session.execute(
-            select(
-                Filing.filing_type,
-                Filing.filing_date,
-            )
-            .join(Filer, Filer.filer_id == Filing.filer_id)
-            .filter(Filing.doc_public == doc_public)
-        )
-        .unique()
+        (await db_session.execute(
+            select(FilingLineage.filing_id)
+            .join(this, this.orig_id == FilingLineage.orig_id)
+            .filter(this.filing_id == filing_id)
+            .filter(FilingLineage.latest)
+            .filter(FilingLineage.version > this.version)
+        ))
         .scalar()
     )
 
-    return res
+    return res is not None
 
 
 async def get_raw_filing_by_id(
-    db_session: Session, filing_id: str
+    db_session: AsyncSession, filing_id: str
 ) -> Optional[FilingRaw]:
 
     res = (
-        db_session.execute(select(FilingRaw).filter(FilingRaw.filing_id == filing_id))
+        (await db_session.execute(select(FilingRaw).filter(FilingRaw.filing_id == filing_id)))
         .unique()
         .scalar()
     )
@@ -288,25 +373,25 @@ async def get_raw_filing_by_id(
 
 
 # insert
-async def create_new_filing(db_session: Session, filing_dict: dict) -> Optional[Filing]:
+async def create_new_filing(db_session: AsyncSession, filing_dict: dict) -> Optional[Filing]:
 
     new_filing = Filing(**filing_dict)
     db_session.add(new_filing)
-    db_session.commit()
+    await db_session.flush()
 
     return new_filing
 
 
 async def upsert_raw_filing(
-    db_session: Session, filing_dict: dict
+    db_session: AsyncSession, filing_dict: dict
 ) -> Optional[FilingRaw]:
 
     # because our change is in json, we need
     # to actually manually get the object and change it
     filing_raw = (
-        db_session.execute(
+        (await db_session.execute(
             select(FilingRaw).filter(FilingRaw.filing_id == filing_dict["filing_id"])
-        )
+        ))
         .unique()
         .scalar()
     )
@@ -317,6 +402,6 @@ async def upsert_raw_filing(
 
     filing_raw.raw_json = filing_dict
     db_session.add(filing_raw)
-    db_session.commit()
+    await db_session.flush()
 
     return filing_raw
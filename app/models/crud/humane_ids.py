@@ -1,7 +1,6 @@
 import uuid
-from typing import Optional
 from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.encoders import jsonable_encoder
 from app.schemas.lobbyist.new_lobbyist_registration import (
     NewLobbyistRegistration,
@@ -12,10 +11,12 @@ from app.models.filers import Filer
 from app.models.users import User
 from app.models.filings import Filing
 from app.models.humane_ids import OBJECT_TYPES, ID_START, HumanReadableId, EFilingId
+from app.models.search import SEARCH_OBJECT_TYPES
+from app.models.crud.search import upsert_search_documents
 
 
 async def insert_human_readable_id(
-    db_session: Session,
+    db_session: AsyncSession,
     *,
     object_id: str,
     object_type: str,
@@ -25,9 +26,9 @@ async def insert_human_readable_id(
 
     if hr_id is None:
         res = (
-            db_session.execute(
+            (await db_session.execute(
                 select(HumanReadableId).order_by(HumanReadableId.id.desc())
-            )
+            ))
             .unique()
             .scalars()
             .first()
@@ -46,48 +47,40 @@ async def insert_human_readable_id(
     nid = HumanReadableId(**new_dict)
 
     db_session.add(nid)
-    db_session.commit()
-
-    return nid
-
+    await db_session.flush()
 
-async def get_e_filer_id_by_orig_amendment(
-    db_session: Session,
-    amendment_ids: list,
-) -> Optional[EFilingId]:
+    # human readable ids are searchable
+    if object_type in SEARCH_OBJECT_TYPES:
+        await upsert_search_documents(db_session, object_type, [object_id])
 
-    res = (
-        db_session.execute(
-            select(
-                Filing.amends_orig_id,
-                EFilingId.e_filing_id,
-            )
-            .join(Filing, Filing.filing_id == EFilingId.filing_id)
-            .filter(Filing.amends_orig_id.in_(amendment_ids))
-        )
-        .unique()
-        .all()
-    )
+    return nid
 
-    return res
 
+async def get_e_filing_ids_by_prefix(
+    db_session: AsyncSession,
+    prefix: str,
+    limit: int,
+) -> list:
 
-async def get_e_filer_id_by_prev_amendment(
-    db_session: Session,
-    amendment_ids: list,
-) -> Optional[EFilingId]:
+    # a range, not LIKE, so the unique index on e_filing_id is used
+    # whatever the collation. e-filing ids are all digits.
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(
-                Filing.amends_prev_id,
                 EFilingId.e_filing_id,
+                Filing.filing_id,
+                Filing.filer_id,
+                Filing.entity_id,
             )
             .join(Filing, Filing.filing_id == EFilingId.filing_id)
-            .filter(Filing.amends_prev_id.in_(amendment_ids))
-        )
-        .unique()
+            .filter(EFilingId.e_filing_id >= prefix)
+            .filter(EFilingId.e_filing_id < upper)
+            .order_by(EFilingId.e_filing_id)
+            .limit(limit)
+        ))
         .all()
     )
 
-    return res
\ No newline at end of file
+    return res
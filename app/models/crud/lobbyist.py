@@ -1,7 +1,8 @@
 import uuid
 from typing import Optional
 from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, joinedload
 from fastapi.encoders import jsonable_encoder
 from app.schemas.lobbyist.new_lobbyist_registration import (
     NewLobbyistRegistration,
@@ -35,29 +36,30 @@ from app.models.lobbyist_detail import (
     LobbyingFilingComment,
     LobbyingFilingFee,
 )
+from app.models.crud.search import upsert_search_documents
 
 # retrieve data
 
 
 async def get_lobbying_entity_by_name(
-    db_session: Session, name: str
+    db_session: AsyncSession, name: str
 ) -> Optional[LobbyingEntity]:
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingEntityContactInfo).filter(
                 func.lower(LobbyingEntityContactInfo.name) == func.lower(name.strip())
             )
-        )
+        ))
         .unique()
         .scalar()
     )
 
     if res is not None:
         res = (
-            db_session.execute(
+            (await db_session.execute(
                 select(LobbyingEntity).filter(LobbyingEntity.entity_id == res.entity_id)
-            )
+            ))
             .unique()
             .scalar()
         )
@@ -66,11 +68,11 @@ async def get_lobbying_entity_by_name(
 
 
 async def get_lobbying_entity_filer_ids_by_company(
-    db_session: Session,
+    db_session: AsyncSession,
     company: str,
 ) -> Optional[LobbyingEntity]:
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(
                 LobbyingEntity.netfile_filer_id,
             )
@@ -83,7 +85,7 @@ async def get_lobbying_entity_filer_ids_by_company(
                     "%" + company.strip().lower() + "%"
                 )
             )
-        )
+        ))
         .unique()
         .scalars()
         .all()
@@ -93,14 +95,21 @@ async def get_lobbying_entity_filer_ids_by_company(
 
 
 async def get_lobbying_entity_by_id(
-    db_session: Session,
+    db_session: AsyncSession,
     entity_id: str,
 ) -> Optional[LobbyingEntity]:
 
     res = (
-        db_session.execute(
-            select(LobbyingEntity).filter(LobbyingEntity.entity_id == entity_id)
-        )
+        (await db_session.execute(
+            select(LobbyingEntity)
+            .options(
+                selectinload(LobbyingEntity.contact_info),
+                selectinload(LobbyingEntity.lobbyist_types),
+                joinedload(LobbyingEntity.filers).selectinload(Filer.contact_infos),
+                joinedload(LobbyingEntity.filers).joinedload(Filer.user),
+            )
+            .filter(LobbyingEntity.entity_id == entity_id)
+        ))
         .unique()
         .scalar()
     )
@@ -109,16 +118,16 @@ async def get_lobbying_entity_by_id(
 
 
 async def get_lobbying_entity_current_contact_info_by_id(
-    db_session: Session,
+    db_session: AsyncSession,
     entity_id: str,
 ) -> Optional[LobbyingEntity]:
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingEntityContactInfo)
             .filter(LobbyingEntityContactInfo.entity_id == entity_id)
             .order_by(LobbyingEntityContactInfo.updated.desc())
-        )
+        ))
         .unique()
         .scalars()
         .first()
@@ -127,18 +136,22 @@ async def get_lobbying_entity_current_contact_info_by_id(
     return res
 
 
-async def get_lobbying_entities_by_filer_id(db_session: Session, filer_id: str):
+async def get_lobbying_entities_by_filer_id(db_session: AsyncSession, filer_id: str):
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingEntity)
+            .options(
+                selectinload(LobbyingEntity.contact_info),
+                selectinload(LobbyingEntity.lobbyist_types),
+            )
             .join(
                 LobbyingEntityFiler,
                 LobbyingEntityFiler.entity_id == LobbyingEntity.entity_id,
             )
             .filter(LobbyingEntityFiler.filer_id == filer_id)
             .filter(LobbyingEntityFiler.active == True)
-        )
+        ))
         .unique()
         .scalars()
         .all()
@@ -148,15 +161,15 @@ async def get_lobbying_entities_by_filer_id(db_session: Session, filer_id: str):
 
 
 async def get_lobbying_entity_type_by_entity_id(
-    db_session: Session,
+    db_session: AsyncSession,
     entity_id: str,
 ):
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingEntityLobbyistType).filter(
                 LobbyingEntityLobbyistType.entity_id == entity_id
             )
-        )
+        ))
         .unique()
         .scalar()
     )
@@ -164,11 +177,11 @@ async def get_lobbying_entity_type_by_entity_id(
     return res
 
 
-async def get_registered_lobbyists(db_session: Session, registration: Filing):
+async def get_registered_lobbyists(db_session: AsyncSession, registration: Filing):
     filing_id = registration.filing_id
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingLobbyEntityContactInfo)
             .join(
                 LobbyingFilingLobbyist,
@@ -177,7 +190,7 @@ async def get_registered_lobbyists(db_session: Session, registration: Filing):
             )
             .filter(LobbyingFilingLobbyist.filing_id == filing_id)
             .order_by(LobbyingFilingLobbyist.ordinal)
-        )
+        ))
         .unique()
         .scalars()
         .all()
@@ -186,11 +199,11 @@ async def get_registered_lobbyists(db_session: Session, registration: Filing):
     return res
 
 
-async def get_registered_clients(db_session: Session, registration: Filing):
+async def get_registered_clients(db_session: AsyncSession, registration: Filing):
     filing_id = registration.filing_id
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingFilingClient, LobbyingLobbyEntityContactInfo)
             .join(
                 LobbyingFilingClient,
@@ -199,7 +212,7 @@ async def get_registered_clients(db_session: Session, registration: Filing):
             )
             .filter(LobbyingFilingClient.filing_id == filing_id)
             .order_by(LobbyingFilingClient.ordinal)
-        )
+        ))
         .unique()
         .all()
     )
@@ -207,11 +220,11 @@ async def get_registered_clients(db_session: Session, registration: Filing):
     return res
 
 
-async def get_registered_muni_decisions_firm(db_session: Session, registration: Filing):
+async def get_registered_muni_decisions_firm(db_session: AsyncSession, registration: Filing):
     filing_id = registration.filing_id
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingMuniDecisionInfo, LobbyingFilingMuniDecision)
             .join(
                 LobbyingFilingMuniDecision,
@@ -224,7 +237,7 @@ async def get_registered_muni_decisions_firm(db_session: Session, registration:
             )
             .filter(LobbyingFilingMuniDecision.filing_id == filing_id)
             .order_by(LobbyingFilingMuniDecision.ordinal)
-        )
+        ))
         .unique()
         .all()
     )
@@ -236,14 +249,14 @@ async def get_registered_muni_decisions_firm(db_session: Session, registration:
 
 
 async def insert_lobbying_entity(
-    db_session: Session, form: NewLobbyistRegistration
+    db_session: AsyncSession, form: NewLobbyistRegistration
 ) -> None:
 
     new_entity = LobbyingEntity()
     new_entity.entity_id = str(uuid.uuid4())
     db_session.add(new_entity)
-    db_session.flush()
-    db_session.refresh(new_entity)
+    await db_session.flush()
+    await db_session.refresh(new_entity)
 
     contact = {
         "entity_id": new_entity.entity_id,
@@ -268,13 +281,17 @@ async def insert_lobbying_entity(
     lelt.entity_id = new_entity.entity_id
     db_session.add(lelt)
 
-    db_session.commit()
+    await db_session.flush()
+
+    await upsert_search_documents(
+        db_session, "lobbying_entity", [new_entity.entity_id]
+    )
 
     return new_entity
 
 
 async def update_lobbying_entity(
-    db_session: Session, form: UpdateLobbyingEntity
+    db_session: AsyncSession, form: UpdateLobbyingEntity
 ) -> None:
 
     entity = await get_lobbying_entity_by_id(db_session, form.entity_id)
@@ -305,11 +322,11 @@ async def update_lobbying_entity(
         entity_types.append("expenditure")
 
     res = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingEntityLobbyistType).filter(
                 LobbyingEntityLobbyistType.entity_id == entity.entity_id
             )
-        )
+        ))
         .unique()
         .scalars()
         .all()
@@ -329,27 +346,28 @@ async def update_lobbying_entity(
     # then delete
     for db_entity_type in res:
         if db_entity_type.lobbyist_type not in entity_types:
-            db_session.delete(db_entity_type)
+            await db_session.delete(db_entity_type)
+
+    await db_session.flush()
 
-    db_session.commit()
+    await upsert_search_documents(db_session, "lobbying_entity", [entity.entity_id])
 
 
 # relationships (should be idempotent)
 
 
 async def assoc_filer_with_lobbying_entity(
-    db_session: Session,
+    db_session: AsyncSession,
     filer_id: str,
     entity_id: str,
-    commit=True,
 ):
 
     lef = (
-        db_session.execute(
+        (await db_session.execute(
             select(LobbyingEntityFiler)
             .filter(LobbyingEntityFiler.filer_id == filer_id)
             .filter(LobbyingEntityFiler.entity_id == entity_id)
-        )
+        ))
         .unique()
         .scalar()
     )
@@ -361,13 +379,16 @@ async def assoc_filer_with_lobbying_entity(
         lef.entity_id = entity_id
 
         db_session.add(lef)
-        if commit:
-            db_session.commit()
+        await db_session.flush()
 
     return lef
 
 
-async def insert_lobbying_entity_contact_info(db_session: Session, contact_info: dict):
+async def insert_lobbying_entity_contact_info(db_session: AsyncSession, contact_info: dict):
     new_contact_info = LobbyingEntityContactInfo(**contact_info)
     db_session.add(new_contact_info)
-    db_session.commit()
+    await db_session.flush()
+
+    await upsert_search_documents(
+        db_session, "lobbying_entity", [new_contact_info.entity_id]
+    )
@@ -1,7 +1,8 @@
 from typing import Optional
 from sqlalchemy import select
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from fastapi.encoders import jsonable_encoder
 from app.models.users import User
 from app.models.messages import (
@@ -13,7 +14,7 @@ from app.models.messages import (
 
 async def insert_message(
     *,
-    db_session: Session,
+    db_session: AsyncSession,
     sender: str,
     recipients: str,
     subject: str,
@@ -46,18 +47,19 @@ async def insert_message(
 
     
     db_session.add(new_msg)
-    db_session.commit()
+    await db_session.flush()
 
 
     
 async def get_message_template_by_message_type(
-    db_session: Session,
+    db_session: AsyncSession,
     message_type: str
 ) -> Optional[MessageTemplate]:
 
-    res = db_session.execute(
+    res = (await db_session.execute(
         select(MessageTemplateMessageType)
+        .options(joinedload(MessageTemplateMessageType.message_template))
         .filter(MessageTemplateMessageType.message_type == message_type)
-    ).unique().scalar()
+    )).unique().scalar()
 
     return res.message_template
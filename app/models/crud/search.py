@@ -0,0 +1,573 @@
+import re
+import datetime
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.date_utils import today
+from app.utils.string_utils import to_date
+
+
+# the search documents are built in sql, from the source tables, so the
+# same statements serve single updates and the full backfill. 'simple'
+# config: names and ids must not be stemmed.
+
+FILER_DOCUMENT_SQL = """
+INSERT INTO search_document (object_type, object_id, filer_id, names,
+                             document, updated)
+SELECT 'filer', f.filer_id, f.filer_id, n.names,
+       setweight(to_tsvector('simple', coalesce(n.last_names, '')), 'A')
+       || setweight(to_tsvector('simple', coalesce(n.other_names, '')), 'B')
+       || setweight(to_tsvector('simple', concat_ws(' ', hr.hr_id, e.ids)),
+                    'C'),
+       now()
+FROM filer f
+LEFT JOIN LATERAL (
+    SELECT string_agg(DISTINCT ci.last_name, ' ') AS last_names,
+           string_agg(DISTINCT concat_ws(' ', ci.first_name, ci.middle_name),
+                      ' ') AS other_names,
+           string_agg(DISTINCT concat_ws(' ', ci.first_name, ci.last_name),
+                      '; ') AS names
+    FROM filer_contact_info ci
+    WHERE ci.filer_id = f.filer_id
+) n ON true
+LEFT JOIN human_readable_id hr ON hr.object_id = f.filer_id
+LEFT JOIN LATERAL (
+    SELECT string_agg(fi.e_filing_id, ' ') AS ids
+    FROM filing fi
+    WHERE fi.filer_id = f.filer_id AND fi.entity_id IS NULL
+) e ON true
+{where}
+ON CONFLICT (object_type, object_id) DO UPDATE
+SET filer_id = EXCLUDED.filer_id, names = EXCLUDED.names,
+    document = EXCLUDED.document, updated = EXCLUDED.updated
+"""
+
+LOBBYING_ENTITY_DOCUMENT_SQL = """
+INSERT INTO search_document (object_type, object_id, filer_id, names,
+                             document, updated)
+SELECT 'lobbying_entity', le.entity_id, le.netfile_filer_id, n.names,
+       setweight(to_tsvector('simple', coalesce(n.names, '')), 'A')
+       || setweight(to_tsvector('simple', concat_ws(' ', hr.hr_id, e.ids)),
+                    'C'),
+       now()
+FROM lobbying_entity le
+LEFT JOIN LATERAL (
+    SELECT string_agg(DISTINCT ci.name, '; ') AS names
+    FROM lobbying_entity_contact_info ci
+    WHERE ci.entity_id = le.entity_id
+) n ON true
+LEFT JOIN human_readable_id hr ON hr.object_id = le.entity_id
+LEFT JOIN LATERAL (
+    SELECT string_agg(fi.e_filing_id, ' ') AS ids
+    FROM filing fi
+    WHERE fi.entity_id = le.entity_id
+) e ON true
+{where}
+ON CONFLICT (object_type, object_id) DO UPDATE
+SET filer_id = EXCLUDED.filer_id, names = EXCLUDED.names,
+    document = EXCLUDED.document, updated = EXCLUDED.updated
+"""
+
+
+def search_document_sql(object_type: str, ids: bool = True) -> str:
+    # ids=False rebuilds every document of the type (backfill)
+    if object_type == "filer":
+        sql, column = FILER_DOCUMENT_SQL, "f.filer_id"
+    else:
+        sql, column = LOBBYING_ENTITY_DOCUMENT_SQL, "le.entity_id"
+
+    # always a WHERE, so ON CONFLICT can't be read as a join condition
+    where = f"WHERE {column} = ANY(CAST(:ids AS uuid[]))" if ids else "WHERE true"
+    return sql.format(where=where)
+
+
+async def upsert_search_documents(
+    db_session: AsyncSession,
+    object_type: str,
+    object_ids: List[str],
+) -> None:
+
+    if not object_ids:
+        return
+
+    await db_session.execute(
+        text(search_document_sql(object_type)),
+        {"ids": [str(x) for x in object_ids]},
+    )
+    # cached searches are invalidated once this commits
+    # (app.utils.public_index)
+    db_session.info["search_documents_changed"] = True
+
+
+async def rebuild_search_documents(db_session: AsyncSession) -> None:
+
+    for object_type in ["filer", "lobbying_entity"]:
+        await db_session.execute(text(search_document_sql(object_type, False)))
+    db_session.info["search_documents_changed"] = True
+
+
+def normalize_name(query: str) -> str:
+    # "Garcia-Lopez,  Ana" -> "garcia lopez ana", what fuzzy matches compare
+    return " ".join(re.findall(r"[^\W_]+", query.lower()))
+
+
+async def set_fuzzy_threshold(db_session: AsyncSession, threshold: float) -> None:
+    # for the rest of the transaction, the <% operator reads it
+    await db_session.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', "
+             ":threshold, true)"),
+        {"threshold": str(threshold)},
+    )
+
+
+def to_prefix_tsquery(query: str) -> str:
+    # every word must match, as a prefix: "garc smi" -> "garc:* & smi:*"
+    # only word characters survive, the result is safe for to_tsquery
+    words = re.findall(r"[^\W_]+", query.lower())
+    return " & ".join(f"{word}:*" for word in words)
+
+
+# public_filing_index: one row per filing the public site shows, with
+# everything search results and document metadata display: the latest
+# names, the subtypes, the e-filing ids of the filings amended. kind 0
+# filer filings (with subtypes), kind 1 lobbying entity filings (with
+# contact info), filed ones only. A materialized view, refreshed
+# concurrently after public filings change (app.utils.public_index).
+# The migrations create it (0006, filed only since 0010), with its
+# indexes, this is the current definition.
+#
+# filing_date can be null on imported filings, those sort as the oldest
+# (sort_date).
+
+PUBLIC_FILING_INDEX_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS public_filing_index AS
+SELECT f.filing_id,
+       CASE WHEN f.entity_id IS NULL THEN 0 ELSE 1 END AS kind,
+       f.filer_id, f.entity_id, f.filing_date,
+       COALESCE(f.filing_date, '-infinity'::timestamp) AS sort_date,
+       f.period_start, f.filing_type, f.doc_public, f.e_filing_id,
+       f.amendment, f.amends_orig_id, f.amends_prev_id, f.amendment_number,
+       fs.filing_subtype, ci.first_name, ci.last_name, lci.name AS filer,
+       orig.e_filing_id AS orig_e_filing_id,
+       prev.e_filing_id AS prev_e_filing_id
+FROM filing f
+LEFT JOIN LATERAL (
+    SELECT string_agg(DISTINCT s.filing_subtype, ', ') AS filing_subtype
+    FROM filing_subtype s WHERE s.filing_id = f.filing_id
+) fs ON f.entity_id IS NULL
+LEFT JOIN LATERAL (
+    SELECT c.first_name, c.last_name FROM filer_contact_info c
+    WHERE c.filer_id = f.filer_id
+    ORDER BY c.effective_date DESC NULLS LAST, c.id DESC LIMIT 1
+) ci ON f.entity_id IS NULL
+LEFT JOIN LATERAL (
+    SELECT c.entity_id, c.name FROM lobbying_entity_contact_info c
+    WHERE c.entity_id = f.entity_id
+    ORDER BY c.effective_date DESC NULLS LAST, c.id DESC LIMIT 1
+) lci ON f.entity_id IS NOT NULL
+LEFT JOIN e_filing_id orig
+       ON f.amendment AND orig.filing_id = f.amends_orig_id
+LEFT JOIN e_filing_id prev
+       ON f.amendment AND prev.filing_id = f.amends_prev_id
+WHERE f.status = 'filed'
+  AND (fs.filing_subtype IS NOT NULL OR lci.entity_id IS NOT NULL)
+"""
+
+# only one refresh at a time across workers
+PUBLIC_FILING_INDEX_LOCK = 7301
+
+
+async def refresh_public_filing_index(db_session: AsyncSession) -> bool:
+    """Refresh the view, without blocking its readers. False when
+    another refresh is running (it may not see the caller's writes)."""
+
+    locked = (
+        (await db_session.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"),
+            {"key": PUBLIC_FILING_INDEX_LOCK},
+        ))
+        .scalar()
+    )
+    if not locked:
+        return False
+
+    await db_session.execute(
+        text("REFRESH MATERIALIZED VIEW CONCURRENTLY public_filing_index")
+    )
+    return True
+
+
+async def get_public_filing_by_doc(db_session: AsyncSession, doc_public: str):
+    res = (
+        (await db_session.execute(
+            text("""
+                SELECT kind, CAST(filing_id AS VARCHAR) AS filing_id,
+                       e_filing_id, filing_date, filing_type, amendment,
+                       filing_subtype, first_name, last_name, filer
+                FROM public_filing_index
+                WHERE doc_public = :doc_public
+                LIMIT 1
+            """),
+            {"doc_public": doc_public},
+        ))
+        .first()
+    )
+
+    return res
+
+
+# public search in one round trip: best matching filers / lobbying
+# entities and one page of their filings in the date range from
+# public_filing_index, keyset paged on (sort_date, filing_id). total
+# counts the matches up to :count_cap, the first page only.
+# matched_filer_ids (same on every row) is what the result cache tags
+# search results with.
+
+SEARCH_SORTS = {
+    # sort key: (direction, keyset comparison)
+    "-filing_date": ("DESC", "<"),
+    "filing_date": ("ASC", ">"),
+}
+
+SEARCH_MATCHED_FILINGS_SQL = """
+    SELECT i.*
+    FROM filer_matches m
+    JOIN public_filing_index i ON i.filer_id = m.filer_id AND i.kind = 0
+    WHERE (i.filing_date BETWEEN :filed_start AND :filed_end
+           OR i.period_start BETWEEN :start_date AND :end_date)
+      {keyset}
+    UNION ALL
+    SELECT i.*
+    FROM entity_matches m
+    JOIN public_filing_index i ON i.filer_id = m.filer_id AND i.kind = 1
+    WHERE (i.filing_date BETWEEN :filed_start AND :filed_end
+           OR i.period_start BETWEEN :start_date AND :end_date)
+      {keyset}
+"""
+
+# the matched filers / lobbying entities, by full text prefix (the
+# default) or fuzzy: trigram word similarity of the names above the
+# pg_trgm.word_similarity_threshold (see set_fuzzy_threshold), optionally
+# also sounding alike (double metaphone keys). Indexes in migration 0004.
+
+FULL_TEXT_MATCHES_SQL = """
+q AS (
+    SELECT to_tsquery('simple', :tsquery) AS q
+),
+filer_matches AS (
+    SELECT d.filer_id
+    FROM search_document d, q
+    WHERE d.object_type = 'filer' AND d.filer_id IS NOT NULL
+      AND d.document @@ q.q
+    ORDER BY ts_rank_cd(d.document, q.q) DESC
+    LIMIT :matches
+),
+entity_matches AS (
+    SELECT d.filer_id
+    FROM search_document d, q
+    WHERE d.object_type = 'lobbying_entity' AND d.filer_id IS NOT NULL
+      AND d.document @@ q.q
+    GROUP BY d.filer_id
+    ORDER BY max(ts_rank_cd(d.document, q.q)) DESC
+    LIMIT :matches
+)"""
+
+FUZZY_MATCHES_SQL = """
+q AS (
+    SELECT CAST(:query AS TEXT) AS q,
+           search_phonetic_keys(:query) AS keys
+),
+filer_matches AS (
+    SELECT d.filer_id
+    FROM search_document d, q
+    WHERE d.object_type = 'filer' AND d.filer_id IS NOT NULL
+      AND (q.q <% d.names {phonetic})
+    ORDER BY word_similarity(q.q, d.names) DESC
+    LIMIT :matches
+),
+entity_matches AS (
+    SELECT d.filer_id
+    FROM search_document d, q
+    WHERE d.object_type = 'lobbying_entity' AND d.filer_id IS NOT NULL
+      AND (q.q <% d.names {phonetic})
+    GROUP BY d.filer_id
+    ORDER BY max(word_similarity(q.q, d.names)) DESC
+    LIMIT :matches
+)"""
+
+PHONETIC_MATCH_SQL = "OR search_phonetic_keys(d.names) && q.keys"
+
+
+def search_matches_sql(fuzzy: bool = False, phonetic: bool = False) -> str:
+    if not fuzzy:
+        return FULL_TEXT_MATCHES_SQL
+    return FUZZY_MATCHES_SQL.format(
+        phonetic=PHONETIC_MATCH_SQL if phonetic else "")
+
+
+SEARCH_FILINGS_SQL = """
+WITH {matches},
+page AS (
+    SELECT * FROM ({page_filings}) p
+    ORDER BY sort_date {direction}, filing_id {direction}
+    LIMIT :limit
+)
+SELECT p.kind, p.sort_date, CAST(p.filing_id AS VARCHAR) AS filing_id,
+       p.filing_date, p.filing_type, p.doc_public, p.amendment,
+       CAST(p.amends_orig_id AS VARCHAR) AS amends_orig_id,
+       CAST(p.amends_prev_id AS VARCHAR) AS amends_prev_id,
+       p.amendment_number, p.filing_subtype,
+       p.first_name, p.last_name, p.filer,
+       p.orig_e_filing_id, p.prev_e_filing_id,
+       CAST(p.entity_id AS VARCHAR) AS entity_id,
+       (SELECT CAST(array_agg(filer_id) AS VARCHAR[])
+        FROM (SELECT filer_id FROM filer_matches
+              UNION SELECT filer_id FROM entity_matches) m
+       ) AS matched_filer_ids,
+       {total} AS total
+FROM page p
+ORDER BY p.sort_date {direction}, p.filing_id {direction}
+"""
+
+SEARCH_TOTAL_SQL = """(
+    SELECT count(*) FROM (
+        SELECT 1 FROM ({all_filings}) a LIMIT :count_cap
+    ) c
+)"""
+
+
+def search_filings_sql(sort: str, after: bool, count: bool,
+                       fuzzy: bool = False, phonetic: bool = False) -> str:
+    direction, comparison = SEARCH_SORTS[sort]
+
+    keyset = ""
+    if after:
+        keyset = (f"AND (i.sort_date, i.filing_id) "
+                  f"{comparison} (CAST(:after_date AS timestamp), "
+                  f"CAST(:after_id AS uuid))")
+
+    total = "NULL"
+    if count:
+        total = SEARCH_TOTAL_SQL.format(
+            all_filings=SEARCH_MATCHED_FILINGS_SQL.format(keyset=""))
+
+    return SEARCH_FILINGS_SQL.format(
+        matches=search_matches_sql(fuzzy, phonetic),
+        page_filings=SEARCH_MATCHED_FILINGS_SQL.format(keyset=keyset),
+        direction=direction,
+        total=total,
+    )
+
+
+def search_filings_params(
+    query: str,
+    start_date: str,
+    end_date: str,
+    matches: int,
+    fuzzy: bool = False,
+) -> dict:
+    # None when the query has nothing to search for
+
+    if fuzzy:
+        terms = {"query": normalize_name(query)}
+    else:
+        terms = {"tsquery": to_prefix_tsquery(query)}
+    if not list(terms.values())[0]:
+        return None
+
+    start_date = to_date(start_date) if start_date else datetime.date(1970, 1, 1)
+    end_date = to_date(end_date) if end_date else today()
+
+    return {
+        **terms,
+        "matches": matches,
+        "start_date": start_date,
+        "end_date": end_date,
+        # filing_date is a timestamp, include the whole end day
+        "filed_start": datetime.datetime.combine(start_date, datetime.time.min),
+        "filed_end": datetime.datetime.combine(end_date, datetime.time.max),
+    }
+
+
+async def search_filings(
+    db_session: AsyncSession,
+    query: str,
+    start_date: str = None,
+    end_date: str = None,
+    *,
+    matches: int = 100,
+    sort: str = "-filing_date",
+    limit: int = 50,
+    after: tuple = None,
+    count_cap: int = 1000,
+    fuzzy: bool = False,
+    phonetic: bool = False,
+    threshold: float = None,
+) -> list:
+    """One page of filings for a public search, in sort order.
+
+    after is the (sort_date, filing_id) of the last row of the previous
+    page. Rows have a total column (capped at count_cap) on the first
+    page, it is null after that. fuzzy matches names by similarity (at
+    least threshold) instead of prefixes, phonetic also by sound.
+    """
+
+    params = search_filings_params(query, start_date, end_date, matches,
+                                   fuzzy)
+    if params is None:
+        return []
+
+    if fuzzy and threshold is not None:
+        await set_fuzzy_threshold(db_session, threshold)
+
+    params["limit"] = limit
+    params["count_cap"] = count_cap
+    if after is not None:
+        params["after_date"], params["after_id"] = after
+
+    sql = search_filings_sql(sort, after is not None, after is None,
+                             fuzzy, phonetic)
+    res = (await db_session.execute(text(sql), params)).all()
+
+    return res
+
+
+async def stream_search_filings(
+    db_session: AsyncSession,
+    query: str,
+    start_date: str = None,
+    end_date: str = None,
+    *,
+    matches: int = 100,
+    sort: str = "-filing_date",
+    batch_size: int = 500,
+    fuzzy: bool = False,
+    phonetic: bool = False,
+    threshold: float = None,
+):
+    """All filings for a public search, in sort order, as they come.
+
+    Server side cursor, only batch_size rows are held at a time.
+    """
+
+    params = search_filings_params(query, start_date, end_date, matches,
+                                   fuzzy)
+    if params is None:
+        return
+
+    if fuzzy and threshold is not None:
+        await set_fuzzy_threshold(db_session, threshold)
+
+    # LIMIT NULL, no limit
+    params["limit"] = None
+
+    sql = search_filings_sql(sort, False, False, fuzzy, phonetic)
+    sql = text(sql).execution_options(max_row_buffer=batch_size)
+    result = await db_session.stream(sql, params)
+    async for partition in result.partitions(batch_size):
+        for row in partition:
+            yield row
+
+
+# admin typeahead entries, from the search documents: every name a filer
+# / lobbying entity was known by ("last first" and "first last" for
+# filers) for prefix matching, the latest one for display. updated is
+# what incremental syncs page on.
+
+FILER_TYPEAHEAD_SQL = """
+SELECT CAST(d.object_id AS VARCHAR) AS object_id,
+       CAST(d.filer_id AS VARCHAR) AS filer_id,
+       hr.hr_id, d.updated, latest.first_name, latest.last_name,
+       NULL AS name, n.names, {rank} AS rank
+FROM search_document d
+LEFT JOIN human_readable_id hr ON hr.object_id = d.object_id
+LEFT JOIN LATERAL (
+    SELECT array_agg(DISTINCT concat_ws(' ', ci.last_name, ci.first_name))
+           || array_agg(DISTINCT concat_ws(' ', ci.first_name, ci.last_name))
+           AS names
+    FROM filer_contact_info ci
+    WHERE ci.filer_id = d.object_id
+) n ON true
+LEFT JOIN LATERAL (
+    SELECT ci.first_name, ci.last_name
+    FROM filer_contact_info ci
+    WHERE ci.filer_id = d.object_id
+    ORDER BY ci.effective_date DESC NULLS LAST, ci.id DESC
+    LIMIT 1
+) latest ON true
+WHERE d.object_type = 'filer' {where}
+{order}
+LIMIT :limit
+"""
+
+LOBBYING_ENTITY_TYPEAHEAD_SQL = """
+SELECT CAST(d.object_id AS VARCHAR) AS object_id,
+       CAST(d.filer_id AS VARCHAR) AS filer_id,
+       hr.hr_id, d.updated, NULL AS first_name, NULL AS last_name,
+       latest.name, n.names, {rank} AS rank
+FROM search_document d
+LEFT JOIN human_readable_id hr ON hr.object_id = d.object_id
+LEFT JOIN LATERAL (
+    SELECT array_agg(DISTINCT ci.name) AS names
+    FROM lobbying_entity_contact_info ci
+    WHERE ci.entity_id = d.object_id
+) n ON true
+LEFT JOIN LATERAL (
+    SELECT ci.name
+    FROM lobbying_entity_contact_info ci
+    WHERE ci.entity_id = d.object_id
+    ORDER BY ci.effective_date DESC NULLS LAST, ci.id DESC
+    LIMIT 1
+) latest ON true
+WHERE d.object_type = 'lobbying_entity' {where}
+{order}
+LIMIT :limit
+"""
+
+
+async def get_typeahead_entries(
+    db_session: AsyncSession,
+    object_type: str,
+    *,
+    since: datetime.datetime = None,
+    query: str = None,
+    fuzzy: bool = False,
+    limit: int = None,
+) -> list:
+    """Typeahead entries of one object type.
+
+    since: the ones whose search document changed after it (all when
+    None). query: the ones matching it as prefixes, through the full
+    text index, the fallback while the in memory index loads. With fuzzy
+    the ones with names similar to it or sounding like it, best first
+    (see set_fuzzy_threshold).
+    """
+
+    sql = FILER_TYPEAHEAD_SQL
+    if object_type == "lobbying_entity":
+        sql = LOBBYING_ENTITY_TYPEAHEAD_SQL
+
+    where, params = [], {"limit": limit}
+    rank, order = "NULL", ""
+    if since is not None:
+        where.append("AND d.updated > CAST(:since AS timestamptz)")
+        params["since"] = since
+    if query is not None and fuzzy:
+        params["query"] = normalize_name(query)
+        if not params["query"]:
+            return []
+        where.append("AND (:query <% d.names OR search_phonetic_keys(d.names)"
+                     " && search_phonetic_keys(:query))")
+        rank = "word_similarity(:query, d.names)"
+        order = "ORDER BY rank DESC"
+    elif query is not None:
+        tsquery = to_prefix_tsquery(query)
+        if not tsquery:
+            return []
+        where.append("AND d.document @@ to_tsquery('simple', :tsquery)")
+        params["tsquery"] = tsquery
+
+    sql = sql.format(where=" ".join(where), rank=rank, order=order)
+    res = (await db_session.execute(text(sql), params)).all()
+
+    return res
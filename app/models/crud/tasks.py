@@ -1,7 +1,7 @@
 from typing import Optional
 from sqlalchemy import select
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.encoders import jsonable_encoder
 from app.models.users import User
 from app.models.tasks import Task
@@ -9,7 +9,7 @@ from app.models.tasks import Task
 
 async def insert_task(
     *,
-    db_session: Session,
+    db_session: AsyncSession,
     task_ref: str,
     task_type: str,
     assigned_to_user_id: int = False,
@@ -31,36 +31,36 @@ async def insert_task(
     new_task.meta = meta
 
     db_session.add(new_task)
-    db_session.commit()
+    await db_session.flush()
 
     return new_task
 
-async def get_task_by_ref(db_session: Session, task_ref: str):
+async def get_task_by_ref(db_session: AsyncSession, task_ref: str):
 
-    res = db_session.execute(
+    res = (await db_session.execute(
         select(Task).filter(Task.task_ref == task_ref)
-    ).unique().scalar()
+    )).unique().scalar()
 
     return res
 
-async def get_all_admin_tasks(db_session: Session):
+async def get_all_admin_tasks(db_session: AsyncSession):
 
-    res = db_session.execute(
+    res = (await db_session.execute(
         select(Task)
         .filter(Task.admin_task == True)
         .order_by(Task.updated)
-    ).unique().scalars().all()
+    )).unique().scalars().all()
 
     return res
 
 
-async def get_all_open_admin_tasks(db_session: Session):
+async def get_all_open_admin_tasks(db_session: AsyncSession):
 
-    res = db_session.execute(
+    res = (await db_session.execute(
         select(Task)
         .filter(Task.admin_task == True)
         .filter(Task.complete == False)
         .order_by(Task.updated)
-    ).unique().scalars().all()
+    )).unique().scalars().all()
 
     return res
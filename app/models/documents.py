@@ -36,6 +36,7 @@ class Document(CustomBase):
     filename = Column(String)
     s3bucket = Column(String)
     s3key = Column(String)
+    sha256 = Column(String)
     public = Column(Boolean, nullable=False, server_default='f')
     uploader_user_id = Column(Integer, ForeignKey("user.id"))
 
@@ -48,6 +49,40 @@ class Document(CustomBase):
     __table_args__ = (
         Index('idx_doc_id', 'doc_id'),
     )
+
+
+# queued -> rendering -> done, or back to queued to retry, failed once
+# the attempts run out
+RENDER_STATUSES = [
+    "queued",
+    "rendering",
+    "done",
+    "failed",
+]
+
+
+class RenderJob(CustomBase):
+    # rendering a filed filing's documents, off the request path
+    # (app.api.utility.render_jobs). Written in the transaction that files it.
+    id = Column(Integer, primary_key=True)
+    filing_id = Column(UUID, ForeignKey("filing.filing_id"), nullable=False)
+    template = Column(String, nullable=False)
+    template_version = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, server_default="queued")
+    attempts = Column(Integer, nullable=False, server_default="0")
+    error = Column(String)
+    run_after = Column(DateTime(timezone=True),
+                       nullable=False, default=func.now())
+
+    created = Column(DateTime(timezone=True),
+                     nullable=False, default=func.now())
+    updated = Column(DateTime(timezone=True),
+                     nullable=False, default=func.now(),
+                     onupdate=func.now())
+
+    __table_args__ = (
+        Index('idx_render_job_filing_id', 'filing_id'),
+    )
     
 # class DocumentPermission
 # TBD
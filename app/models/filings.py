@@ -140,3 +140,17 @@ class FilingRaw(CustomBase):
     updated = Column(
         DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now()
     )
+
+
+class FilingLineage(CustomBase):
+    # the version chain of every filing, flat: the original it belongs to,
+    # its version (0 for the original, else its amendment_number) and
+    # whether it is the latest filed version of the chain. Written with
+    # the filing (app.models.crud.filings), indexes in the migrations.
+    filing_id = Column(UUID, ForeignKey("filing.filing_id"), primary_key=True)
+    orig_id = Column(UUID, nullable=False)
+    version = Column(Integer, nullable=False)
+    latest = Column(Boolean, nullable=False, server_default="f")
+    updated = Column(
+        DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now()
+    )
@@ -0,0 +1,31 @@
+from sqlalchemy import (
+    Column,
+    String,
+    DateTime,
+)
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.sql import func
+from app.models.bases import CustomBase
+
+SEARCH_OBJECT_TYPES = [
+    "filer",
+    "lobbying_entity",
+]
+
+
+class SearchDocument(CustomBase):
+    # full text search document per filer / lobbying entity, all names
+    # it was ever known by plus its human readable and e-filing ids.
+    # Kept up to date by app.models.crud.search, GIN index on document
+    # in the migrations.
+    object_type = Column(String, primary_key=True)
+    object_id = Column(UUID, primary_key=True)
+
+    # the id filings are looked up by, netfile_filer_id for lobbying entities
+    filer_id = Column(UUID)
+
+    names = Column(String)
+    document = Column(TSVECTOR, nullable=False)
+
+    updated = Column(DateTime(timezone=True), nullable=False,
+                     server_default=func.now())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""(Re)build the filing lineage from the filings.
+
+The app keeps filing_lineage current for the filings it writes, this is
+for everything else: existing data, bulk loads, repairs. Idempotent, one
+transaction. From the repository root:
+
+    python app/scripts/backfill_lineage.py
+    python app/scripts/backfill_lineage.py --database-uri postgresql+psycopg2://...
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.append(os.getcwd())
+from sqlalchemy import create_engine, text
+from app.core.config import PG_URI
+from app.models.crud.filings import backfill_filing_lineage_sql
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("general")
+
+
+def backfill(engine):
+    with engine.begin() as connection:
+        for sql in backfill_filing_lineage_sql():
+            res = connection.execute(text(sql))
+            logger.info(f"{res.rowcount} rows: {sql.strip().splitlines()[0]}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="backfill filing lineage")
+    parser.add_argument("--database-uri", default=PG_URI)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    backfill(create_engine(args.database_uri))
+    logger.info(f"filing lineage rebuilt in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
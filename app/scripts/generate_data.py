@@ -0,0 +1,620 @@
+#!/usr/bin/env python
+"""Generate a large, realistic data set for capacity and benchmark runs.
+
+Filers (with name history), their filings, lobbying entities with
+ec601 registrations / ec603 quarterlies built from the form templates
+and the ec601 mock filing, amendment chains of varying depth. Rows are
+bulk loaded with COPY. The output only depends on --seed and the
+volume options: every object is generated from its own rng, seeded
+from (seed, kind, index), so the same run always produces the same ids.
+
+    python app/scripts/generate_data.py --filers 200000 \\
+        --lobbying-entities 5000 --seed 1
+
+Loads into PG_URI (or --database-uri). The tables must exist, see
+app.db.utils.create_db.
+"""
+import os
+import io
+import sys
+import csv
+import json
+import copy
+import uuid
+import random
+import hashlib
+import logging
+import argparse
+import datetime
+
+sys.path.append(os.getcwd())
+from sqlalchemy import create_engine
+from app.core.config import PG_URI
+from app.schemas.form_templates.lobbyist import ec601, ec603
+from app.models.filings import FILING_TYPE_MAPPING
+from app.models.crud.search import search_document_sql
+from app.models.crud.filings import backfill_filing_lineage_sql
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("general")
+
+MOCK_EC601 = "test/data/ec601-mock-data.json"
+
+FIRST_NAMES = ["Maria", "James", "Linda", "Robert", "Ana", "David", "Karen",
+               "Jose", "Susan", "Michael", "Nancy", "Daniel", "Lisa", "Carlos",
+               "Emily", "Kevin", "Sofia", "Brian", "Grace", "Luis", "Thanh",
+               "Mei", "Fatima", "Omar", "Priya", "Hiroshi", "Olga", "Kofi"]
+LAST_NAMES = ["Garcia", "Smith", "Nguyen", "Johnson", "Martinez", "Brown",
+              "Lopez", "Davis", "Hernandez", "Miller", "Wilson", "Gonzalez",
+              "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez",
+              "Clark", "Ramirez", "Lewis", "Robinson", "Walker", "Young",
+              "Tran", "Kim", "Patel", "Chen", "Flores", "Rivera", "Cruz"]
+COMPANY_WORDS = ["Harbor", "Mesa", "Pacific", "Coronado", "Balboa", "Torrey",
+                 "Point", "Loma", "Mission", "Civic", "Coastal", "Sunset",
+                 "Gaslamp", "Hillcrest", "Kearny", "Otay", "Pines", "Bay"]
+COMPANY_SUFFIXES = ["Group", "Partners", "Strategies", "Advocates",
+                    "Public Affairs", "Consulting", "LLC", "Inc."]
+CLIENT_KINDS = ["Construction Company", "Developer", "Hotel Operator",
+                "Tech Company", "Non-Profit", "Utility", "Trade Association"]
+DECISIONS = ["Marina Project", "Zoning Change", "Stadium Lease",
+             "Housing Ordinance", "Parking District", "Trolley Extension"]
+STREETS = ["Broadway", "Market St", "India St", "Park Blvd", "El Cajon Blvd",
+           "University Ave", "Rosecrans St", "Garnet Ave"]
+ZIPCODES = ["92101", "92102", "92103", "92104", "92108", "92109", "92110"]
+
+# non lobbyist filings and their subtypes
+FILER_FILING_TYPES = {
+    "fppc700": ["Annual", "Assuming Office", "Leaving Office"],
+    "fppc801": ["Original"],
+    "fppc802": ["Original"],
+    "fppc803": ["Original"],
+    "ec700": ["Mid-Year"],
+}
+QUARTERS = {
+    "Q1": ("01-01", "03-31"),
+    "Q2": ("04-01", "06-30"),
+    "Q3": ("07-01", "09-30"),
+    "Q4": ("10-01", "12-31"),
+}
+
+# human readable filing ids, kept clear of the range the app hands out
+E_FILING_ID_START = 900000000
+
+
+# determinism helpers
+
+def object_rng(seed, kind, index):
+    return random.Random(f"{seed}:{kind}:{index}")
+
+
+def object_uuid(seed, kind, index):
+    digest = hashlib.md5(f"{seed}:{kind}:{index}".encode()).digest()
+    return str(uuid.UUID(bytes=digest, version=4))
+
+
+def random_date(rng, year):
+    return datetime.date(year, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+
+
+def timestamp(d):
+    return datetime.datetime.combine(d, datetime.time(12, 0),
+                                     tzinfo=datetime.timezone.utc)
+
+
+# COPY buffers
+
+class CopyBuffer:
+    """Rows for one table, written as csv and loaded with COPY."""
+
+    def __init__(self, table, columns):
+        self.table = table
+        self.columns = columns
+        self.count = 0
+        self.reset()
+
+    def reset(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.count = 0
+
+    def add(self, **row):
+        self.writer.writerow([self.format(row.get(c)) for c in self.columns])
+        self.count += 1
+
+    @staticmethod
+    def format(value):
+        if value is None:
+            return r"\N"
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def copy(self, cursor):
+        if self.count == 0:
+            return 0
+        self.buffer.seek(0)
+        columns = ", ".join(self.columns)
+        cursor.copy_expert(
+            f'COPY "{self.table}" ({columns}) FROM STDIN '
+            r"WITH (FORMAT csv, NULL '\N')",
+            self.buffer
+        )
+        count = self.count
+        self.reset()
+        return count
+
+
+TIMESTAMPS = ["created", "updated"]
+
+# in foreign key order
+TABLES = [
+    ("filer", ["filer_id", "email", "active"] + TIMESTAMPS),
+    ("filer_contact_info", ["filer_id", "first_name", "middle_name",
+                            "last_name", "address1", "city", "zipcode",
+                            "state", "country", "phone", "email",
+                            "effective_date"] + TIMESTAMPS),
+    ("filer_filer_type", ["filer_id", "filer_type"]),
+    ("entity", ["entity_id", "entity_type"] + TIMESTAMPS),
+    ("lobbying_entity", ["entity_id", "netfile_filer_id",
+                         "filer_email_confirmed", "active",
+                         "reviewed"] + TIMESTAMPS),
+    ("lobbying_entity_contact_info", ["entity_id", "name", "address1", "city",
+                                      "zipcode", "state", "country", "phone",
+                                      "effective_date"] + TIMESTAMPS),
+    ("lobbying_entity_lobbyist_type", ["entity_id", "lobbyist_type"]),
+    ("lobbying_entity_filer", ["entity_id", "filer_id", "active"]),
+    ("lobbying_lobby_entity", ["entity_id"]),
+    ("lobbying_lobby_entity_contact_info", ["id", "entity_id", "individual",
+                                            "name_first", "name_last_or_org",
+                                            "address1", "city", "zipcode",
+                                            "state", "country", "phone",
+                                            "entity_type", "filing_date"]),
+    ("lobbying_muni_decision", ["decision_id"]),
+    ("lobbying_muni_decision_info", ["id", "decision_id", "description_short",
+                                     "description_detail", "outcome_sought"]),
+    ("e_filing_id", ["e_filing_id", "filing_id"]),
+    ("filing", ["filing_id", "e_filing_id", "filer_id", "entity_id", "efiled",
+                "amendment", "amends_orig_id", "amends_prev_id",
+                "amendment_number", "form_name", "filing_type", "status",
+                "doc_public", "filing_date", "period_start", "period_end",
+                "deadline"] + TIMESTAMPS),
+    ("filing_subtype", ["filing_id", "filing_subtype"]),
+    ("filing_raw", ["filing_id", "raw_json"] + TIMESTAMPS),
+    ("lobbying_filing_verification", ["id", "filing_id", "filer_title",
+                                      "location", "date", "signature"]),
+    ("lobbying_filing_lobbyist", ["id", "filing_id", "lobby_entity_id",
+                                  "lobby_entity_contact_info_id",
+                                  "effective_date", "ordinal"]),
+    ("lobbying_filing_client", ["id", "filing_id", "lobby_entity_id",
+                                "lobby_entity_contact_info_id",
+                                "client_description", "effective_date",
+                                "coalition", "ordinal"]),
+    ("lobbying_filing_muni_decision", ["id", "filing_id", "decision_id",
+                                       "decision_info_id", "lobby_entity_id",
+                                       "filing_client_id", "ordinal"]),
+]
+
+
+class Generator:
+
+    def __init__(self, *, seed, start_year, years, filers, filings_per_filer,
+                 lobbying_entities, lobbyists_per_entity, clients_per_entity,
+                 amendment_rate, max_amendment_depth, name_change_rate):
+        self.seed = seed
+        self.start_year = start_year
+        self.years = years
+        self.filers = filers
+        self.filings_per_filer = filings_per_filer
+        self.lobbying_entities = lobbying_entities
+        self.lobbyists_per_entity = lobbyists_per_entity
+        self.clients_per_entity = clients_per_entity
+        self.amendment_rate = amendment_rate
+        self.max_amendment_depth = max_amendment_depth
+        self.name_change_rate = name_change_rate
+
+        self.buffers = {name: CopyBuffer(name, columns)
+                        for name, columns in TABLES}
+        self.totals = {name: 0 for name, columns in TABLES}
+        self.e_filing_ids = E_FILING_ID_START
+
+        with open(MOCK_EC601, "r") as infile:
+            self.mock_ec601 = json.load(infile)
+
+    @property
+    def last_year(self):
+        return self.start_year + self.years - 1
+
+    def uuid(self, kind, index):
+        return object_uuid(self.seed, kind, index)
+
+    def e_filing_id(self):
+        # generation order is fixed, so a counter is deterministic too
+        self.e_filing_ids += 1
+        return str(self.e_filing_ids)
+
+    def add(self, table, **row):
+        self.buffers[table].add(**row)
+
+    def flush(self, cursor):
+        for name, columns in TABLES:
+            self.totals[name] += self.buffers[name].copy(cursor)
+
+    # filers
+
+    def filer(self, i):
+        rng = object_rng(self.seed, "filer", i)
+        filer_id = self.uuid("filer", i)
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        created = timestamp(datetime.date(self.start_year, 1, 1))
+
+        self.add("filer", filer_id=filer_id, email=f"filer{i}@example.com",
+                 active=True, created=created, updated=created)
+
+        # name history, most recent entry wins
+        effective = datetime.date(self.start_year, 1, 1)
+        changes = 0
+        while True:
+            self.add("filer_contact_info", filer_id=filer_id,
+                     first_name=first_name,
+                     middle_name=rng.choice([None, "A.", "J.", "M."]),
+                     last_name=last_name,
+                     address1=f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+                     city="San Diego", zipcode=rng.choice(ZIPCODES),
+                     state="CA", country="US",
+                     phone=f"619-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+                     email=f"filer{i}@example.com",
+                     effective_date=effective,
+                     created=timestamp(effective), updated=timestamp(effective))
+            if changes >= 2 or rng.random() >= self.name_change_rate:
+                break
+            changes += 1
+            last_name = rng.choice(LAST_NAMES)
+            effective = random_date(rng, rng.randint(effective.year,
+                                                     self.last_year))
+
+        self.add("filer_filer_type", filer_id=filer_id, filer_type="sei")
+
+        count = max(0, int(rng.gauss(self.filings_per_filer,
+                                     self.filings_per_filer / 3)))
+        for n in range(count):
+            filing_type = rng.choice(list(FILER_FILING_TYPES.keys()))
+            year = rng.randint(self.start_year, self.last_year)
+            subtype = rng.choice(FILER_FILING_TYPES[filing_type])
+            self.filing_chain(
+                rng, key=f"filer:{i}:{n}", filer_id=filer_id, entity_id=None,
+                filing_type=filing_type, year=year,
+                period=(datetime.date(year, 1, 1), datetime.date(year, 12, 31)),
+                subtype=subtype, raw=lambda filing_id: {"form": filing_type})
+
+    # lobbying entities
+
+    def lobbying_entity(self, i):
+        rng = object_rng(self.seed, "lobbying_entity", i)
+        entity_id = self.uuid("lobbying_entity", i)
+        filer_index = rng.randrange(self.filers) if self.filers else None
+        filer_id = self.uuid("filer", filer_index) if self.filers else None
+        lobbyist_type = rng.choice(["firm", "firm", "firm", "org"])
+        created = timestamp(datetime.date(self.start_year, 1, 1))
+
+        self.add("entity", entity_id=entity_id, entity_type="lobbying",
+                 created=created, updated=created)
+        self.add("lobbying_entity", entity_id=entity_id,
+                 netfile_filer_id=filer_id, filer_email_confirmed=True,
+                 active=True, reviewed=True, created=created, updated=created)
+        self.add("lobbying_entity_lobbyist_type", entity_id=entity_id,
+                 lobbyist_type=lobbyist_type)
+        if filer_id is not None:
+            self.add("lobbying_entity_filer", entity_id=entity_id,
+                     filer_id=filer_id, active=True)
+
+        # name history, some firms rename
+        name = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+        names = [(datetime.date(self.start_year, 1, 1), name)]
+        if rng.random() < self.name_change_rate:
+            renamed = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+            names.append((random_date(rng, rng.randint(self.start_year,
+                                                       self.last_year)),
+                          renamed))
+        contact = {
+            "address1": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+            "city": "San Diego", "zipcode": rng.choice(ZIPCODES),
+            "state": "CA",
+            "phone": f"619-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+        }
+        for effective, entity_name in names:
+            self.add("lobbying_entity_contact_info", entity_id=entity_id,
+                     name=entity_name, country="US", effective_date=effective,
+                     created=timestamp(effective), updated=timestamp(effective),
+                     **contact)
+
+        # the people and clients that show up in the schedules
+        lobbyists = [self.lobby_entity(rng, f"{i}:lobbyist:{n}", True)
+                     for n in range(self.lobbyists_per_entity)]
+        clients = [self.lobby_entity(rng, f"{i}:client:{n}", False)
+                   for n in range(self.clients_per_entity)]
+        decisions = [self.muni_decision(rng, f"{i}:decision:{n}")
+                     for n in range(max(1, self.clients_per_entity // 2))]
+
+        for year in range(self.start_year, self.last_year + 1):
+            name = [n for d, n in names if d.year <= year][-1]
+            info = dict(contact, name=name,
+                        effective_date=f"{self.start_year}-01-01")
+
+            def registration(filing_id, year=year, info=info):
+                return self.ec601_raw(rng, filing_id, year, info, filer_id,
+                                      lobbyists, clients, decisions)
+
+            self.filing_chain(
+                rng, key=f"entity:{i}:{year}:ec601", filer_id=filer_id,
+                entity_id=entity_id, filing_type="ec601", year=year,
+                period=(datetime.date(year, 1, 1), datetime.date(year, 12, 31)),
+                subtype=None, raw=registration, lobbyists=lobbyists,
+                clients=clients, decisions=decisions)
+
+            for quarter, (start, end) in QUARTERS.items():
+                period = (datetime.date.fromisoformat(f"{year}-{start}"),
+                          datetime.date.fromisoformat(f"{year}-{end}"))
+
+                def quarterly(filing_id, year=year, quarter=quarter,
+                              period=period, info=info):
+                    return self.ec603_raw(filing_id, year, quarter, period,
+                                          info, filer_id)
+
+                self.filing_chain(
+                    rng, key=f"entity:{i}:{year}:{quarter}:ec603",
+                    filer_id=filer_id, entity_id=entity_id,
+                    filing_type="ec603", year=year, period=period,
+                    subtype=None, raw=quarterly)
+
+    def lobby_entity(self, rng, key, individual):
+        entity_id = self.uuid("lobby_entity", key)
+        info_id = self.uuid("lobby_entity_info", key)
+        if individual:
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        else:
+            first = None
+            last = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+        self.add("lobbying_lobby_entity", entity_id=entity_id)
+        self.add("lobbying_lobby_entity_contact_info", id=info_id,
+                 entity_id=entity_id, individual=individual, name_first=first,
+                 name_last_or_org=last,
+                 address1=f"{rng.randint(1, 9999)} {rng.choice(STREETS)}",
+                 city="San Diego", zipcode=rng.choice(ZIPCODES), state="CA",
+                 country="US", phone=None,
+                 entity_type="lobbyist" if individual else "client")
+        return {"entity_id": entity_id, "info_id": info_id,
+                "individual": individual, "first_name": first,
+                "last_name": last,
+                "description": None if individual else rng.choice(CLIENT_KINDS)}
+
+    def muni_decision(self, rng, key):
+        decision_id = self.uuid("decision", key)
+        info_id = self.uuid("decision_info", key)
+        short = rng.choice(DECISIONS)
+        self.add("lobbying_muni_decision", decision_id=decision_id)
+        self.add("lobbying_muni_decision_info", id=info_id,
+                 decision_id=decision_id, description_short=short,
+                 description_detail=f"{short}, {rng.choice(STREETS)}",
+                 outcome_sought=rng.choice(["Approval", "Denial", "Delay"]))
+        return {"decision_id": decision_id, "info_id": info_id,
+                "description_short": short}
+
+    # filings
+
+    def filing_chain(self, rng, *, key, filer_id, entity_id, filing_type,
+                     year, period, subtype, raw, lobbyists=(), clients=(),
+                     decisions=()):
+        depth = 0
+        if rng.random() < self.amendment_rate:
+            # mostly short chains, with the odd long one
+            depth = min(self.max_amendment_depth,
+                        1 + int(rng.expovariate(1.0)))
+
+        filing_date = random_date(rng, year)
+        if period[1] < filing_date:
+            filing_date = period[1]
+        orig_id = prev_id = None
+        for number in range(depth + 1):
+            filing_key = f"{key}:{number}"
+            filing_id = self.uuid("filing", filing_key)
+            e_filing_id = self.e_filing_id()
+            created = timestamp(filing_date)
+
+            raw_json = raw(filing_id)
+            if number > 0:
+                raw_json["amendment"] = True
+                raw_json["amends_id"] = prev_id
+
+            self.add("e_filing_id", e_filing_id=e_filing_id,
+                     filing_id=filing_id)
+            self.add("filing", filing_id=filing_id, e_filing_id=e_filing_id,
+                     filer_id=filer_id, entity_id=entity_id, efiled=True,
+                     amendment=number > 0, amends_orig_id=orig_id,
+                     amends_prev_id=prev_id,
+                     amendment_number=number if number > 0 else None,
+                     form_name=FILING_TYPE_MAPPING[filing_type],
+                     filing_type=filing_type, status="filed",
+                     doc_public=hashlib.md5(filing_id.encode()).hexdigest(),
+                     filing_date=created.replace(tzinfo=None),
+                     period_start=period[0],
+                     period_end=period[1], created=created, updated=created)
+            if subtype is not None:
+                self.add("filing_subtype", filing_id=filing_id,
+                         filing_subtype=subtype)
+            self.add("filing_raw", filing_id=filing_id, raw_json=raw_json,
+                     created=created, updated=created)
+
+            if filing_type == "ec601":
+                self.ec601_details(filing_id, filing_date, raw_json,
+                                   lobbyists, clients, decisions)
+
+            orig_id = orig_id or filing_id
+            prev_id = filing_id
+            filing_date = filing_date + datetime.timedelta(
+                days=rng.randint(1, 45))
+
+    def ec601_raw(self, rng, filing_id, year, info, filer_id, lobbyists,
+                  clients, decisions):
+        form = ec601()
+        form["meta"] = copy.deepcopy(self.mock_ec601["meta"])
+        form["filing_id"] = filing_id
+        form["year"] = str(year)
+        form["lobbying_entity_contact_info"].update(info)
+        form["filer"]["filer_id"] = filer_id
+        form["verification"] = dict(self.mock_ec601["verification"],
+                                    filer_id=filer_id,
+                                    date=f"{year}-01-{rng.randint(10, 31)}")
+        form["schedule_a"] = [{"lobbyist_entity_id": x["entity_id"],
+                               "ordinal": n}
+                              for n, x in enumerate(lobbyists)]
+        form["schedule_b"] = [
+            {"client_entity_id": x["entity_id"],
+             "client_description": x["description"], "ordinal": n,
+             "muni_decisions": [{"muni_decision_id": d["decision_id"],
+                                 "ordinal": 0}
+                                for d in decisions[n % len(decisions):][:1]],
+             "coalition_or_membership": False, "coalition_members": []}
+            for n, x in enumerate(clients)
+        ]
+        form["directory"]["entity"] = [
+            {"id": x["entity_id"], "individual": x["individual"],
+             "org_name": None if x["individual"] else x["last_name"],
+             "first_name": x["first_name"], "middle_name": None,
+             "last_name": x["last_name"] if x["individual"] else None,
+             "effective_date": f"{year}-01-01",
+             "address": {"address1": None, "city": "San Diego",
+                         "zipcode": None, "state": "CA", "phone": None}}
+            for x in list(lobbyists) + list(clients)
+        ]
+        form["directory"]["muni_decision"] = [
+            {"id": d["decision_id"], "description_short": d["description_short"],
+             "description_detail": None, "outcome_sought": None}
+            for d in decisions
+        ]
+        return form
+
+    def ec603_raw(self, filing_id, year, quarter, period, info, filer_id):
+        form = ec603()
+        form["filing_id"] = filing_id
+        form["year"] = str(year)
+        form["quarter"] = quarter
+        form["period_start"] = str(period[0])
+        form["period_end"] = str(period[1])
+        form["lobbying_entity_contact_info"].update(info)
+        form["filer"]["filer_id"] = filer_id
+        return form
+
+    def ec601_details(self, filing_id, filing_date, raw_json, lobbyists,
+                      clients, decisions):
+        verification = raw_json["verification"]
+        self.add("lobbying_filing_verification", id=self.uuid("verif", filing_id),
+                 filing_id=filing_id, filer_title=verification["filer_title"],
+                 location=verification["location"], date=filing_date,
+                 signature=verification["signature"])
+        for n, x in enumerate(lobbyists):
+            self.add("lobbying_filing_lobbyist",
+                     id=self.uuid("filing_lobbyist", f"{filing_id}:{n}"),
+                     filing_id=filing_id, lobby_entity_id=x["entity_id"],
+                     lobby_entity_contact_info_id=x["info_id"],
+                     effective_date=filing_date, ordinal=n)
+        for n, x in enumerate(clients):
+            client_id = self.uuid("filing_client", f"{filing_id}:{n}")
+            self.add("lobbying_filing_client", id=client_id,
+                     filing_id=filing_id, lobby_entity_id=x["entity_id"],
+                     lobby_entity_contact_info_id=x["info_id"],
+                     client_description=x["description"],
+                     effective_date=filing_date, coalition=False, ordinal=n)
+            if decisions:
+                d = decisions[n % len(decisions)]
+                self.add("lobbying_filing_muni_decision",
+                         id=self.uuid("filing_decision", f"{filing_id}:{n}"),
+                         filing_id=filing_id, decision_id=d["decision_id"],
+                         decision_info_id=d["info_id"],
+                         lobby_entity_id=x["entity_id"],
+                         filing_client_id=client_id, ordinal=0)
+
+    # driver
+
+    def run(self, connection, chunk_size):
+        cursor = connection.cursor()
+        for kind, total, make in [("filers", self.filers, self.filer),
+                                  ("lobbying entities", self.lobbying_entities,
+                                   self.lobbying_entity)]:
+            for start in range(0, total, chunk_size):
+                for i in range(start, min(start + chunk_size, total)):
+                    make(i)
+                self.flush(cursor)
+                connection.commit()
+                logger.info(f"{kind}: {min(start + chunk_size, total)}/{total}")
+
+        # COPY bypasses the app, build the search documents in one go
+        for object_type in ["filer", "lobbying_entity"]:
+            cursor.execute(search_document_sql(object_type, ids=False))
+            connection.commit()
+        logger.info("search documents rebuilt")
+        for sql in backfill_filing_lineage_sql():
+            cursor.execute(sql)
+        connection.commit()
+        logger.info("filing lineage rebuilt")
+        cursor.execute("REFRESH MATERIALIZED VIEW public_filing_index")
+        connection.commit()
+        logger.info("public filing index refreshed")
+        cursor.close()
+        return self.totals
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="generate eFile test data")
+    parser.add_argument("--database-uri", default=PG_URI)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start-year", type=int, default=2011)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--filers", type=int, default=100000)
+    parser.add_argument("--filings-per-filer", type=float, default=8)
+    parser.add_argument("--lobbying-entities", type=int, default=2000)
+    parser.add_argument("--lobbyists-per-entity", type=int, default=3)
+    parser.add_argument("--clients-per-entity", type=int, default=8)
+    parser.add_argument("--amendment-rate", type=float, default=0.15)
+    parser.add_argument("--max-amendment-depth", type=int, default=6)
+    parser.add_argument("--name-change-rate", type=float, default=0.08)
+    parser.add_argument("--chunk-size", type=int, default=2000,
+                        help="filers / entities per COPY round")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    generator = Generator(
+        seed=args.seed,
+        start_year=args.start_year,
+        years=args.years,
+        filers=args.filers,
+        filings_per_filer=args.filings_per_filer,
+        lobbying_entities=args.lobbying_entities,
+        lobbyists_per_entity=args.lobbyists_per_entity,
+        clients_per_entity=args.clients_per_entity,
+        amendment_rate=args.amendment_rate,
+        max_amendment_depth=args.max_amendment_depth,
+        name_change_rate=args.name_change_rate,
+    )
+
+    engine = create_engine(args.database_uri)
+    connection = engine.raw_connection()
+    try:
+        totals = generator.run(connection, args.chunk_size)
+    finally:
+        connection.close()
+
+    for table, count in totals.items():
+        logger.info(f"{table}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
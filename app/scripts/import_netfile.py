@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+"""Import legacy NetFile pdfs into document storage.
+
+Walks a manifest (csv) or a directory of pdfs, stores each file once
+under a content addressed key (netfile/<sha256>.pdf, identical files
+share one object), writes its document row and links it to its filing.
+From the repository root:
+
+    python app/scripts/import_netfile.py --manifest netfile.csv
+    python app/scripts/import_netfile.py --directory /data/netfile/pdfs
+
+Manifest columns: path (relative to the manifest), and optionally
+doc_id, filing_id, netfile_filer_id, netfile_user_id. In a directory the
+file name (without .pdf) is the doc_id. A row with a filing_id sets that
+filing's doc_public, the doc_id defaults to the filing's doc_public,
+else to the content hash.
+
+Progress is checkpointed (--checkpoint) after every batch: a restarted
+run skips what is done, a batch cut short is redone, which is harmless.
+Uploads run on the storage client's pool, files of
+S3_MULTIPART_THRESHOLD and more go up in parts. When filings were
+linked, public_filing_index is refreshed after the last batch and their
+cached public results invalidated, so public search shows the pdfs. The
+checkpoint keeps their filing ids until then, a run stopped before it
+publishes them on resume.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.getcwd())
+from sqlalchemy import create_engine, text
+from app.core.config import PG_URI, S3_PUBLIC_BUCKET, S3_MAX_CONCURRENCY
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("general")
+
+KEY_PREFIX = "netfile/"
+MANIFEST_COLUMNS = ["path", "doc_id", "filing_id", "netfile_filer_id",
+                    "netfile_user_id"]
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """(sha256 hex, size) of a file, read in chunks."""
+    sha = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+            size += len(chunk)
+    return sha.hexdigest(), size
+
+
+def sniff_mime(path):
+    with open(path, "rb") as f:
+        if f.read(5) == b"%PDF-":
+            return "application/pdf"
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def content_key(sha, mime_type):
+    ext = mimetypes.guess_extension(mime_type) or ""
+    return KEY_PREFIX + sha + ext
+
+
+def read_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            item = {column: (row.get(column) or None) for column in MANIFEST_COLUMNS}
+            item["path"] = os.path.join(base, item["path"])
+            yield item
+
+
+def walk_directory(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                item = {column: None for column in MANIFEST_COLUMNS}
+                item["path"] = os.path.join(root, name)
+                item["doc_id"] = os.path.splitext(name)[0]
+                yield item
+
+
+class Checkpoint:
+    """The source paths already imported, one json line each, appended
+    (and fsynced) per batch. The filing ids of those lines are
+    unpublished until a published line follows them."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.unpublished = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if entry.get("published"):
+                            self.unpublished.clear()
+                            continue
+                        self.done.add(entry["path"])
+                    except (ValueError, KeyError, AttributeError):
+                        # a line cut short by a crash
+                        continue
+                    if entry.get("filing_id"):
+                        self.unpublished.add(entry["filing_id"])
+
+    def append(self, entries):
+        with open(self.path, "a") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record(self, items):
+        # every filing_id, linked or not: a batch redone after a crash
+        # finds its filings already linked
+        self.append({"path": item["path"], "sha256": item["sha256"],
+                     "doc_id": item["doc_id"], "filing_id": item.get("filing_id")}
+                    for item in items)
+        self.done.update(item["path"] for item in items)
+        self.unpublished.update(item["filing_id"] for item in items
+                                if item.get("filing_id"))
+
+    def record_published(self):
+        self.append([{"published": True}])
+        self.unpublished.clear()
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+UPSERT_DOCUMENT_SQL = """
+INSERT INTO document (doc_id, doc_type, mime_type, size_bytes, filename,
+                      s3bucket, s3key, sha256, public, created, updated)
+VALUES (:doc_id, 'uploaded filing', :mime_type, :size_bytes, :filename,
+        :s3bucket, :s3key, :sha256, true, now(), now())
+ON CONFLICT (doc_id) DO UPDATE SET
+    mime_type = EXCLUDED.mime_type,
+    size_bytes = EXCLUDED.size_bytes,
+    filename = EXCLUDED.filename,
+    s3bucket = EXCLUDED.s3bucket,
+    s3key = EXCLUDED.s3key,
+    sha256 = EXCLUDED.sha256,
+    updated = now()
+"""
+
+REFRESH_INDEX_SQL = """
+REFRESH MATERIALIZED VIEW CONCURRENTLY public_filing_index
+"""
+
+LINK_FILING_SQL = """
+UPDATE filing SET doc_public = :doc_id, updated = now()
+WHERE filing_id = CAST(:filing_id AS uuid)
+  AND doc_public IS DISTINCT FROM :doc_id
+"""
+
+
+class NetfileImporter:
+
+    def __init__(self, engine, storage, bucket=S3_PUBLIC_BUCKET,
+                 concurrency=S3_MAX_CONCURRENCY):
+        self.engine = engine
+        self.storage = storage
+        self.bucket = bucket
+        self.hashing = ThreadPoolExecutor(max_workers=concurrency)
+        self.stored = set()
+        self.stats = {"files": 0, "bytes": 0, "uploaded": 0, "deduplicated": 0,
+                      "linked": 0}
+
+    def describe(self, item):
+        item["sha256"], item["size_bytes"] = file_digest(item["path"])
+        item["mime_type"] = sniff_mime(item["path"])
+        item["s3key"] = content_key(item["sha256"], item["mime_type"])
+        return item
+
+    def resolve_doc_ids(self, connection, items):
+        filing_ids = [item["filing_id"] for item in items
+                      if item["filing_id"] and not item["doc_id"]]
+        current = {}
+        if filing_ids:
+            current = dict(connection.execute(
+                text("""
+                    SELECT CAST(filing_id AS VARCHAR), doc_public FROM filing
+                    WHERE filing_id = ANY(CAST(:ids AS uuid[]))
+                """),
+                {"ids": filing_ids},
+            ).fetchall())
+        for item in items:
+            item["doc_id"] = (item["doc_id"] or current.get(item["filing_id"])
+                              or item["sha256"][:32])
+
+    def missing_keys(self, connection, keys):
+        # stored by an earlier run (or batch) if a document row has it
+        keys = set(keys) - self.stored
+        if keys:
+            existing = connection.execute(
+                text("SELECT DISTINCT s3key FROM document "
+                     "WHERE s3bucket = :bucket AND s3key = ANY(:keys)"),
+                {"bucket": self.bucket, "keys": list(keys)},
+            ).scalars().all()
+            self.stored.update(existing)
+            keys -= set(existing)
+        return keys
+
+    def upload(self, items, keys):
+        first = {}
+        for item in items:
+            if item["s3key"] in keys:
+                first.setdefault(item["s3key"], item)
+
+        files = [open(item["path"], "rb") for item in first.values()]
+        try:
+            self.storage.put_many([
+                {"bucket": self.bucket, "key": item["s3key"], "filedata": f,
+                 "filename": os.path.basename(item["path"]),
+                 "other_metadata": {
+                     k: item[k] for k in ["sha256", "netfile_filer_id", "netfile_user_id"]
+                     if item.get(k)
+                 }}
+                for item, f in zip(first.values(), files)
+            ])
+        finally:
+            for f in files:
+                f.close()
+        self.stored.update(first)
+        return len(first)
+
+    def import_batch(self, items):
+        items = list(self.hashing.map(self.describe, items))
+
+        with self.engine.connect() as connection:
+            self.resolve_doc_ids(connection, items)
+            keys = self.missing_keys(connection, [item["s3key"] for item in items])
+
+        uploaded = self.upload(items, keys)
+
+        linked = 0
+        with self.engine.begin() as connection:
+            for item in items:
+                connection.execute(text(UPSERT_DOCUMENT_SQL), {
+                    "doc_id": item["doc_id"],
+                    "mime_type": item["mime_type"],
+                    "size_bytes": item["size_bytes"],
+                    "filename": os.path.basename(item["path"]),
+                    "s3bucket": self.bucket,
+                    "s3key": item["s3key"],
+                    "sha256": item["sha256"],
+                })
+                if item["filing_id"] and connection.execute(text(LINK_FILING_SQL), {
+                    "doc_id": item["doc_id"], "filing_id": item["filing_id"],
+                }).rowcount:
+                    linked += 1
+
+        self.stats["files"] += len(items)
+        self.stats["bytes"] += sum(item["size_bytes"] for item in items)
+        self.stats["uploaded"] += uploaded
+        self.stats["deduplicated"] += len(items) - uploaded
+        self.stats["linked"] += linked
+        return items
+
+    def run(self, items, checkpoint, batch_size):
+        todo = (item for item in items if item["path"] not in checkpoint.done)
+        for batch in batches(todo, batch_size):
+            checkpoint.record(self.import_batch(batch))
+            logger.info(f"{self.stats['files']} files imported, "
+                        f"{self.stats['uploaded']} uploaded, "
+                        f"{self.stats['deduplicated']} deduplicated")
+        if checkpoint.unpublished:
+            self.publish(checkpoint.unpublished)
+            checkpoint.record_published()
+
+    def publish(self, filing_ids):
+        # the public endpoints read filings' doc_public from the view
+        from app.models.crud.search import PUBLIC_FILING_INDEX_LOCK
+        from app.utils.cache import invalidate
+        from app.utils.public_index import SEARCH_TAG
+
+        with self.engine.begin() as connection:
+            # after a refresh already running, it may not see our writes
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"),
+                               {"key": PUBLIC_FILING_INDEX_LOCK})
+            connection.execute(text(REFRESH_INDEX_SQL))
+        logger.info("public filing index refreshed")
+
+        asyncio.run(invalidate([SEARCH_TAG] + [f"filing:{filing_id}"
+                                               for filing_id in filing_ids]))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="import NetFile pdfs")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest")
+    source.add_argument("--directory")
+    parser.add_argument("--checkpoint",
+                        help="progress file, default <manifest or directory>.checkpoint")
+    parser.add_argument("--bucket", default=S3_PUBLIC_BUCKET)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=S3_MAX_CONCURRENCY,
+                        help="files hashed at a time, uploads use S3_MAX_CONCURRENCY")
+    parser.add_argument("--database-uri", default=PG_URI)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from app.utils.aws import AwsS3
+
+    args = parse_args(argv)
+    source = args.manifest or args.directory.rstrip("/")
+    checkpoint = Checkpoint(args.checkpoint or source + ".checkpoint")
+    items = read_manifest(args.manifest) if args.manifest else walk_directory(args.directory)
+
+    start = time.perf_counter()
+    importer = NetfileImporter(create_engine(args.database_uri), AwsS3(),
+                               args.bucket, args.concurrency)
+    importer.run(items, checkpoint, args.batch_size)
+    logger.info(f"{importer.stats} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Report what importing the app costs, per module.
+
+Runs the import in a fresh interpreter with -X importtime and prints the
+most expensive modules (cumulative, i.e. including what they import) and
+the total. From the repository root:
+
+    python app/scripts/import_time.py
+    python app/scripts/import_time.py --module app.main --top 40
+
+Modules that should only be imported on first use (see HEAVY_MODULES)
+are flagged when they show up.
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+
+# optional / heavy dependencies, imported lazily by the app
+HEAVY_MODULES = ["saml2", "boto3", "botocore", "sendgrid", "jinja2",
+                 "aiohttp", "pandas"]
+
+
+def measure_import(module="app.main"):
+    """Import module in a new interpreter.
+
+    Returns (total seconds, {module: (self us, cumulative us)}).
+    """
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; "
+        "print(time.perf_counter() - start)"
+    )
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.getcwd(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if res.returncode != 0:
+        raise RuntimeError(res.stderr.strip().splitlines()[-1])
+
+    # lines look like: "import time:  self [us] | cumulative | imported package"
+    modules = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(own), int(cumulative))
+
+    return float(res.stdout.strip().splitlines()[-1]), modules
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="import time report")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    total, modules = measure_import(args.module)
+
+    top = sorted(modules.items(), key=lambda x: x[1][1], reverse=True)
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, (own, cumulative) in top[:args.top]:
+        print(f"{cumulative / 1000:>14.1f} {own / 1000:>9.1f}  {name}")
+    print(f"\nimport {args.module}: {total * 1000:.0f} ms")
+
+    heavy = [m for m in HEAVY_MODULES if m in modules]
+    if heavy:
+        print(f"imported eagerly, should be lazy: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,49 @@
+import time
+import asyncio
 import traceback
 import logging
-import aiohttp
 from tenacity import (
     retry,
     stop_after_attempt,
     wait_fixed
 )
-from saml2 import (
-    BINDING_HTTP_POST,
-    BINDING_HTTP_REDIRECT,
-    entity,
-)
 from app.core.config import (
     SAML_METADATA_URL_ADMIN,
     SAML_METADATA_URL_FILER,
     SAML_ACS_URL_ADMIN,
     SAML_ACS_URL_FILER,
     SAML_ENTITY_ID_ADMIN,
-    SAML_ENTITY_ID_FILER
+    SAML_ENTITY_ID_FILER,
+    SAML_METADATA_TTL,
+    SAML_METADATA_MAX_STALE,
+    SAML_METADATA_RETRY_AFTER,
 )
-from saml2.client import Saml2Client
-from saml2.config import Config as Saml2Config
 
 
 logger = logging.getLogger("fastapi")
 
+# saml2 and aiohttp are imported on first use, they are slow to import
+# and most workers never see a SAML login
+BINDING_HTTP_POST = 'urn:oasis:names:tc:SAML:2.0:bindings:HTTP-POST'
+
 @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
 async def get_metadata(url):
 
+    if url.startswith("file://"):
+        # local metadata, for tests and air gapped setups
+        with open(url[len("file://"):], "r") as infile:
+            return infile.read()
+
+    import aiohttp
+
     async with aiohttp.ClientSession() as client:
 
         res = await client.get(url, timeout=3)
+        res.raise_for_status()
         return await res.text()
 
 
-async def saml_client(kind='admin'):
+def saml_settings(kind='admin'):
 
     if kind == 'admin':
         url = SAML_METADATA_URL_ADMIN
@@ -45,7 +54,14 @@ async def saml_client(kind='admin'):
         acs_url = SAML_ACS_URL_ADMIN
         entity_id = SAML_ENTITY_ID_FILER
 
-    meta = await get_metadata(url)
+    return url, acs_url, entity_id
+
+
+def build_saml_client(meta, acs_url, entity_id):
+
+    from saml2 import BINDING_HTTP_REDIRECT
+    from saml2.client import Saml2Client
+    from saml2.config import Config as Saml2Config
 
     settings = {
         'entityid': entity_id,
@@ -71,12 +87,133 @@ async def saml_client(kind='admin'):
                 'want_response_signed': False,
             },
         },
-    }    
+    }
 
     spConfig = Saml2Config()
     spConfig.load(settings)
     spConfig.allow_unknown_attributes = True
-    saml_client = Saml2Client(config=spConfig)
-    return saml_client
+    return Saml2Client(config=spConfig)
+
+
+class SamlClientCache:
+    """Saml2Client per login kind, built from the IdP metadata.
+
+    Fresh for ttl seconds. After that the cached client is returned and
+    refreshed in the background, a failed refresh keeps the old client
+    (stale-while-revalidate). Past max_stale the caller waits for the
+    refresh, and only gets the stale client if that fails too.
+
+    There is at most one fetch per kind in flight, everyone waiting gets
+    its client or its error. After a failure the next fetch waits
+    retry_after seconds, callers in between get that error at once.
+    """
+
+    def __init__(self, ttl=SAML_METADATA_TTL, max_stale=SAML_METADATA_MAX_STALE,
+                 retry_after=SAML_METADATA_RETRY_AFTER, settings=saml_settings):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.retry_after = retry_after
+        self.settings = settings
+        self.entries = {}
+        self.fetching = {}
+        self.failures = {}
+        self.refreshing = {}
+
+    def clear(self):
+        self.entries = {}
+        self.fetching = {}
+        self.failures = {}
+        self.refreshing = {}
+
+    async def load(self, kind):
+        url, acs_url, entity_id = self.settings(kind)
+        if not url:
+            raise Exception(f"No SAML metadata url configured for {kind}.")
+        meta = await get_metadata(url)
+        client = build_saml_client(meta, acs_url, entity_id)
+        self.entries[kind] = (client, time.monotonic())
+        logger.info(f"SAML metadata loaded for {kind}")
+        return client
 
+    async def _fetch(self, kind):
+        try:
+            client = await self.load(kind)
+        except Exception as e:
+            self.failures[kind] = (e, time.monotonic())
+            raise
+        self.failures.pop(kind, None)
+        return client
+
+    def _fetched(self, kind, future):
+        if self.fetching.get(kind) is future:
+            del self.fetching[kind]
+        if not future.cancelled():
+            # retrieved, even when every waiter went away
+            future.exception()
+
+    async def refresh(self, kind):
+        future = self.fetching.get(kind)
+        if future is None:
+            failure = self.failures.get(kind)
+            if failure is not None and time.monotonic() - failure[1] < self.retry_after:
+                raise failure[0]
+            future = asyncio.ensure_future(self._fetch(kind))
+            future.add_done_callback(lambda f: self._fetched(kind, f))
+            self.fetching[kind] = future
+        # a waiter giving up doesn't cancel the others' fetch
+        return await asyncio.shield(future)
+
+    async def _background_refresh(self, kind):
+        try:
+            await self.refresh(kind)
+        except Exception:
+            logger.error(f"SAML metadata refresh failed for {kind}, "
+                         "serving the cached client")
+            logger.exception(traceback.format_exc())
+        finally:
+            self.refreshing.pop(kind, None)
+
+    async def get(self, kind='admin'):
+        entry = self.entries.get(kind)
+        if entry is None:
+            return await self.refresh(kind)
+
+        client, loaded = entry
+        age = time.monotonic() - loaded
+        if age < self.ttl:
+            return client
+
+        if age < self.ttl + self.max_stale:
+            if kind not in self.refreshing:
+                self.refreshing[kind] = asyncio.ensure_future(
+                    self._background_refresh(kind))
+            return client
+
+        try:
+            return await self.refresh(kind)
+        except Exception:
+            logger.error(f"SAML metadata refresh failed for {kind}, "
+                         f"serving a client {int(age)}s old")
+            logger.exception(traceback.format_exc())
+            return client
+
+    async def _warm_up(self, kind):
+        try:
+            await self.refresh(kind)
+        except Exception:
+            logger.error(f"SAML metadata warm up failed for {kind}")
+            logger.exception(traceback.format_exc())
+
+    async def warm_up(self, kinds=('admin', 'filer')):
+        # a missing or unreachable IdP must not stop the app, the kinds
+        # are fetched at the same time
+        await asyncio.gather(*[self._warm_up(kind) for kind in kinds
+                               if self.settings(kind)[0]])
+
+
+saml_client_cache = SamlClientCache()
+
+
+async def saml_client(kind='admin'):
 
+    return await saml_client_cache.get(kind)
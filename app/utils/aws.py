@@ -1,33 +1,145 @@
-import boto3
+import io
+import asyncio
 import logging
-from app.utils.async_utils import (
-    async_wrap
-)
+import threading
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
 from app.core.config import (
     S3_AWS_ACCESS_KEY_ID,
     S3_AWS_SECRET_ACCESS_KEY,
     S3_AWS_REGION,
+    S3_ENDPOINT_URL,
+    S3_MAX_CONCURRENCY,
+    S3_MULTIPART_THRESHOLD,
     EFILE_ENV,
 )
 
 logger = logging.getLogger("fastapi")
 
+
+@lru_cache(maxsize=None)
+def s3_client(key_id, secret, region, endpoint_url=None):
+    # one client per process and credentials: boto3 clients are thread
+    # safe and keep a connection pool, creating one costs tens of ms.
+    # boto3 takes a while to import, only pay for it when used
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=key_id,
+        aws_secret_access_key=secret,
+        region_name=region,
+        endpoint_url=endpoint_url,
+        config=Config(max_pool_connections=S3_MAX_CONCURRENCY),
+    )
+
+
+_executor = None
+
+
+def s3_executor():
+    # the async api runs the blocking calls here, at most
+    # S3_MAX_CONCURRENCY at a time
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=S3_MAX_CONCURRENCY,
+                                       thread_name_prefix="s3")
+    return _executor
+
+
+# (endpoint, bucket) known to exist, checked once per process
+_known_buckets = set()
+_buckets_lock = threading.Lock()
+
+
+# S3 rejects smaller parts, except the last one
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3MultipartWriter(object):
+    """An object written in parts as its data arrives, so memory is one
+    part whatever the size. Use through AwsS3.open_multipart. Objects
+    that end up smaller than a part are stored with a single put."""
+
+    def __init__(self, s3, bucket, key, content_type=None, metadata=None,
+                 part_size=S3_MULTIPART_THRESHOLD):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.extra = {"Metadata": {k: str(v) for k, v in (metadata or {}).items()}}
+        if content_type:
+            self.extra["ContentType"] = content_type
+        self.part_size = max(part_size, S3_MIN_PART_SIZE)
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+
+    def _upload_part(self, data):
+        client = self.s3.client
+        if self.upload_id is None:
+            self.upload_id = client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self.extra)["UploadId"]
+        number = len(self.parts) + 1
+        res = client.upload_part(Bucket=self.bucket, Key=self.key,
+                                 UploadId=self.upload_id, PartNumber=number,
+                                 Body=data)
+        self.parts.append({"ETag": res["ETag"], "PartNumber": number})
+
+    def _flush_parts(self):
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+
+    def _complete(self):
+        client = self.s3.client
+        if self.upload_id is None:
+            client.put_object(Bucket=self.bucket, Key=self.key,
+                              Body=bytes(self.buffer), **self.extra)
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts})
+        self.buffer = bytearray()
+
+    def _abort(self):
+        self.buffer = bytearray()
+        if self.upload_id is not None:
+            self.s3.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.upload_id = None
+
+    async def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= self.part_size:
+            # the caller waits for the part: backpressure on its source
+            await self.s3._offload(self._flush_parts)
+
+    async def complete(self):
+        await self.s3._offload(self._complete)
+
+    async def abort(self):
+        await self.s3._offload(self._abort)
+
+
 class AwsS3(object):
     def __init__(
         self,
         key_id=S3_AWS_ACCESS_KEY_ID,
         secret=S3_AWS_SECRET_ACCESS_KEY,
         region=S3_AWS_REGION,
+        endpoint_url=S3_ENDPOINT_URL,
+        multipart_threshold=S3_MULTIPART_THRESHOLD,
     ):
         self.__key_id = key_id
         self.__secret = secret
         self.__region = region
-        self.__client = boto3.client(
-            "s3",
-            aws_access_key_id=self.__key_id,
-            aws_secret_access_key=self.__secret,
-            region_name=self.__region,
-        )
+        self.__endpoint_url = endpoint_url
+        self.multipart_threshold = multipart_threshold
+
+        self.__client = s3_client(key_id, secret, region, endpoint_url)
 
     @property
     def region(self):
@@ -43,22 +155,41 @@ class AwsS3(object):
                                            Bucket=bucket,
                                            Key=key)
         return res
-    
+
     def replace_metadata(self, bucket, key, new_metadata, ACL=''):
         new_metadata = {k: str(new_metadata[k]) for k in new_metadata}
         res = self.__client.copy_object(Key=key, Bucket=bucket,
                CopySource={"Bucket": bucket, "Key": key},
-                                        Metadata=new_metadata, 
+                                        Metadata=new_metadata,
                                         MetadataDirective="REPLACE",
                                         ACL=ACL)
         return res
-    
+
+    def ensure_bucket(self, bucket):
+        known = (self.__endpoint_url, bucket)
+        if known in _known_buckets:
+            return
+
+        from botocore.exceptions import ClientError
+        with _buckets_lock:
+            if known in _known_buckets:
+                return
+            try:
+                self.__client.head_bucket(Bucket=bucket)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in ["404", "NoSuchBucket"]:
+                    raise
+                self.__create_bucket(bucket)
+            _known_buckets.add(known)
+
     def put_filedata(self, bucket, key, filedata, filename=None,
                      other_metadata={}, ACL=''):
-        response = self.__client.list_buckets()
-        buckets = [x.get("Name") for x in response.get('Buckets',[])]
-        if bucket not in buckets:
-            self.__create_bucket(bucket)
+        """Store filedata (bytes, str or a binary file object).
+
+        Anything from multipart_threshold bytes up, and file objects, go
+        up in parts, in parallel.
+        """
+        self.ensure_bucket(bucket)
 
         metadata = {}
         if filename and isinstance(filename, str):
@@ -69,40 +200,97 @@ class AwsS3(object):
         # cast all metadata values to string for s3 head-object
         metadata = {k: str(metadata[k]) for k in metadata}
 
-        put_response = self.__client.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=filedata,
-            Metadata=metadata,
-            ACL=ACL
+        extra = {"Metadata": metadata}
+        if ACL:
+            extra["ACL"] = ACL
+
+        if isinstance(filedata, str):
+            filedata = filedata.encode()
+
+        if isinstance(filedata, (bytes, bytearray)) \
+           and len(filedata) < self.multipart_threshold:
+            self.__client.put_object(Bucket=bucket, Key=key, Body=filedata,
+                                     **extra)
+            return {"bucket": bucket, "key": key, "multipart": False}
+
+        from boto3.s3.transfer import TransferConfig
+        if isinstance(filedata, (bytes, bytearray)):
+            filedata = io.BytesIO(filedata)
+
+        self.__client.upload_fileobj(
+            filedata, bucket, key,
+            ExtraArgs=extra,
+            Config=TransferConfig(multipart_threshold=self.multipart_threshold,
+                                  multipart_chunksize=self.multipart_threshold),
         )
+        return {"bucket": bucket, "key": key, "multipart": True}
 
-        head_response = self.__client.head_object(Bucket=bucket, Key=key)
+    def put_many(self, items):
+        """put_filedata for each of items (dicts of its arguments),
+        concurrently. Results in the order of items."""
+        return list(s3_executor().map(lambda x: self.put_filedata(**x), items))
 
-        return {"put_object": put_response, "head_object": head_response}
+    def open_multipart(self, bucket, key, content_type=None, metadata=None):
+        self.ensure_bucket(bucket)
+        return S3MultipartWriter(self, bucket, key, content_type, metadata,
+                                 self.multipart_threshold)
 
-    async def async_put_file_data(
-        self, bucket, key, filedata, filename=None, other_metadata={}
-    ):
-        return async_wrap(self.put_file_data)(
-            self, bucket, key, filedata, filename=None, other_metadata={})
-    
-    def get_filedata(self, bucket, key):
+    def get_filedata(self, bucket, key, byte_range=None):
+        # byte_range is a Range header value, "bytes=0-1023"
+        if byte_range:
+            return self.__client.get_object(Bucket=bucket, Key=key,
+                                            Range=byte_range)
         return self.__client.get_object(Bucket=bucket, Key=key)
 
-    async def async_get_file_data(self, key, bucket):
-        return async_wrap(self.get_filedata)(self, key, bucket)
-    
+    def read_filedata(self, bucket, key):
+        return self.get_filedata(bucket, key)["Body"].read()
+
+    def get_many(self, items):
+        """The contents of each (bucket, key) of items, concurrently."""
+        return list(s3_executor().map(lambda x: self.read_filedata(*x), items))
+
+    async def _offload(self, func, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(s3_executor(),
+                                          partial(func, *args, **kwargs))
+
+    async def async_put_filedata(self, bucket, key, filedata, filename=None,
+                                 other_metadata={}, ACL=''):
+        return await self._offload(self.put_filedata, bucket, key, filedata,
+                                   filename, other_metadata, ACL)
+
+    async def async_get_filedata(self, bucket, key, byte_range=None):
+        # reading the returned body blocks as well, do it on s3_executor()
+        return await self._offload(self.get_filedata, bucket, key, byte_range)
+
+    async def async_read_filedata(self, bucket, key):
+        return await self._offload(self.read_filedata, bucket, key)
+
+    async def async_put_many(self, items):
+        return await asyncio.gather(
+            *[self.async_put_filedata(**item) for item in items])
+
+    async def async_get_many(self, items):
+        return await asyncio.gather(
+            *[self.async_read_filedata(bucket, key) for bucket, key in items])
+
+    def presigned_url(self, bucket, key, expires_in):
+        # signed locally, no request to S3
+        return self.__client.generate_presigned_url(
+            "get_object", Params={"Bucket": bucket, "Key": key},
+            ExpiresIn=expires_in)
+
     def get_file(self, bucket, key, outpath):
         data = self.__client.get_object(Bucket=bucket, Key=key)
         with open(outpath, 'wb') as outfile:
             for bytes in data['Body']:
                 outfile.write(bytes)
-            
-    
-    
-    def __create_bucket(self, bucket):
-        location = {'LocationConstraint': self.__region}
-        self.__client.create_bucket(Bucket=bucket,
-                                    CreateBucketConfiguration=location)
 
+    def __create_bucket(self, bucket):
+        # us-east-1 is the default and must not be named
+        if self.__region and self.__region != "us-east-1":
+            location = {'LocationConstraint': self.__region}
+            self.__client.create_bucket(Bucket=bucket,
+                                        CreateBucketConfiguration=location)
+        else:
+            self.__client.create_bucket(Bucket=bucket)
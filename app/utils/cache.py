@@ -0,0 +1,214 @@
+import json
+import time
+import hashlib
+import logging
+import traceback
+from collections import OrderedDict
+from app.core.config import (
+    CACHE_BACKEND,
+    CACHE_TTL,
+    CACHE_MAX_ENTRIES,
+    REDIS_URL,
+)
+
+
+logger = logging.getLogger("fastapi")
+
+# result cache for the public read endpoints
+#
+# Entries carry tags ("filer:<id>", "filing:<id>", ...). Every tag has a
+# version, an entry is only valid while the versions it was stored with
+# are current, so invalidating a tag is one increment no matter how many
+# entries carry it. Values must be json serializable.
+#
+# A compute that overlaps an invalidation is not stored (see token()),
+# otherwise a read that started before a write could cache the old data
+# after the write invalidated it.
+
+
+def cache_key(prefix: str, *parts) -> str:
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+class LocalCache:
+    """In process LRU, per worker. Also the stand-in for redis in tests."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.tag_versions = {}
+        self.invalidations = 0
+
+    async def token(self):
+        return self.invalidations
+
+    async def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        value, tags, expires = entry
+        if expires < time.monotonic() or any(
+            self.tag_versions.get(tag, 0) != version
+            for tag, version in tags.items()
+        ):
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return json.loads(value)
+
+    async def set(self, key, value, tags=(), token=None):
+        if token is not None and token != self.invalidations:
+            return
+
+        tags = {tag: self.tag_versions.get(tag, 0) for tag in tags}
+        self.entries[key] = (json.dumps(value), tags,
+                             time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def invalidate(self, tags):
+        for tag in tags:
+            self.tag_versions[tag] = self.tag_versions.get(tag, 0) + 1
+        self.invalidations += 1
+
+    async def clear(self):
+        self.entries.clear()
+        self.tag_versions.clear()
+
+
+class RedisCache:
+    """Shared by all workers, same semantics as LocalCache."""
+
+    INVALIDATIONS = "cache:invalidations"
+
+    def __init__(self, url=REDIS_URL, ttl=CACHE_TTL):
+        self.url = url
+        self.ttl = ttl
+        self.redis = None
+
+    async def connect(self):
+        if self.redis is None:
+            # only workers configured for redis need the client
+            import aioredis
+            self.redis = await aioredis.create_redis_pool(self.url)
+        return self.redis
+
+    @staticmethod
+    def tag_key(tag):
+        return f"cache:tag:{tag}"
+
+    async def token(self):
+        redis = await self.connect()
+        return int(await redis.get(self.INVALIDATIONS) or 0)
+
+    async def get(self, key):
+        redis = await self.connect()
+        entry = await redis.get(key)
+        if entry is None:
+            return None
+
+        entry = json.loads(entry)
+        tags = entry["tags"]
+        if tags:
+            versions = await redis.mget(*[self.tag_key(t) for t in tags])
+            if [int(v or 0) for v in versions] != list(tags.values()):
+                return None
+
+        return entry["value"]
+
+    async def set(self, key, value, tags=(), token=None):
+        redis = await self.connect()
+        tags = list(tags)
+        versions = []
+        if tags:
+            versions = await redis.mget(*[self.tag_key(t) for t in tags])
+        if token is not None and token != await self.token():
+            return
+
+        entry = {"value": value,
+                 "tags": {t: int(v or 0) for t, v in zip(tags, versions)}}
+        await redis.set(key, json.dumps(entry), expire=self.ttl)
+
+    async def invalidate(self, tags):
+        redis = await self.connect()
+        tr = redis.multi_exec()
+        for tag in tags:
+            tr.incr(self.tag_key(tag))
+        tr.incr(self.INVALIDATIONS)
+        await tr.execute()
+
+    async def clear(self):
+        redis = await self.connect()
+        await redis.flushdb()
+
+
+class NoCache:
+
+    async def token(self):
+        return None
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, tags=(), token=None):
+        pass
+
+    async def invalidate(self, tags):
+        pass
+
+    async def clear(self):
+        pass
+
+
+def make_cache(backend=CACHE_BACKEND):
+    if backend == "redis":
+        return RedisCache()
+    if backend == "memory":
+        return LocalCache()
+    return NoCache()
+
+
+result_cache = make_cache()
+
+
+async def cached(key, compute, tags_of, cache=None):
+    """Value for key, computed and stored on a miss.
+
+    tags_of(value) gives the tags of a computed value, None to not
+    store it. The cache being down never fails the request.
+    """
+    cache = cache or result_cache
+
+    token = None
+    try:
+        value = await cache.get(key)
+        if value is not None:
+            return value
+        token = await cache.token()
+    except Exception:
+        logger.exception(traceback.format_exc())
+
+    value = await compute()
+
+    tags = tags_of(value)
+    if tags is not None and token is not None:
+        try:
+            await cache.set(key, value, tags, token=token)
+        except Exception:
+            logger.exception(traceback.format_exc())
+
+    return value
+
+
+async def invalidate(tags, cache=None):
+    cache = cache or result_cache
+    try:
+        await cache.invalidate(tags)
+    except Exception:
+        # entries still expire after CACHE_TTL
+        logger.exception(traceback.format_exc())
@@ -0,0 +1,167 @@
+import os
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from app.core.config import (
+    DOCUMENT_CACHE_DIR,
+    DOCUMENT_CACHE_MAX_BYTES,
+    DOCUMENT_CACHE_MAX_ITEM_BYTES,
+)
+
+
+logger = logging.getLogger("fastapi")
+
+
+class DiskCacheWriter:
+    """Fills one entry. The file only becomes visible on commit(), and
+    only if it got exactly the expected size."""
+
+    def __init__(self, cache, key, size):
+        self.cache = cache
+        self.key = key
+        self.size = size
+        self.written = 0
+        self.tmp_path = cache.path(key) + f".{uuid.uuid4().hex}.tmp"
+        self.file = open(self.tmp_path, "wb")
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.written += len(chunk)
+
+    def commit(self):
+        self.file.close()
+        if self.written != self.size:
+            self.abort()
+            return False
+        self.cache.add(self.key, self.tmp_path, self.size)
+        return True
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class DiskLRUCache:
+    """Bounded LRU of whole objects in a directory.
+
+    The index (key -> size, in use order) is per worker, rebuilt from the
+    directory on first use. Workers sharing a directory each keep to
+    max_bytes, a file another worker evicted is a miss here. Readers get
+    an open file descriptor, an entry evicted while it is being served is
+    unlinked but stays readable until it is closed.
+    """
+
+    def __init__(self, directory=DOCUMENT_CACHE_DIR, max_bytes=DOCUMENT_CACHE_MAX_BYTES,
+                 max_item_bytes=DOCUMENT_CACHE_MAX_ITEM_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes, max_bytes)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.loaded = False
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.fills = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def _load(self):
+        if self.loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(".tmp"):
+                # left over from a fill that never finished
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            st = entry.stat()
+            files.append((st.st_mtime, entry.name, st.st_size))
+
+        # the index is by file name, the key is only needed to find it
+        for mtime, name, size in sorted(files):
+            self.entries[name] = size
+            self.bytes += size
+        self.loaded = True
+        self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self.entries:
+            name, size = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            self.evicted_bytes += size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def open(self, key):
+        """(fd, size) of a cached object, None on a miss. The caller
+        closes fd."""
+        with self.lock:
+            self._load()
+            name = os.path.basename(self.path(key))
+            if name in self.entries:
+                try:
+                    fd = os.open(self.path(key), os.O_RDONLY)
+                except FileNotFoundError:
+                    self.bytes -= self.entries.pop(name)
+                else:
+                    self.entries.move_to_end(name)
+                    self.hits += 1
+                    return fd, os.fstat(fd).st_size
+            self.misses += 1
+            return None
+
+    def writer(self, key, size):
+        """A DiskCacheWriter for an object of size bytes, None if it
+        should not be cached."""
+        if size is None or size > self.max_item_bytes:
+            return None
+        with self.lock:
+            self._load()
+        return DiskCacheWriter(self, key, size)
+
+    def add(self, key, tmp_path, size):
+        with self.lock:
+            self._load()
+            path = self.path(key)
+            os.replace(tmp_path, path)
+            name = os.path.basename(path)
+            self.bytes -= self.entries.pop(name, 0)
+            self.entries[name] = size
+            self.bytes += size
+            self.fills += 1
+            self._evict()
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "fills": self.fills,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+        }
+
+
+document_cache = DiskLRUCache()
@@ -1,16 +1,15 @@
 import os
 import logging
 import traceback
-import jinja2
 from fastapi.encoders import jsonable_encoder
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 from app.utils.async_utils import async_wrap
 from app.core.config import SENDGRID_API_KEY
 from app.models.messages import MessageTemplate
 
 logger = logging.getLogger('fastapi')
 
+# sendgrid and jinja2 are imported on first use, to keep startup fast
+
 def send_message(
     sender: str,
     recipients: list,
@@ -18,6 +17,9 @@ def send_message(
     html_content: str
 ):
 
+    from sendgrid import SendGridAPIClient
+    from sendgrid.helpers.mail import Mail
+
     message = Mail(from_email=sender,
                    to_emails=recipients,
                    subject=subject,
@@ -42,6 +44,7 @@ async_send_message = async_wrap(send_message)
 
 def render_template(data_dict: dict, template: str):
 
+    import jinja2
     template = jinja2.Template(template)
 
     html = template.render(**data_dict)
@@ -52,6 +55,7 @@ def render_template(data_dict: dict, template: str):
 def render_template_from_db(data_dict: dict,
                             db_template: MessageTemplate):
 
+    import jinja2
     current_dir = os.path.dirname(os.path.abspath(__file__))
     loader = jinja2.FileSystemLoader(current_dir+"/email_templates")
     env = jinja2.Environment(loader=loader)
@@ -67,6 +71,7 @@ def render_template_from_db(data_dict: dict,
 
 def render_template_from_disk(data_dict, template_filename):
 
+    import jinja2
     current_dir = os.path.dirname(os.path.abspath(__file__))
     loader = jinja2.FileSystemLoader(current_dir+"/email_templates")
     env = jinja2.Environment(loader=loader)
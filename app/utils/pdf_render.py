@@ -0,0 +1,145 @@
+import io
+from xml.sax.saxutils import escape
+from app.utils.pdf_templates import get_pdf_template
+
+# draws a filing's form (raw_json) with one of app.utils.pdf_templates.
+# Pure, no app state or db: it runs in the render processes.
+
+
+def entity_name(entity: dict) -> str:
+    if entity.get("individual") or not entity.get("org_name"):
+        names = [entity.get("first_name"), entity.get("middle_name"),
+                 entity.get("last_name")]
+        return " ".join(n for n in names if n)
+    return entity["org_name"]
+
+
+def directory_names(form: dict) -> dict:
+    # schedules refer to the form's directory by id
+    directory = form.get("directory") or {}
+    names = {}
+    for entity in directory.get("entity") or []:
+        names[entity.get("id")] = entity_name(entity)
+    for decision in directory.get("muni_decision") or []:
+        names[decision.get("id")] = decision.get("description_short") or ""
+    names.pop(None, None)
+    return names
+
+
+def column_label(key: str) -> str:
+    for suffix in ["_entity_id", "_id"]:
+        if key.endswith(suffix) and key != suffix.strip("_"):
+            key = key[:-len(suffix)]
+            break
+    return key.replace("_", " ").capitalize()
+
+
+def schedule_title(key: str) -> str:
+    # schedule_c_1 -> Schedule C-1
+    return "Schedule " + key[len("schedule_"):].upper().replace("_", "-")
+
+
+def cell_text(value, names: dict) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, list):
+        return ", ".join(cell_text(v, names) for v in value)
+    if isinstance(value, dict):
+        return "; ".join(f"{column_label(k)}: {cell_text(v, names)}"
+                         for k, v in value.items()
+                         if k != "ordinal" and v not in [None, "", []])
+    if isinstance(value, str) and value in names:
+        return names[value]
+    return str(value)
+
+
+def schedule_columns(rows: list) -> list:
+    columns = []
+    for row in rows:
+        for key in row:
+            if key != "ordinal" and key not in columns:
+                columns.append(key)
+    return columns
+
+
+def render_filing_pdf(template: str, template_version: int, header: dict,
+                      form: dict, public: bool = True) -> bytes:
+    """The filing's pdf. header is what the filing row adds to the form:
+    title, e_filing_id, filing_date, ... The public copy leaves out the
+    template's private fields. The same input gives the same bytes."""
+    # only the render processes need reportlab
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import (
+        SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
+    )
+
+    layout = get_pdf_template(template, template_version)
+    names = directory_names(form)
+    styles = getSampleStyleSheet()
+    small = styles["BodyText"].clone("small", fontSize=8, leading=10)
+
+    def para(text, style=small):
+        return Paragraph(escape(text), style)
+
+    def table(rows, widths):
+        t = Table(rows, colWidths=widths, repeatRows=1)
+        t.setStyle(TableStyle([
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]))
+        return t
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=letter, invariant=True,
+                            title=header.get("title", ""),
+                            leftMargin=0.6 * inch, rightMargin=0.6 * inch)
+    width = doc.width
+
+    story = [para(header.get("title", ""), styles["Title"])]
+    for label, key in [("E-Filing ID", "e_filing_id"),
+                       ("Filing date", "filing_date"),
+                       ("Period", "period"),
+                       ("Amendment", "amendment")]:
+        if header.get(key):
+            story.append(para(f"{label}: {cell_text(header[key], names)}",
+                              styles["BodyText"]))
+
+    for section in layout["sections"]:
+        if section["kind"] == "fields":
+            obj = form.get(section["path"]) or {}
+            rows = [[para(field["label"]), para(cell_text(obj.get(field["key"]), names))]
+                    for field in section["fields"]
+                    if not (public and field.get("private"))
+                    and obj.get(field["key"]) not in [None, ""]]
+            if rows:
+                story += [Spacer(1, 12), para(section["title"], styles["Heading2"]),
+                          table(rows, [width * 0.3, width * 0.7])]
+
+        elif section["kind"] == "schedules":
+            for key in sorted(k for k in form if k.startswith("schedule_")):
+                rows = form[key] or []
+                story += [Spacer(1, 12), para(schedule_title(key), styles["Heading2"])]
+                if not rows:
+                    story.append(para("None"))
+                    continue
+                columns = schedule_columns(rows)
+                data = [[para(column_label(c)) for c in columns]]
+                data += [[para(cell_text(row.get(c), names)) for c in columns]
+                         for row in rows]
+                story.append(table(data, [width / len(columns)] * len(columns)))
+
+        elif section["kind"] == "comments":
+            comments = [(k, v) for k, v in (form.get("comments") or {}).items() if v]
+            if comments:
+                story += [Spacer(1, 12), para("Comments", styles["Heading2"])]
+                story += [para(f"{schedule_title(k)}: {v}", styles["BodyText"])
+                          for k, v in comments]
+
+    doc.build(story)
+    return buf.getvalue()
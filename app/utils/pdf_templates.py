@@ -0,0 +1,74 @@
+# pdf layouts of the lobbyist forms, versioned per filing type. A render
+# job keeps the version it was queued with, so re-rendering a filing
+# gives the same document after a newer version is added. New jobs get
+# the latest. Layouts are plain data, app.utils.pdf_render draws them.
+#
+# section kinds:
+#   fields     label / key pairs of the object at path, "private" ones
+#              only go in the private copy
+#   schedules  every schedule_* list of the form, one table each
+#   comments   the non empty comments, by schedule
+
+ENTITY_FIELDS = [
+    {"label": "Name", "key": "name"},
+    {"label": "Address", "key": "address1"},
+    {"label": "", "key": "address2"},
+    {"label": "City", "key": "city"},
+    {"label": "State", "key": "state"},
+    {"label": "Zip code", "key": "zipcode"},
+    {"label": "Phone", "key": "phone"},
+    {"label": "Effective date", "key": "effective_date"},
+]
+
+FILER_FIELDS = [
+    {"label": "First name", "key": "first_name"},
+    {"label": "Middle name", "key": "middle_name"},
+    {"label": "Last name", "key": "last_name"},
+    {"label": "Address", "key": "address1", "private": True},
+    {"label": "", "key": "address2", "private": True},
+    {"label": "City", "key": "city", "private": True},
+    {"label": "State", "key": "state", "private": True},
+    {"label": "Zip code", "key": "zipcode", "private": True},
+    {"label": "Phone", "key": "phone", "private": True},
+    {"label": "Email", "key": "email", "private": True},
+]
+
+VERIFICATION_FIELDS = [
+    {"label": "Title", "key": "filer_title"},
+    {"label": "Executed at", "key": "location"},
+    {"label": "Date", "key": "date"},
+    {"label": "Signature", "key": "signature"},
+    {"label": "Comment", "key": "comment"},
+]
+
+LOBBYIST_FORM_V1 = {
+    "sections": [
+        {"kind": "fields", "title": "Lobbying Entity",
+         "path": "lobbying_entity_contact_info", "fields": ENTITY_FIELDS},
+        {"kind": "fields", "title": "Filer", "path": "filer",
+         "fields": FILER_FIELDS},
+        {"kind": "schedules"},
+        {"kind": "comments"},
+        {"kind": "fields", "title": "Verification", "path": "verification",
+         "fields": VERIFICATION_FIELDS},
+    ],
+}
+
+PDF_TEMPLATES = {
+    "ec601": {1: LOBBYIST_FORM_V1},
+    "ec602": {1: LOBBYIST_FORM_V1},
+    "ec603": {1: LOBBYIST_FORM_V1},
+    "ec604": {1: LOBBYIST_FORM_V1},
+    "ec605": {1: LOBBYIST_FORM_V1},
+}
+
+
+def latest_template_version(filing_type: str):
+    versions = PDF_TEMPLATES.get(filing_type)
+    if not versions:
+        return None
+    return max(versions)
+
+
+def get_pdf_template(filing_type: str, version: int) -> dict:
+    return PDF_TEMPLATES[filing_type][version]
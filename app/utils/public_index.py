@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import traceback
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import PUBLIC_INDEX_REFRESH_DELAY
+from app.models.crud.search import refresh_public_filing_index
+from app.utils.cache import invalidate
+
+
+logger = logging.getLogger("fastapi")
+
+# on every cached search result: a search document changed (a new filer,
+# a rename) can make any search match differently
+SEARCH_TAG = "search"
+
+
+class PublicIndexRefresher:
+    """Debounced refresh of public_filing_index.
+
+    Writes request a refresh after they commit, with the cache tags they
+    touched. The first request waits delay seconds so a burst of writes
+    costs one refresh, then the view is refreshed and the tags are
+    invalidated, so cached results are recomputed from the new rows.
+    Requests that come in while a refresh runs get another one.
+    """
+
+    def __init__(self, delay=PUBLIC_INDEX_REFRESH_DELAY, session_factory=None,
+                 refresh=refresh_public_filing_index, cache=None):
+        self.delay = delay
+        self.session_factory = session_factory
+        self.refresh = refresh
+        self.cache = cache
+        self.tags = set()
+        self.task = None
+
+    def request(self, tags=()):
+        self.tags.update(tags)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._run())
+
+    async def _refresh_once(self):
+        session_factory = self.session_factory
+        if session_factory is None:
+            from app.db.session import AsyncLocalSession
+            session_factory = AsyncLocalSession
+
+        async with session_factory() as db_session:
+            refreshed = await self.refresh(db_session)
+            await db_session.commit()
+        return refreshed
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.delay)
+                tags, self.tags = self.tags, set()
+                try:
+                    refreshed = await self._refresh_once()
+                except Exception:
+                    logger.error("public filing index refresh failed")
+                    logger.exception(traceback.format_exc())
+                    refreshed = False
+
+                if refreshed:
+                    await invalidate(tags, self.cache)
+                else:
+                    # another worker is refreshing, it may have started
+                    # before our writes: again, after it
+                    self.tags.update(tags)
+
+                if not self.tags:
+                    return
+        finally:
+            self.task = None
+
+
+public_index_refresher = PublicIndexRefresher()
+
+
+# upsert_search_documents marks its session, the commit publishes it.
+# The view doesn't read search_document: no refresh, the cached searches
+# are dropped. Writes that change public rows (filed, published, renamed)
+# request the refresh themselves (invalidate_public_caches).
+
+def _after_commit(session):
+    if session.info.pop("search_documents_changed", False):
+        asyncio.ensure_future(invalidate([SEARCH_TAG]))
+
+
+def _after_rollback(session):
+    session.info.pop("search_documents_changed", None)
+
+
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
@@ -0,0 +1,258 @@
+import re
+import time
+import bisect
+import asyncio
+import datetime
+import logging
+import traceback
+from app.core.config import (
+    TYPEAHEAD_LIMIT,
+    TYPEAHEAD_SYNC_INTERVAL,
+    SEARCH_FUZZY_THRESHOLD,
+)
+from app.models.search import SEARCH_OBJECT_TYPES
+from app.models.crud.search import get_typeahead_entries, set_fuzzy_threshold
+from app.models.crud.humane_ids import get_e_filing_ids_by_prefix
+
+
+logger = logging.getLogger("fastapi")
+
+# search documents are stamped with now() of the writing transaction,
+# one still open at the last sync commits with an older stamp
+SYNC_OVERLAP = datetime.timedelta(minutes=1)
+
+
+def normalize(text: str) -> str:
+    # "Smith,  John" and "smith john" are the same prefix
+    return " ".join(re.findall(r"[^\W_]+", (text or "").lower()))
+
+
+def word_suffixes(text: str) -> list:
+    words = text.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def typeahead_entry(object_type: str, row) -> tuple:
+    """(result, terms) of a get_typeahead_entries row."""
+    if object_type == "filer":
+        result = {
+            "object_type": object_type,
+            "filer_id": row.object_id,
+            "first_name": row.first_name,
+            "last_name": row.last_name,
+            "hr_id": row.hr_id,
+        }
+    else:
+        result = {
+            "object_type": object_type,
+            "entity_id": row.object_id,
+            "filer_id": row.filer_id,
+            "name": row.name,
+            "hr_id": row.hr_id,
+        }
+
+    # org names and ids match from any word: "acme" finds "The Acme
+    # Group", "30012" finds "L-30012"
+    terms = set(word_suffixes(normalize(row.hr_id)))
+    for name in row.names or []:
+        if object_type == "filer":
+            terms.add(normalize(name))
+        else:
+            terms.update(word_suffixes(normalize(name)))
+    terms.discard("")
+
+    return result, terms
+
+
+class TypeaheadIndex:
+    """Prefix index over filer / lobbying entity names and ids.
+
+    A sorted list of (term, object_type, object_id), a prefix is a
+    bisect and a scan of the matches. Loaded from the search documents
+    in the background, then kept current by syncing the documents that
+    changed every sync_interval seconds, so writes in any worker show up.
+    Searches go to the database until the first load is done.
+    """
+
+    def __init__(self, sync_interval=TYPEAHEAD_SYNC_INTERVAL,
+                 session_factory=None):
+        self.sync_interval = sync_interval
+        self.session_factory = session_factory
+        self.clear()
+
+    def clear(self):
+        self.keys = []
+        self.objects = {}
+        self.ready = False
+        self.since = None
+        self.synced = None
+        self.lock = None
+        self.syncing = None
+
+    def remove(self, object_type, object_id):
+        entry = self.objects.pop((object_type, object_id), None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            i = bisect.bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+
+    def upsert(self, object_type, object_id, result, terms):
+        self.remove(object_type, object_id)
+        keys = [(term, object_type, object_id) for term in terms]
+        for key in keys:
+            bisect.insort(self.keys, key)
+        self.objects[(object_type, object_id)] = (result, keys)
+
+    def replace(self, entries):
+        # the full load, one sort instead of an insort per term
+        objects = {}
+        for object_type, object_id, result, terms in entries:
+            keys = [(term, object_type, object_id) for term in terms]
+            objects[(object_type, object_id)] = (result, keys)
+        self.keys = sorted(key for _, keys in objects.values() for key in keys)
+        self.objects = objects
+
+    def search(self, query, limit=TYPEAHEAD_LIMIT):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        results, seen = [], set()
+        i = bisect.bisect_left(self.keys, (prefix,))
+        while i < len(self.keys) and len(results) < limit:
+            term, object_type, object_id = self.keys[i]
+            if not term.startswith(prefix):
+                break
+            if (object_type, object_id) not in seen:
+                seen.add((object_type, object_id))
+                results.append(self.objects[(object_type, object_id)][0])
+            i += 1
+
+        return results
+
+    async def sync(self, db_session):
+        since = None if self.since is None else self.since - SYNC_OVERLAP
+        started = time.monotonic()
+
+        entries, newest = [], self.since
+        for object_type in SEARCH_OBJECT_TYPES:
+            for row in await get_typeahead_entries(db_session, object_type,
+                                                   since=since):
+                result, terms = typeahead_entry(object_type, row)
+                entries.append((object_type, row.object_id, result, terms))
+                if newest is None or row.updated > newest:
+                    newest = row.updated
+
+        if since is None:
+            self.replace(entries)
+            logger.info(f"typeahead index loaded, {len(self.objects)} "
+                        f"objects in {time.monotonic() - started:.1f}s")
+        else:
+            for entry in entries:
+                self.upsert(*entry)
+
+        self.since = newest
+        self.synced = time.monotonic()
+        self.ready = True
+
+    async def refresh(self):
+        # one sync at a time, searches keep using the current index
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        if self.lock.locked():
+            return
+
+        async with self.lock:
+            session_factory = self.session_factory
+            if session_factory is None:
+                from app.db.session import AsyncReadSession
+                session_factory = AsyncReadSession
+            async with session_factory() as db_session:
+                await self.sync(db_session)
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception:
+            logger.error("typeahead index sync failed")
+            logger.exception(traceback.format_exc())
+        finally:
+            self.syncing = None
+
+    def schedule_refresh(self):
+        due = (self.synced is None
+               or time.monotonic() - self.synced >= self.sync_interval)
+        if due and self.syncing is None:
+            self.syncing = asyncio.ensure_future(self._background_refresh())
+
+    def warm_up(self):
+        # at startup, in the background: the first load reads every
+        # search document
+        self.schedule_refresh()
+
+
+typeahead_index = TypeaheadIndex()
+
+
+async def search_typeahead(db_session, query: str, limit: int = TYPEAHEAD_LIMIT,
+                           index: TypeaheadIndex = None) -> list:
+    """Filers and lobbying entities whose names or ids start with query,
+    and filings whose e-filing id does."""
+    index = index or typeahead_index
+
+    index.schedule_refresh()
+    if index.ready:
+        results = index.search(query, limit)
+    else:
+        results = []
+        for object_type in SEARCH_OBJECT_TYPES:
+            for row in await get_typeahead_entries(db_session, object_type,
+                                                   query=query, limit=limit):
+                results.append(typeahead_entry(object_type, row)[0])
+        results = results[:limit]
+
+    prefix = normalize(query)
+    if len(prefix) >= 3 and not prefix.isdigit() and len(results) < limit:
+        results.extend(await fuzzy_typeahead(db_session, query, limit, results))
+
+    # too many e-filing ids to hold, they are one index range scan
+    if prefix.isdigit() and len(results) < limit:
+        for row in await get_e_filing_ids_by_prefix(
+                db_session, prefix, limit - len(results)):
+            results.append({
+                "object_type": "filing",
+                "e_filing_id": row.e_filing_id,
+                "filing_id": row.filing_id,
+                "filer_id": row.filer_id,
+                "entity_id": row.entity_id,
+            })
+
+    return results
+
+
+async def fuzzy_typeahead(db_session, query: str, limit: int,
+                          found: list) -> list:
+    # misspelled names, when the prefixes don't fill the results
+    await set_fuzzy_threshold(db_session, SEARCH_FUZZY_THRESHOLD)
+
+    rows = []
+    for object_type in SEARCH_OBJECT_TYPES:
+        for row in await get_typeahead_entries(db_session, object_type,
+                                               query=query, fuzzy=True,
+                                               limit=limit):
+            rows.append((row.rank or 0, object_type, row))
+    rows.sort(key=lambda x: x[0], reverse=True)
+
+    seen = {(r["object_type"], r.get("entity_id") or r["filer_id"])
+            for r in found}
+    results = []
+    for _, object_type, row in rows:
+        if (object_type, row.object_id) in seen:
+            continue
+        results.append(typeahead_entry(object_type, row)[0])
+        if len(found) + len(results) >= limit:
+            break
+
+    return results
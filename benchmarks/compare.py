@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import json
+import argparse
+
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps"]
+
+
+def load(path):
+    with open(path, "r") as infile:
+        return json.load(infile)
+
+
+def delta(old, new):
+    if old is None or new is None or old == 0:
+        return ""
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(before, after):
+    rows = []
+    names = sorted(set(before["results"]) | set(after["results"]))
+    for name in names:
+        old = before["results"].get(name, {})
+        new = after["results"].get(name, {})
+        for metric in METRICS:
+            rows.append((name, metric, old.get(metric), new.get(metric),
+                         delta(old.get(metric), new.get(metric))))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="compare benchmark results")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    before, after = load(args.before), load(args.after)
+    print(f"before: {before['meta'].get('revision')}")
+    print(f"after:  {after['meta'].get('revision')}")
+    print()
+    print(f"{'scenario':40} {'metric':15} {'before':>12} {'after':>12} {'delta':>9}")
+    for name, metric, old, new, change in compare(before, after):
+        old = "-" if old is None else f"{old:.2f}"
+        new = "-" if new is None else f"{new:.2f}"
+        print(f"{name:40} {metric:15} {old:>12} {new:>12} {change:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""/public/search before it was a single query, for benchmarks.search.
+
+Filers and lobbying entities found through search_document, then their
+filings per kind, then the e-filing ids of the filings they amend: four
+statements and a merge in python. Kept here, not in the app, only to
+have a baseline to measure and check the single query against. Import
+it after benchmarks.run.configure_env.
+"""
+import datetime
+from sqlalchemy import select, func, desc
+from sqlalchemy.sql import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.encoders import jsonable_encoder
+from app.core.config import SEARCH_MAX_MATCHES
+from app.utils.date_utils import today
+from app.utils.string_utils import to_date
+from app.models.search import SearchDocument
+from app.models.filings import Filing, FilingSubtype
+from app.models.filers import Filer, FilerContactInfo
+from app.models.entities import LobbyingEntityContactInfo
+from app.models.humane_ids import EFilingId
+from app.models.crud.search import to_prefix_tsquery
+
+
+def _as_date(d):
+    # asyncpg won't coerce iso strings into dates
+    if isinstance(d, str):
+        return to_date(d)
+    return d
+
+
+async def search_filer_ids(
+    db_session: AsyncSession,
+    query: str,
+    object_type: str,
+    limit: int,
+) -> list:
+    """(filer_id, rank) of the best matching documents, best first."""
+
+    tsquery = to_prefix_tsquery(query)
+    if not tsquery:
+        return []
+
+    q = func.to_tsquery("simple", tsquery)
+    rank = func.ts_rank_cd(SearchDocument.document, q).label("rank")
+
+    res = (
+        (await db_session.execute(
+            select(SearchDocument.filer_id, rank)
+            .filter(SearchDocument.object_type == object_type)
+            .filter(SearchDocument.filer_id.isnot(None))
+            .filter(SearchDocument.document.op("@@")(q))
+            .order_by(desc("rank"))
+            .limit(limit)
+        ))
+        .all()
+    )
+
+    return res
+
+
+async def get_all_filings_by_all_filer_ids(
+    db_session: AsyncSession, filer_ids: list, start_date: str = None, end_date: str = None
+) -> list:
+
+    if start_date is None:
+        start_date = "1970-01-01"
+    if end_date is None:
+        end_date = today()
+
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    # filing_date is a timestamp, include the whole end day
+    filed_start = datetime.datetime.combine(start_date, datetime.time.min)
+    filed_end = datetime.datetime.combine(end_date, datetime.time.max)
+
+    res = (
+        (await db_session.execute(
+            select(
+                Filing.filing_date,
+                Filing.filing_type,
+                Filing.doc_public,
+                Filing.amendment,
+                Filing.amends_orig_id,
+                Filing.amends_prev_id,
+                Filing.amendment_number,
+                Filing.filer_id,
+                FilingSubtype.filing_subtype,
+                FilerContactInfo.first_name,
+                FilerContactInfo.last_name,
+            )
+            .join(FilingSubtype, FilingSubtype.filing_id == Filing.filing_id)
+            .join(Filer, Filer.filer_id == Filing.filer_id)
+            .join(FilerContactInfo, FilerContactInfo.filer_id == Filer.filer_id)
+            .filter(Filing.filer_id.in_(filer_ids))
+            .filter(
+                or_(
+                    and_(
+                        Filing.filing_date >= filed_start, Filing.filing_date <= filed_end
+                    ),
+                    and_(
+                        Filing.period_start >= start_date,
+                        Filing.period_start <= end_date,
+                    ),
+                )
+            )
+            .order_by(
+                Filing.filing_date.desc(),
+            )
+        ))
+        .unique()
+        .all()
+    )
+
+    return res
+
+
+async def get_all_lobbyist_filings_by_all_filer_ids(
+    db_session: AsyncSession, filer_ids: list, start_date: str = None, end_date: str = None
+) -> list:
+
+    if start_date is None:
+        start_date = "1970-01-01"
+    if end_date is None:
+        end_date = today()
+
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    # filing_date is a timestamp, include the whole end day
+    filed_start = datetime.datetime.combine(start_date, datetime.time.min)
+    filed_end = datetime.datetime.combine(end_date, datetime.time.max)
+
+    res = (
+        (await db_session.execute(
+            select(
+                Filing.filing_date,
+                Filing.filing_type,
+                Filing.doc_public,
+                Filing.amendment,
+                Filing.amends_orig_id,
+                Filing.amends_prev_id,
+                Filing.amendment_number,
+                Filing.filer_id,
+                LobbyingEntityContactInfo.name.label("filer"),
+            )
+            .join(
+                LobbyingEntityContactInfo,
+                LobbyingEntityContactInfo.entity_id == Filing.entity_id,
+            )
+            .filter(Filing.filer_id.in_(filer_ids))
+            .filter(
+                or_(
+                    and_(
+                        Filing.filing_date >= filed_start, Filing.filing_date <= filed_end
+                    ),
+                    and_(
+                        Filing.period_start >= start_date,
+                        Filing.period_start <= end_date,
+                    ),
+                )
+            )
+            .order_by(
+                Filing.filing_date.desc(),
+            )
+        ))
+        .unique()
+        .all()
+    )
+
+    return res
+
+
+async def get_e_filer_id_by_orig_amendment(
+    db_session: AsyncSession,
+    amendment_ids: list,
+) -> list:
+
+    res = (
+        (await db_session.execute(
+            select(
+                Filing.amends_orig_id,
+                EFilingId.e_filing_id,
+            )
+            .join(Filing, Filing.filing_id == EFilingId.filing_id)
+            .filter(Filing.amends_orig_id.in_(amendment_ids))
+        ))
+        .unique()
+        .all()
+    )
+
+    return res
+
+
+async def get_e_filer_id_by_prev_amendment(
+    db_session: AsyncSession,
+    amendment_ids: list,
+) -> list:
+
+    res = (
+        (await db_session.execute(
+            select(
+                Filing.amends_prev_id,
+                EFilingId.e_filing_id,
+            )
+            .join(Filing, Filing.filing_id == EFilingId.filing_id)
+            .filter(Filing.amends_prev_id.in_(amendment_ids))
+        ))
+        .unique()
+        .all()
+    )
+
+    return res
+
+
+def order_by_rank(filings: list, ranks: dict) -> list:
+    # best matching filer first, newest filing first within a filer.
+    # filings come newest first and the sort is stable
+    filings.sort(key=lambda x: ranks[x["filer_id"]], reverse=True)
+    for each in filings:
+        del each["filer_id"]
+    return filings
+
+
+async def get_all_filings(
+    db_session: AsyncSession,
+    query: str,
+    start_date: str,
+    end_date: str,
+) -> list:
+    matches = await search_filer_ids(
+        db_session, query, "filer", SEARCH_MAX_MATCHES
+    )
+    if len(matches) == 0:
+        return []
+
+    # get all filings for each id
+    all_filings = await get_all_filings_by_all_filer_ids(
+        db_session, [x.filer_id for x in matches], start_date, end_date
+    )
+
+    filings_json = jsonable_encoder(all_filings)
+
+    return order_by_rank(filings_json, {x.filer_id: x.rank for x in matches})
+
+
+async def get_all_lobbyist_filings(
+    db_session: AsyncSession,
+    query: str,
+    start_date: str,
+    end_date: str,
+) -> list:
+    matches = await search_filer_ids(
+        db_session, query, "lobbying_entity", SEARCH_MAX_MATCHES
+    )
+    if len(matches) == 0:
+        return []
+
+    all_lobbyist_filings = await get_all_lobbyist_filings_by_all_filer_ids(
+        db_session, [x.filer_id for x in matches], start_date, end_date
+    )
+
+    all_lobbyist_filings_json = jsonable_encoder(all_lobbyist_filings)
+
+    # a filer can be behind several entities, keep its best rank
+    ranks = {}
+    for x in matches:
+        ranks[x.filer_id] = max(ranks.get(x.filer_id, 0), x.rank)
+
+    return order_by_rank(all_lobbyist_filings_json, ranks)
+
+
+async def convert_amend_ids_to_efile_ids(
+    db_session: AsyncSession,
+    filings: list,
+):
+    # change ammend to e_filing_id
+    amendment_orig = []
+    amendment_prev = []
+    for each in filings:
+        # We need to convert these values
+        if each["amendment"]:
+            amendment_orig.append(each["amends_orig_id"])
+            amendment_prev.append(each["amends_prev_id"])
+
+    amendment_orig_efile_ids = await get_e_filer_id_by_orig_amendment(
+        db_session, amendment_orig
+    )
+
+    amendment_prev_efile_ids = await get_e_filer_id_by_prev_amendment(
+        db_session, amendment_prev
+    )
+
+    amendment_orig_efile_ids_list = jsonable_encoder(amendment_orig_efile_ids)
+    amendment_prev_efile_ids_list = jsonable_encoder(amendment_prev_efile_ids)
+
+    amendment_orig_efile_ids_dict = {}
+    amendment_prev_efile_ids_dict = {}
+
+    for each in amendment_orig_efile_ids_list:
+        amendment_orig_efile_ids_dict[each["amends_orig_id"]] = each["e_filing_id"]
+
+    for each in amendment_prev_efile_ids_list:
+        amendment_prev_efile_ids_dict[each["amends_prev_id"]] = each["e_filing_id"]
+
+    for each in filings:
+        if each["amendment"] == True:
+            if each["amends_orig_id"] in amendment_orig_efile_ids_dict:
+                each["amends_orig_id"] = {
+                    "orig_id": each["amends_orig_id"],
+                    "human_id": amendment_orig_efile_ids_dict[each["amends_orig_id"]],
+                }
+            else:
+                each["amends_orig_id"] = {
+                    "orig_id": each["amends_orig_id"],
+                    "human_id": "Not electronically filed",
+                }
+    for each in filings:
+        if each["amendment"] == True:
+            if each["amends_prev_id"] in amendment_prev_efile_ids_dict:
+                each["amends_prev_id"] = {
+                    "prev_id": each["amends_prev_id"],
+                    "human_id": amendment_prev_efile_ids_dict[each["amends_prev_id"]],
+                }
+            else:
+                each["amends_prev_id"] = {
+                    "prev_id": each["amends_prev_id"],
+                    "human_id": "Not electronically filed",
+                }
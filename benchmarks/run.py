@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+"""Benchmark the hot endpoints against a seeded local postgres.
+
+The app runs in-process (httpx ASGI transport), so the numbers are the
+api + database, no network or uvicorn. Usage, from the repository root:
+
+    python -m benchmarks.run --database-uri postgresql+psycopg2://... \\
+        --reset --filers 5000 --output bench/results.json
+
+    python -m benchmarks.compare bench/before.json bench/after.json
+
+The database given is dropped and re-created with --reset, never point
+this at a database you care about.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import datetime
+import subprocess
+
+sys.path.append(os.getcwd())
+
+
+MOCK_EC601 = "test/data/ec601-mock-data.json"
+
+SCENARIOS = [
+    "login",
+    "public_search",
+    "public_document_metadata",
+    "filer_info",
+    "lobbyist_filing_flow",
+]
+
+# steps of lobbyist_filing_flow, each reported on its own
+FLOW_STEPS = ["new", "get", "put", "fees", "finalize"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="eFile api benchmarks")
+    parser.add_argument("--database-uri",
+                        default=os.getenv("BENCH_PG_URI"),
+                        help="local postgres to seed (or BENCH_PG_URI)")
+    parser.add_argument("--reset", action="store_true",
+                        help="drop, re-create and seed the database")
+    parser.add_argument("--fixture", default="bench_fixture.json",
+                        help="fixture written by the seed step, "
+                             "re-used without --reset")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--filers", type=int, default=1000)
+    parser.add_argument("--filings-per-filer", type=int, default=5)
+    parser.add_argument("--lobbying-entities", type=int, default=100)
+    parser.add_argument("--amendment-rate", type=float, default=0.2)
+    parser.add_argument("--max-amendment-depth", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200,
+                        help="requests per scenario")
+    parser.add_argument("--flow-iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="*", default=SCENARIOS,
+                        choices=SCENARIOS)
+    parser.add_argument("--output", default="bench_results.json")
+    return parser.parse_args(argv)
+
+
+def configure_env(database_uri):
+    # must happen before anything imports app.core.config
+    os.environ["PG_URI"] = database_uri
+    os.environ["PG_ASYNC_URI"] = (
+        "postgresql+asyncpg://" + database_uri.split("://", 1)[1]
+    )
+    os.environ["PG_REPLICA_URI"] = ""
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies, errors, wall_time):
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "mean_ms": round(sum(values) / count, 3) if count else None,
+        "p50_ms": round(percentile(values, 50), 3) if count else None,
+        "p95_ms": round(percentile(values, 95), 3) if count else None,
+        "p99_ms": round(percentile(values, 99), 3) if count else None,
+        "max_ms": round(values[-1], 3) if count else None,
+        "throughput_rps": round(count / wall_time, 3) if wall_time else None,
+    }
+
+
+class Recorder:
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    async def request(self, name, client, method, url, **kwargs):
+        start = time.perf_counter()
+        res = await client.request(method, url, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.latencies.setdefault(name, []).append(elapsed)
+        self.errors.setdefault(name, 0)
+        if res.status_code >= 400:
+            self.errors[name] += 1
+        return res
+
+    def record(self, name, elapsed, error=False):
+        self.latencies.setdefault(name, []).append(elapsed)
+        self.errors.setdefault(name, 0)
+        if error:
+            self.errors[name] += 1
+
+
+async def run_concurrent(n, concurrency, fn):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            await fn(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - start
+
+
+async def login(client, fixture):
+    res = await client.post("/auth/filer-login", json={
+        "username": fixture["email"],
+        "password": fixture["password"],
+    })
+    res.raise_for_status()
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+async def scenario_login(client, rec, fixture, args, auth):
+    async def fn(i):
+        await rec.request("login", client, "POST", "/auth/filer-login", json={
+            "username": fixture["email"],
+            "password": fixture["password"],
+        })
+    return {"login": await run_concurrent(args.requests, args.concurrency, fn)}
+
+
+async def scenario_public_search(client, rec, fixture, args, auth):
+    terms = fixture["search_terms"]
+
+    async def fn(i):
+        await rec.request("public_search", client, "GET", "/public/search",
+                          params={"query": terms[i % len(terms)]})
+    return {"public_search":
+            await run_concurrent(args.requests, args.concurrency, fn)}
+
+
+async def scenario_public_document_metadata(client, rec, fixture, args, auth):
+    doc_ids = fixture["doc_ids"]
+
+    async def fn(i):
+        await rec.request("public_document_metadata", client, "GET",
+                          "/public/document/metadata",
+                          params={"doc_id": doc_ids[i % len(doc_ids)]})
+    return {"public_document_metadata":
+            await run_concurrent(args.requests, args.concurrency, fn)}
+
+
+async def scenario_filer_info(client, rec, fixture, args, auth):
+    async def fn(i):
+        await rec.request("filer_info", client, "GET", "/filer/info",
+                          headers=auth)
+    return {"filer_info":
+            await run_concurrent(args.requests, args.concurrency, fn)}
+
+
+async def scenario_lobbyist_filing_flow(client, rec, fixture, args, auth):
+    with open(MOCK_EC601, "r") as infile:
+        mock = json.load(infile)
+
+    base = "/filer/lobbyist/filing/ec601"
+
+    async def fn(i):
+        start = time.perf_counter()
+        ok = await flow()
+        rec.record("lobbyist_filing_flow",
+                   (time.perf_counter() - start) * 1000, error=not ok)
+
+    async def flow():
+        res = await rec.request(
+            "lobbyist_filing_flow.new", client, "POST", base + "/new",
+            headers=auth,
+            json={"lobbying_entity_id": fixture["lobbying_entity_id"],
+                  "filing_type": "ec601", "year": fixture["year"],
+                  "quarter": None, "amends_id": None})
+        if res.status_code >= 400:
+            return False
+        filing_id = res.json()["filing_id"]
+        url = f"{base}/{filing_id}"
+
+        await rec.request("lobbyist_filing_flow.get", client, "GET", url,
+                          headers=auth)
+
+        form = dict(mock)
+        form["filing_id"] = filing_id
+        form["year"] = fixture["year"]
+        await rec.request("lobbyist_filing_flow.put", client, "PUT", url,
+                          headers=auth, json={"form": form})
+        await rec.request("lobbyist_filing_flow.fees", client, "GET",
+                          url + "/fees", headers=auth)
+        res = await rec.request("lobbyist_filing_flow.finalize", client, "POST",
+                                url + "/finalize", headers=auth, json={"form": form})
+        return res.status_code < 400
+
+    # the steps share the flow's wall time, only the whole flow has a
+    # throughput (flows per second), the steps only latencies
+    wall = await run_concurrent(args.flow_iterations, args.concurrency, fn)
+    results = {f"lobbyist_filing_flow.{step}": None for step in FLOW_STEPS}
+    results["lobbyist_filing_flow"] = wall
+    return results
+
+
+async def run(args, fixture):
+    import httpx
+    from app.main import app
+
+    await app.router.startup()
+
+    # after startup, which loads the logging config
+    # the per request log lines would dominate the run
+    logging.getLogger("general").setLevel(logging.WARNING)
+    logging.getLogger("users").setLevel(logging.WARNING)
+
+    try:
+        async with httpx.AsyncClient(app=app,
+                                     base_url="http://bench") as client:
+            auth = await login(client, fixture)
+
+            results = {}
+            for name in args.scenarios:
+                scenario = globals()[f"scenario_{name}"]
+
+                # warm up pools and caches, not recorded
+                warm = argparse.Namespace(**vars(args))
+                warm.requests = args.warmup
+                warm.flow_iterations = min(args.warmup, 2)
+                await scenario(client, Recorder(), fixture, warm, auth)
+
+                rec = Recorder()
+                walls = await scenario(client, rec, fixture, args, auth)
+                for key, wall in walls.items():
+                    results[key] = summarize(rec.latencies.get(key, []),
+                                             rec.errors.get(key, 0), wall)
+                print(f"* {name} done", file=sys.stderr)
+    finally:
+        await app.router.shutdown()
+
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_uri:
+        sys.exit("--database-uri (or BENCH_PG_URI) is required")
+    configure_env(args.database_uri)
+
+    if args.reset:
+        import app.main  # noqa: F401, registers all the models
+        from app.db.utils import recreate_db
+        from app.db.session import LocalSession
+        from benchmarks.seed import seed
+
+        print("* re-creating and seeding database", file=sys.stderr)
+        recreate_db()
+        db_session = LocalSession()
+        try:
+            fixture = seed(db_session,
+                           seed=args.seed,
+                           filers=args.filers,
+                           filings_per_filer=args.filings_per_filer,
+                           lobbying_entities=args.lobbying_entities,
+                           amendment_rate=args.amendment_rate,
+                           max_amendment_depth=args.max_amendment_depth)
+        finally:
+            db_session.close()
+        with open(args.fixture, "w") as outfile:
+            json.dump(fixture, outfile, indent=2)
+    else:
+        with open(args.fixture, "r") as infile:
+            fixture = json.load(infile)
+
+    results = asyncio.run(run(args, fixture))
+
+    output = {
+        "meta": {
+            "revision": git_revision(),
+            "created": datetime.datetime.utcnow().isoformat() + "Z",
+            "python": sys.version.split()[0],
+            "params": {k: v for k, v in vars(args).items()
+                       if k != "database_uri"},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as outfile:
+        json.dump(output, outfile, indent=2, sort_keys=True)
+
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
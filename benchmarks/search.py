@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""Public search: the old multi query path against the single query.
+
+Runs both directly against the database (no http), on the search terms
+of a seeded benchmark database, and reports latency and statements per
+search (the single query: its first page). Also checks that both find
+the same filings, across all pages.
+
+    python -m benchmarks.run --database-uri ... --reset --scenarios login
+    python -m benchmarks.search --database-uri ... --output search.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+sys.path.append(os.getcwd())
+from benchmarks.run import configure_env, summarize
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="public search benchmark")
+    parser.add_argument("--database-uri",
+                        default=os.getenv("BENCH_PG_URI"),
+                        help="seeded benchmark database (or BENCH_PG_URI)")
+    parser.add_argument("--fixture", default="bench_fixture.json")
+    parser.add_argument("--iterations", type=int, default=20,
+                        help="passes over the fixture search terms")
+    parser.add_argument("--output", default="bench_search.json")
+    return parser.parse_args(argv)
+
+
+async def legacy_search(db_session, query):
+    # /public/search before it was a single query
+    from app.models.filings import FILING_TYPE_MAPPING, FILING_TYPE_DESCRIPTION
+    from benchmarks.legacy_search import (
+        get_all_filings,
+        get_all_lobbyist_filings,
+        convert_amend_ids_to_efile_ids,
+    )
+
+    filings = await get_all_filings(db_session, query, None, None)
+    lobbyist_filings = await get_all_lobbyist_filings(
+        db_session, query, None, None)
+
+    for filing in filings:
+        filing["description"] = (
+            FILING_TYPE_DESCRIPTION[filing["filing_type"]]
+            + "; " + filing["filing_subtype"])
+        filing["filing_type"] = FILING_TYPE_MAPPING[filing["filing_type"]]
+        if filing["doc_public"] is None:
+            filing["filing_type"] += "; Not electronically filed."
+        filing["filer"] = filing["last_name"] + ", " + filing["first_name"]
+
+    for lobbyist in lobbyist_filings:
+        lobbyist["description"] = FILING_TYPE_DESCRIPTION[lobbyist["filing_type"]]
+        lobbyist["filing_type"] = FILING_TYPE_MAPPING[lobbyist["filing_type"]]
+        if lobbyist["doc_public"] is None:
+            lobbyist["filing_type"] += "; Not electronically filed."
+
+    filings.extend(lobbyist_filings)
+    await convert_amend_ids_to_efile_ids(db_session, filings)
+    return filings
+
+
+async def single_query_search(db_session, query):
+    from app.api.utility.search import search_public_filings
+    page = await search_public_filings(db_session, query)
+    return page["data"]
+
+
+async def single_query_all_pages(db_session, query):
+    from app.core.config import SEARCH_PAGE_MAX
+    from app.api.utility.search import search_public_filings
+
+    filings, cursor = [], None
+    while True:
+        page = await search_public_filings(db_session, query,
+                                           limit=SEARCH_PAGE_MAX,
+                                           cursor=cursor)
+        filings.extend(page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return filings
+
+
+# the old search returned a row per historic name (and subtype), the
+# paged one a row per filing with the latest name. The old lookup also
+# picked the e-filing id of some later amendment for human_id.
+NAME_KEYS = ["filer", "first_name", "last_name", "filing_subtype",
+             "description"]
+
+
+def comparable(filings):
+    out = set()
+    for filing in filings:
+        filing = {k: v for k, v in filing.items() if k not in NAME_KEYS}
+        for key in ["amends_orig_id", "amends_prev_id"]:
+            if isinstance(filing[key], dict):
+                filing[key] = {k: v for k, v in filing[key].items()
+                               if k != "human_id"}
+        out.add(json.dumps(filing, sort_keys=True))
+    return sorted(out)
+
+
+async def measure(name, search, terms, iterations):
+    from app.db.session import AsyncReadSession
+    from app.db.instrumentation import start_request_stats, end_request_stats
+
+    latencies, statements = [], []
+    start = time.perf_counter()
+    for i in range(iterations):
+        for term in terms:
+            stats, token = start_request_stats()
+            try:
+                t = time.perf_counter()
+                async with AsyncReadSession(info={"db_stats": stats}) as db_session:
+                    await search(db_session, term)
+                latencies.append((time.perf_counter() - t) * 1000)
+                statements.append(stats.statements)
+            finally:
+                end_request_stats(token)
+    wall = time.perf_counter() - start
+
+    result = summarize(latencies, 0, wall)
+    result["statements_per_search"] = (
+        round(sum(statements) / len(statements), 2) if statements else None
+    )
+    print(f"* {name} done", file=sys.stderr)
+    return result
+
+
+async def run(args, fixture):
+    from app.db.session import AsyncReadSession
+
+    terms = fixture["search_terms"]
+
+    # same answers first
+    mismatches = []
+    async with AsyncReadSession() as db_session:
+        for term in terms:
+            old = comparable(await legacy_search(db_session, term))
+            new = comparable(await single_query_all_pages(db_session, term))
+            if old != new:
+                mismatches.append(term)
+
+    results = {
+        "legacy": await measure("legacy", legacy_search, terms,
+                                args.iterations),
+        "single_query": await measure("single_query", single_query_search,
+                                      terms, args.iterations),
+    }
+    results["mismatched_terms"] = mismatches
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_uri:
+        sys.exit("--database-uri (or BENCH_PG_URI) is required")
+    configure_env(args.database_uri)
+
+    with open(args.fixture, "r") as infile:
+        fixture = json.load(infile)
+
+    results = asyncio.run(run(args, fixture))
+
+    with open(args.output, "w") as outfile:
+        json.dump(results, outfile, indent=2, sort_keys=True)
+
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import json
+import random
+import uuid
+import datetime
+from sqlalchemy import text
+from app.core.security import get_password_hash
+from app.models.users import User
+from app.models.filers import Filer, FilerContactInfo, FilerFilerType
+from app.models.filings import Filing, FilingRaw, FilingSubtype
+from app.models.humane_ids import EFilingId
+from app.models.config import FilingConfig
+from app.models.crud.search import search_document_sql
+from app.models.crud.filings import backfill_filing_lineage_sql
+from app.models.entities import (
+    Entity,
+    LobbyingEntity,
+    LobbyingEntityContactInfo,
+    LobbyingEntityLobbyistType,
+    LobbyingEntityFiler,
+)
+
+
+# seeding for the benchmarks, deterministic by seed
+
+BENCH_EMAIL = "bench-filer@example.com"
+BENCH_PASSWORD = "bench-secret"
+
+FIRST_NAMES = ["Maria", "James", "Linda", "Robert", "Ana", "David", "Karen",
+               "Jose", "Susan", "Michael", "Nancy", "Daniel", "Lisa", "Carlos",
+               "Emily", "Kevin", "Sofia", "Brian", "Grace", "Luis"]
+LAST_NAMES = ["Garcia", "Smith", "Nguyen", "Johnson", "Martinez", "Brown",
+              "Lopez", "Davis", "Hernandez", "Miller", "Wilson", "Gonzalez",
+              "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez",
+              "Clark", "Ramirez", "Lewis", "Robinson", "Walker", "Young"]
+COMPANY_WORDS = ["Harbor", "Mesa", "Pacific", "Coronado", "Balboa", "Torrey",
+                 "Point", "Loma", "Mission", "Civic", "Coastal", "Sunset"]
+COMPANY_SUFFIXES = ["Group", "Partners", "Strategies", "Advocates",
+                    "Public Affairs", "Consulting"]
+
+# non lobbyist filings, these show up in the last name search
+FILER_FILING_TYPES = {
+    "fppc700": ["Annual", "Assuming Office", "Leaving Office"],
+    "fppc801": ["Original"],
+    "fppc802": ["Original"],
+    "fppc803": ["Original"],
+    "ec700": ["Mid-Year"],
+}
+
+START_YEAR = 2011
+YEARS = 10
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _date(rng, year):
+    return datetime.date(year, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+
+
+def _filing_rows(rng, *, filer_id, entity_id, filing_type, year,
+                 amendment_rate, max_amendment_depth, e_filing_ids):
+    # original filing plus, maybe, an amendment chain
+    rows = []
+    filing_date = _date(rng, year)
+    depth = 0
+    if rng.random() < amendment_rate:
+        depth = rng.randint(1, max_amendment_depth)
+
+    orig_id = None
+    prev_id = None
+    for number in range(depth + 1):
+        filing_id = _uuid(rng)
+        e_filing_id = str(next(e_filing_ids))
+        filing = Filing(
+            filing_id=filing_id,
+            e_filing_id=e_filing_id,
+            filer_id=filer_id,
+            entity_id=entity_id,
+            filing_type=filing_type,
+            form_name=filing_type,
+            status="filed",
+            doc_public=uuid.UUID(int=rng.getrandbits(128)).hex,
+            filing_date=datetime.datetime.combine(filing_date,
+                                                  datetime.time(12, 0)),
+            period_start=datetime.date(year, 1, 1),
+            period_end=datetime.date(year, 12, 31),
+            amendment=number > 0,
+            amends_orig_id=orig_id,
+            amends_prev_id=prev_id,
+            amendment_number=number if number > 0 else None,
+        )
+        rows.append((EFilingId(e_filing_id=e_filing_id, filing_id=filing_id),
+                     filing))
+        if orig_id is None:
+            orig_id = filing_id
+        prev_id = filing_id
+        filing_date = filing_date + datetime.timedelta(days=rng.randint(1, 60))
+
+    return rows
+
+
+def seed(db_session, *, seed=1, filers=1000, filings_per_filer=5,
+         lobbying_entities=100, amendment_rate=0.2, max_amendment_depth=4,
+         batch_size=500):
+    """Seed a benchmark dataset, returns the fixture the benchmarks use."""
+
+    rng = random.Random(seed)
+    e_filing_ids = iter(range(200000000, 2000000000))
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    last_year = START_YEAR + YEARS - 1
+
+    fixture = {
+        "seed": seed,
+        "email": BENCH_EMAIL,
+        "password": BENCH_PASSWORD,
+        "year": str(last_year),
+        "search_terms": [],
+        "doc_ids": [],
+    }
+
+    # fee config so the lobbyist fee / finalize flow works
+    for filing_type in ["ec601", "ec602"]:
+        db_session.add(FilingConfig(
+            filing_group="lobbyist",
+            filing_type=filing_type,
+            filing_year=str(last_year),
+            key="fees",
+            value=json.dumps({"fee_schedule": [{
+                "start": "1970-01-01",
+                "end": "2099-12-31",
+                "lobbyist": 45.0,
+                "client": 30.0,
+            }]}),
+            pytype="json",
+        ))
+    db_session.commit()
+
+    filer_ids = []
+    for start in range(0, filers, batch_size):
+        users, filer_rows, children, filings = [], [], [], []
+        for i in range(start, min(start + batch_size, filers)):
+            filer_id = _uuid(rng)
+            filer_ids.append(filer_id)
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+
+            user = None
+            if i == 0:
+                user = User(email=BENCH_EMAIL, account_type="filer",
+                            first_name=first_name, last_name=last_name,
+                            active=True, email_confirmed=True,
+                            password_hash=password_hash)
+                users.append(user)
+
+            filer_rows.append((user, Filer(filer_id=filer_id,
+                                           email=f"filer{i}@example.com",
+                                           active=True)))
+
+            # name history, some filers changed their last name
+            children.append(FilerContactInfo(
+                filer_id=filer_id, first_name=first_name, last_name=last_name,
+                effective_date=datetime.date(START_YEAR, 1, 1)))
+            if rng.random() < 0.1:
+                children.append(FilerContactInfo(
+                    filer_id=filer_id, first_name=first_name,
+                    last_name=rng.choice(LAST_NAMES),
+                    effective_date=_date(rng, rng.randrange(START_YEAR,
+                                                            last_year))))
+            children.append(FilerFilerType(filer_id=filer_id, filer_type="sei"))
+
+            for _ in range(filings_per_filer):
+                filing_type = rng.choice(list(FILER_FILING_TYPES.keys()))
+                year = rng.randrange(START_YEAR, last_year + 1)
+                chain = _filing_rows(
+                    rng, filer_id=filer_id, entity_id=None,
+                    filing_type=filing_type, year=year,
+                    amendment_rate=amendment_rate,
+                    max_amendment_depth=max_amendment_depth,
+                    e_filing_ids=e_filing_ids)
+                subtype = rng.choice(FILER_FILING_TYPES[filing_type])
+                for e_id, filing in chain:
+                    filings.append((e_id, filing, subtype))
+                if len(chain) > 1 and len(fixture["doc_ids"]) < 200:
+                    # latest amendment, walks the whole chain
+                    fixture["doc_ids"].append(chain[-1][1].doc_public)
+
+        _add_batch(db_session, users, filer_rows, children, filings)
+
+    # lobbying entities, legacy filings are found via netfile_filer_id
+    bench_entity_id = None
+    for i in range(lobbying_entities):
+        entity_id = _uuid(rng)
+        filer_id = filer_ids[i % len(filer_ids)]
+        name = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}"
+
+        db_session.add(Entity(entity_id=entity_id, entity_type="lobbying"))
+        db_session.add(LobbyingEntity(entity_id=entity_id,
+                                      netfile_filer_id=filer_id,
+                                      filer_email_confirmed=True,
+                                      active=True, reviewed=True))
+        db_session.flush()
+        db_session.add(LobbyingEntityContactInfo(
+            entity_id=entity_id, name=name, city="San Diego", state="CA",
+            effective_date=datetime.date(START_YEAR, 1, 1)))
+        db_session.add(LobbyingEntityLobbyistType(entity_id=entity_id,
+                                                  lobbyist_type="firm"))
+        if i == 0:
+            # the benchmark user files for the first entity
+            bench_entity_id = entity_id
+            db_session.add(LobbyingEntityFiler(entity_id=entity_id,
+                                               filer_id=filer_id))
+            db_session.add(FilerFilerType(filer_id=filer_id,
+                                          filer_type="lobbyist"))
+
+        filings = []
+        for year in range(START_YEAR, last_year + 1):
+            for filing_type in ["ec601", "ec603"]:
+                chain = _filing_rows(
+                    rng, filer_id=filer_id, entity_id=entity_id,
+                    filing_type=filing_type, year=year,
+                    amendment_rate=amendment_rate,
+                    max_amendment_depth=max_amendment_depth,
+                    e_filing_ids=e_filing_ids)
+                filings.extend((e_id, filing, None) for e_id, filing in chain)
+        _add_batch(db_session, [], [], [], filings)
+
+        if name.split()[0] not in fixture["search_terms"]:
+            fixture["search_terms"].append(name.split()[0])
+
+    fixture["lobbying_entity_id"] = bench_entity_id
+    fixture["search_terms"].extend(LAST_NAMES[:10])
+
+    # the seed goes around the crud helpers that maintain these
+    for object_type in ["filer", "lobbying_entity"]:
+        db_session.execute(text(search_document_sql(object_type, ids=False)))
+    for sql in backfill_filing_lineage_sql():
+        db_session.execute(text(sql))
+    db_session.execute(text("REFRESH MATERIALIZED VIEW public_filing_index"))
+    db_session.commit()
+
+    return fixture
+
+
+def _add_batch(db_session, users, filer_rows, children, filings):
+    # flush in dependency order, there are no relationships between
+    # most of these tables so the unit of work can't order them for us
+    db_session.add_all(users)
+    db_session.flush()
+    for user, filer in filer_rows:
+        if user is not None:
+            filer.user_id = user.id
+        db_session.add(filer)
+    db_session.flush()
+    db_session.add_all(children)
+    db_session.add_all([e_id for e_id, filing, subtype in filings])
+    db_session.flush()
+    db_session.add_all([filing for e_id, filing, subtype in filings])
+    db_session.flush()
+    for e_id, filing, subtype in filings:
+        if subtype is not None:
+            db_session.add(FilingSubtype(filing_id=filing.filing_id,
+                                         filing_subtype=subtype))
+        db_session.add(FilingRaw(filing_id=filing.filing_id, raw_json={}))
+    db_session.commit()
@@ -0,0 +1,29 @@
+import sys
+import pytest
+sys.path.append('./')
+from starlette.requests import Request
+
+
+@pytest.fixture
+def s3():
+    # storage in memory, buckets are created on first use
+    moto = pytest.importorskip("moto")
+    from app.utils import aws
+    from app.utils.aws import AwsS3
+
+    aws._known_buckets.clear()
+    with moto.mock_s3():
+        yield AwsS3(key_id="test", secret="test", region="us-west-1",
+                    endpoint_url=None, multipart_threshold=5 * 1024 * 1024)
+
+
+@pytest.fixture
+def make_request():
+    # a bare http request with headers, for handlers that only read those
+    def request(headers={}):
+        return Request({
+            "type": "http",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        })
+
+    return request
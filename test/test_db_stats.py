@@ -0,0 +1,53 @@
+import sys
+sys.path.append('./')
+from sqlalchemy.dialects.postgresql.asyncpg import AsyncAdapt_asyncpg_cursor
+from app.db.instrumentation import (
+    DbStats,
+    _before_cursor_execute,
+    _after_cursor_execute,
+)
+
+
+class FakeConnection:
+
+    def __init__(self, stats):
+        self.info = {"db_stats": stats}
+
+
+class FakeAdaptConnection:
+    _connection = None
+
+
+def asyncpg_cursor(rows, rowcount=-1):
+    # what the asyncpg adapter leaves on its cursor after execute
+    cursor = AsyncAdapt_asyncpg_cursor(FakeAdaptConnection())
+    cursor.description = [("filing_id", None, None, None, None, None, None)]
+    cursor._rows = list(rows)
+    cursor.rowcount = rowcount
+    return cursor
+
+
+def execute(stats, statement, cursor):
+    conn = FakeConnection(stats)
+    _before_cursor_execute(conn, cursor, statement, {}, None, False)
+    _after_cursor_execute(conn, cursor, statement, {}, None, False)
+
+
+def test_select_counts_rows_returned():
+    stats = DbStats()
+
+    execute(stats, "SELECT filing_id FROM filing WHERE filer_id = $1",
+            asyncpg_cursor([("a",), ("b",), ("c",)]))
+
+    assert(stats.statements == 1)
+    assert(stats.rows == 3)
+
+
+def test_update_counts_rows_changed():
+    stats = DbStats()
+    cursor = asyncpg_cursor([], rowcount=2)
+    cursor.description = None
+
+    execute(stats, "UPDATE filing SET status = $1 WHERE filer_id = $2", cursor)
+
+    assert(stats.rows == 2)
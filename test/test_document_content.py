@@ -0,0 +1,106 @@
+import sys
+import asyncio
+import pytest
+sys.path.append('./')
+from starlette.responses import StreamingResponse
+from app.utils.disk_cache import DiskLRUCache
+from app.api.utility.documents import (
+    parse_range,
+    RangeNotSatisfiable,
+    document_content_response,
+)
+
+DATA = bytes(range(256)) * 40
+
+
+async def body_of(response):
+    if isinstance(response, StreamingResponse):
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        return response.status_code, dict(response.headers), body
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await response({"type": "http"}, None, send)
+    headers = {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+    return (messages[0]["status"], headers,
+            b"".join(m.get("body", b"") for m in messages[1:]))
+
+
+@pytest.fixture
+def s3(s3):
+    s3.put_filedata("docs", "a.pdf", DATA)
+    return s3
+
+
+def test_parse_range():
+    assert(parse_range(None, 100) is None)
+    assert(parse_range("bytes=0-9", 100) == (0, 9))
+    assert(parse_range("bytes=90-", 100) == (90, 99))
+    assert(parse_range("bytes=-10", 100) == (90, 99))
+    assert(parse_range("bytes=50-500", 100) == (50, 99))
+    # several ranges, or nonsense: the whole document
+    assert(parse_range("bytes=0-1,5-6", 100) is None)
+    assert(parse_range("bytes=9-0", 100) is None)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+
+
+def test_miss_streams_and_fills_cache(s3, make_request, tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1 << 20, max_item_bytes=1 << 20)
+
+    async def go():
+        res = await document_content_response(make_request(), "docs", "a.pdf", cache, s3)
+        status, headers, body = await body_of(res)
+        assert(status == 200 and body == DATA)
+        assert(headers["content-length"] == str(len(DATA)))
+
+        res = await document_content_response(
+            make_request({"Range": "bytes=10-19"}), "docs", "a.pdf", cache, s3)
+        status, headers, body = await body_of(res)
+        assert(status == 206 and body == DATA[10:20])
+        assert(headers["content-range"] == f"bytes 10-19/{len(DATA)}")
+
+        res = await document_content_response(
+            make_request({"Range": f"bytes={len(DATA)}-"}), "docs", "a.pdf", cache, s3)
+        assert(res.status_code == 416)
+
+    asyncio.run(go())
+    assert(cache.stats()["fills"] == 1)
+    assert(cache.stats()["hits"] == 2)
+
+
+def test_range_miss_fills_in_background(s3, make_request, tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=1 << 20, max_item_bytes=1 << 20)
+
+    async def go():
+        res = await document_content_response(
+            make_request({"Range": "bytes=-5"}), "docs", "a.pdf", cache, s3)
+        status, headers, body = await body_of(res)
+        assert(status == 206 and body == DATA[-5:])
+        for i in range(100):
+            if cache.stats()["fills"]:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(go())
+    fd, size = cache.open("docs/a.pdf")
+    assert(size == len(DATA))
+
+
+def test_lru_eviction(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=25, max_item_bytes=10)
+    for key in "abc":
+        writer = cache.writer(key, 10)
+        writer.write(b"x" * 10)
+        assert(writer.commit())
+    assert(cache.stats()["evictions"] == 1)
+    assert(cache.open("a") is None)
+    assert(cache.writer("d", 11) is None)
+
+    # a new worker finds what is on disk
+    reloaded = DiskLRUCache(str(tmp_path), max_bytes=25)
+    assert(reloaded.open("c") is not None)
+    assert(reloaded.stats()["entries"] == 2)
@@ -0,0 +1,41 @@
+import sys
+import json
+sys.path.append('./')
+from app.api.utility.documents import PresignedUrlCache, document_url_response
+
+
+class Signer:
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, bucket, key, expires_in):
+        self.calls += 1
+        return f"https://{bucket}/{key}?sig={self.calls}"
+
+
+def test_url_reused_until_margin():
+    sign = Signer()
+    urls = PresignedUrlCache(ttl=100, margin=10, sign=sign)
+
+    url, expires = urls.get("b", "k", now=0)
+    assert(expires == 100)
+    assert(urls.get("b", "k", now=89) == (url, expires))
+    assert(sign.calls == 1)
+
+    # too close to expiry to hand out again
+    url2, expires2 = urls.get("b", "k", now=90)
+    assert(url2 != url and expires2 == 190)
+    assert(sign.calls == 2)
+
+
+def test_etag_revalidation(make_request):
+    content = {"success": "true", "data": {"url": "u", "expires": 0}}
+    res = document_url_response(make_request(), content, None)
+    assert(res.status_code == 200)
+    assert(json.loads(res.body) == content)
+    assert(res.headers["cache-control"] == "public, max-age=0")
+
+    res = document_url_response(make_request({"If-None-Match": res.headers["etag"]}),
+                                 content, None)
+    assert(res.status_code == 304)
@@ -0,0 +1,102 @@
+import sys
+import hashlib
+from contextlib import contextmanager
+sys.path.append('./')
+from app.scripts.import_netfile import (
+    file_digest,
+    sniff_mime,
+    content_key,
+    read_manifest,
+    walk_directory,
+    Checkpoint,
+    NetfileImporter,
+)
+
+PDF = b"%PDF-1.4 legacy filing"
+
+
+def write(path, data=PDF):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_content_addressed_key(tmp_path):
+    path = write(tmp_path / "a.pdf")
+    sha, size = file_digest(path, chunk_size=4)
+    assert(sha == hashlib.sha256(PDF).hexdigest() and size == len(PDF))
+    assert(sniff_mime(path) == "application/pdf")
+    assert(content_key(sha, "application/pdf") == f"netfile/{sha}.pdf")
+
+
+def test_sources(tmp_path):
+    write(tmp_path / "pdfs" / "2019" / "DOC1.pdf")
+    write(tmp_path / "pdfs" / "notes.txt", b"x")
+    assert([i["doc_id"] for i in walk_directory(str(tmp_path / "pdfs"))] == ["DOC1"])
+
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("path,filing_id,netfile_filer_id\n"
+                        "pdfs/2019/DOC1.pdf,,123\n")
+    item, = read_manifest(str(manifest))
+    assert(item["path"] == str(tmp_path / "pdfs" / "2019" / "DOC1.pdf"))
+    assert(item["netfile_filer_id"] == "123" and item["filing_id"] is None)
+
+
+def test_checkpoint_resumes(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    Checkpoint(path).record([{"path": "a.pdf", "sha256": "x", "doc_id": "a"}])
+    with open(path, "a") as f:
+        f.write('{"path": "b.p')
+    assert(Checkpoint(path).done == {"a.pdf"})
+
+
+def test_checkpoint_keeps_filings_until_published(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    checkpoint = Checkpoint(path)
+    checkpoint.record([{"path": "a.pdf", "sha256": "x", "doc_id": "a", "filing_id": "f1"},
+                       {"path": "b.pdf", "sha256": "y", "doc_id": "b", "filing_id": None}])
+    # stopped before publishing
+    assert(Checkpoint(path).unpublished == {"f1"})
+
+    Checkpoint(path).record_published()
+    resumed = Checkpoint(path)
+    assert(resumed.done == {"a.pdf", "b.pdf"} and resumed.unpublished == set())
+
+
+def test_identical_files_upload_once(s3, tmp_path):
+    importer = NetfileImporter(None, s3, bucket="netfile")
+    items = [importer.describe({"path": write(tmp_path / name)})
+             for name in ["a.pdf", "b.pdf"]]
+    key = items[0]["s3key"]
+    assert(importer.upload(items, {key}) == 1)
+    assert(s3.read_filedata("netfile", key) == PDF)
+    assert(key in importer.stored)
+
+
+class RecordingEngine:
+
+    def __init__(self):
+        self.statements = []
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+
+def test_linked_filings_refresh_the_public_index(tmp_path):
+    engine = RecordingEngine()
+    path = str(tmp_path / "run.checkpoint")
+
+    NetfileImporter(engine, None).run([], Checkpoint(path), 10)
+    assert(engine.statements == [])
+
+    # the last batch was checkpointed, the run stopped before publishing
+    Checkpoint(path).record([{"path": "a.pdf", "sha256": "x", "doc_id": "a",
+                              "filing_id": "7d5ad3e4-3c8b-4f5e-9d6f-0a4a3c1b2e10"}])
+    NetfileImporter(engine, None).run([], Checkpoint(path), 10)
+    assert(any("REFRESH MATERIALIZED VIEW CONCURRENTLY public_filing_index" in s
+               for s in engine.statements))
+    assert(Checkpoint(path).unpublished == set())
@@ -0,0 +1,22 @@
+import os
+import sys
+sys.path.append('./')
+from app.scripts.import_time import measure_import, HEAVY_MODULES
+
+
+# seconds, generous so slow CI machines don't flake
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", 3.0))
+
+
+def test_import_app_main_within_budget():
+
+    total, modules = measure_import("app.main")
+
+    assert(total < IMPORT_TIME_BUDGET)
+
+
+def test_heavy_modules_are_lazy():
+
+    total, modules = measure_import("app.main")
+
+    assert([m for m in HEAVY_MODULES if m in modules] == [])
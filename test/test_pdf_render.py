@@ -0,0 +1,43 @@
+import sys
+import json
+import pytest
+sys.path.append('./')
+
+pytest.importorskip("reportlab")
+from app.utils.pdf_render import render_filing_pdf, cell_text, directory_names
+from app.utils.pdf_templates import latest_template_version
+
+HEADER = {"title": "EC-601 Lobbying Firm Registration Statement",
+          "e_filing_id": "123456"}
+
+
+def form():
+    with open("test/data/ec601-mock-data.json") as f:
+        return json.load(f)
+
+
+def test_render_is_deterministic():
+    version = latest_template_version("ec601")
+    pdf = render_filing_pdf("ec601", version, HEADER, form())
+    assert(pdf.startswith(b"%PDF"))
+    assert(pdf == render_filing_pdf("ec601", version, HEADER, form()))
+
+
+def test_public_copy_leaves_out_private_fields():
+    version = latest_template_version("ec601")
+    with_phone = form()
+    with_phone["filer"]["phone"] = "619-555-0100"
+
+    public = render_filing_pdf("ec601", version, HEADER, with_phone, public=True)
+    private = render_filing_pdf("ec601", version, HEADER, with_phone, public=False)
+    assert(public == render_filing_pdf("ec601", version, HEADER, form()))
+    assert(private != public)
+
+
+def test_directory_ids_are_named():
+    f = form()
+    names = directory_names(f)
+    lobbyist = f["schedule_a"][0]["lobbyist_entity_id"]
+    assert(cell_text(lobbyist, names) == "Michael Scott")
+    assert(cell_text([True, None], names) == "Yes, ")
+    assert(latest_template_version("ec699") is None)
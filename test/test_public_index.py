@@ -0,0 +1,106 @@
+import sys
+import asyncio
+sys.path.append('./')
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app.utils import public_index
+from app.utils.cache import LocalCache
+from app.utils.public_index import SEARCH_TAG, PublicIndexRefresher
+from app.api.utility.search import search_cache_tags
+
+
+class FakeSession:
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def commit(self):
+        pass
+
+
+class Refresh:
+
+    def __init__(self, results=()):
+        self.calls = 0
+        self.results = list(results)
+
+    async def __call__(self, db_session):
+        self.calls += 1
+        return self.results.pop(0) if self.results else True
+
+
+def refresher(refresh, cache):
+    return PublicIndexRefresher(delay=0.01, session_factory=FakeSession,
+                                refresh=refresh, cache=cache)
+
+
+def test_burst_shares_one_refresh():
+    cache = LocalCache()
+    refresh = Refresh()
+
+    async def go():
+        await cache.set("k", 1, ["filer:1"])
+        r = refresher(refresh, cache)
+        for i in range(10):
+            r.request(["filer:1"])
+        await r.task
+        assert(await cache.get("k") is None)
+
+    asyncio.run(go())
+    assert(refresh.calls == 1)
+
+
+def test_busy_refresh_is_retried():
+    cache = LocalCache()
+    # another worker holds the refresh lock the first time
+    refresh = Refresh([False, True])
+
+    async def go():
+        await cache.set("k", 1, ["filer:1"])
+        r = refresher(refresh, cache)
+        r.request(["filer:1"])
+        await r.task
+        assert(await cache.get("k") is None)
+        assert(r.task is None)
+
+    asyncio.run(go())
+    assert(refresh.calls == 2)
+
+
+def test_search_document_changes_invalidate_searches_on_commit(monkeypatch):
+    invalidated = []
+    requested = []
+
+    async def invalidate(tags, cache=None):
+        invalidated.append(tags)
+
+    monkeypatch.setattr(public_index, "invalidate", invalidate)
+    monkeypatch.setattr(public_index, "public_index_refresher",
+                        type("R", (), {"request": lambda self, tags: requested.append(tags)})())
+
+    async def go():
+        with Session(create_engine("sqlite://")) as session:
+            session.execute(text("SELECT 1"))
+            session.info["search_documents_changed"] = True
+            session.rollback()
+            session.execute(text("SELECT 1"))
+            session.commit()
+            await asyncio.sleep(0)
+            assert(invalidated == [])
+
+            session.execute(text("SELECT 1"))
+            session.info["search_documents_changed"] = True
+            session.commit()
+            await asyncio.sleep(0)
+
+    asyncio.run(go())
+    # searches only, the view isn't refreshed
+    assert(invalidated == [[SEARCH_TAG]])
+    assert(requested == [])
+
+
+def test_empty_search_pages_carry_the_search_tag():
+    assert(search_cache_tags([]) == [SEARCH_TAG])
@@ -0,0 +1,98 @@
+import sys
+import asyncio
+sys.path.append('./')
+from app.utils.cache import LocalCache, cache_key, cached, invalidate
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def compute_counter(value):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return value
+
+    return compute, calls
+
+
+def test_hit_skips_compute():
+    cache = LocalCache()
+    compute, calls = compute_counter({"data": [1]})
+
+    async def go():
+        for _ in range(3):
+            value = await cached("k", compute, lambda v: ["filer:1"], cache)
+            assert(value == {"data": [1]})
+
+    run(go())
+    assert(len(calls) == 1)
+
+
+def test_tag_invalidation():
+    cache = LocalCache()
+    compute, calls = compute_counter({"data": [1]})
+
+    async def go():
+        await cached("a", compute, lambda v: ["filer:1"], cache)
+        await cached("b", compute, lambda v: ["filer:2"], cache)
+        await invalidate(["filer:1"], cache)
+        await cached("a", compute, lambda v: ["filer:1"], cache)
+        await cached("b", compute, lambda v: ["filer:2"], cache)
+
+    run(go())
+    # only the entry tagged filer:1 was computed again
+    assert(len(calls) == 3)
+
+
+def test_untagged_value_not_stored():
+    cache = LocalCache()
+    compute, calls = compute_counter({"data": []})
+
+    async def go():
+        await cached("k", compute, lambda v: None, cache)
+        await cached("k", compute, lambda v: None, cache)
+
+    run(go())
+    assert(len(calls) == 2)
+
+
+def test_invalidation_during_compute_not_stored():
+    cache = LocalCache()
+
+    async def stale():
+        # a write commits while the read is still running
+        await cache.invalidate(["filer:1"])
+        return {"data": ["old"]}
+
+    async def go():
+        await cached("k", stale, lambda v: ["filer:1"], cache)
+        assert(await cache.get("k") is None)
+
+    run(go())
+
+
+def test_lru_and_ttl():
+    cache = LocalCache(max_entries=2)
+
+    async def go():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        assert(await cache.get("b") is None)
+        assert(await cache.get("a") == 1)
+
+        cache.ttl = -1
+        await cache.set("d", 4)
+        assert(await cache.get("d") is None)
+
+    run(go())
+
+
+def test_cache_key_is_stable():
+    assert(cache_key("search", "a:*", None, "-filing_date")
+           == cache_key("search", "a:*", None, "-filing_date"))
+    assert(cache_key("search", "a:*") != cache_key("search", "b:*"))
@@ -0,0 +1,38 @@
+import sys
+import asyncio
+sys.path.append('./')
+
+
+def test_put_creates_bucket_once(s3):
+    calls = []
+    s3.client.meta.events.register(
+        "before-call.s3.*", lambda model, **kw: calls.append(model.name))
+
+    s3.put_filedata("bucket", "a", b"one", filename="a.pdf")
+    s3.put_filedata("bucket", "b", "two")
+
+    assert(calls == ["HeadBucket", "CreateBucket", "PutObject", "PutObject"])
+    assert(s3.read_filedata("bucket", "a") == b"one")
+    assert(s3.get_filedata("bucket", "a")["Metadata"] == {"filename": "a.pdf"})
+
+
+def test_large_upload_is_multipart(s3):
+    data = b"x" * (11 * 1024 * 1024)
+    res = s3.put_filedata("bucket", "big.pdf", data)
+    assert(res["multipart"])
+    assert(s3.read_filedata("bucket", "big.pdf") == data)
+
+
+def test_batch(s3):
+    items = [{"bucket": "bucket", "key": f"k{i}", "filedata": bytes([i])}
+             for i in range(20)]
+    s3.put_many(items)
+    assert(s3.get_many([("bucket", f"k{i}") for i in range(20)])
+           == [bytes([i]) for i in range(20)])
+
+    async def go():
+        await s3.async_put_many([dict(item, filedata=b"!" + item["filedata"])
+                                 for item in items])
+        return await s3.async_get_many([("bucket", f"k{i}") for i in range(20)])
+
+    assert(asyncio.run(go()) == [b"!" + bytes([i]) for i in range(20)])
@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import asyncio
+sys.path.append('./')
+from app.utils.auth_saml import SamlClientCache
+
+
+METADATA = "file://" + os.path.abspath("test/data/idp-metadata.xml")
+
+
+class CountingCache(SamlClientCache):
+
+    def __init__(self, url=METADATA, **kwargs):
+        super().__init__(
+            settings=lambda kind: (url, "http://sp/acs", "http://sp/metadata"),
+            **kwargs
+        )
+        self.loads = 0
+
+    async def load(self, kind):
+        self.loads += 1
+        return await super().load(kind)
+
+
+def age(cache, kind, seconds):
+    client, loaded = cache.entries[kind]
+    cache.entries[kind] = (client, loaded - seconds)
+
+
+def test_cached_client_is_reused():
+
+    async def run():
+        cache = CountingCache(ttl=60, max_stale=600)
+        first = await cache.get("admin")
+        second = await cache.get("admin")
+        return cache, first, second
+
+    cache, first, second = asyncio.run(run())
+
+    assert(first is second)
+    assert(cache.loads == 1)
+
+
+def test_concurrent_cold_start_loads_once():
+
+    async def run():
+        cache = CountingCache(ttl=60, max_stale=600)
+        clients = await asyncio.gather(*(cache.get("admin") for i in range(10)))
+        return cache, clients
+
+    cache, clients = asyncio.run(run())
+
+    assert(cache.loads == 1)
+    assert(all(c is clients[0] for c in clients))
+
+
+def test_stale_client_served_while_refreshing():
+
+    async def run():
+        cache = CountingCache(ttl=60, max_stale=600)
+        first = await cache.get("admin")
+        age(cache, "admin", 120)
+        stale = await cache.get("admin")
+        await asyncio.gather(*cache.refreshing.values())
+        fresh = await cache.get("admin")
+        return cache, first, stale, fresh
+
+    cache, first, stale, fresh = asyncio.run(run())
+
+    assert(stale is first)
+    assert(fresh is not first)
+    assert(cache.loads == 2)
+
+
+def test_failed_refresh_keeps_stale_client():
+
+    async def run():
+        cache = CountingCache(ttl=60, max_stale=600)
+        first = await cache.get("admin")
+
+        # metadata gone, past max stale so the caller waits for the refresh
+        cache.settings = lambda kind: ("file:///nonexistent/metadata.xml",
+                                       "http://sp/acs", "http://sp/metadata")
+        age(cache, "admin", 1000)
+        stale = await cache.get("admin")
+        return first, stale
+
+    first, stale = asyncio.run(run())
+
+    assert(stale is first)
+
+
+def test_warm_up_skips_unconfigured_kinds():
+
+    async def run():
+        cache = CountingCache(url=None)
+        await cache.warm_up()
+        return cache
+
+    cache = asyncio.run(run())
+
+    assert(cache.loads == 0)
+    assert(cache.entries == {})
+
+
+class FlakyCache(SamlClientCache):
+    # no IdP: load fails, or returns a placeholder client, after a delay
+
+    def __init__(self, fail=True, delay=0.05, **kwargs):
+        super().__init__(
+            settings=lambda kind: ("http://idp/metadata", "http://sp/acs",
+                                   "http://sp/metadata"),
+            **kwargs
+        )
+        self.fail = fail
+        self.delay = delay
+        self.loads = 0
+
+    async def load(self, kind):
+        self.loads += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("IdP unreachable")
+        client = object()
+        self.entries[kind] = (client, time.monotonic())
+        return client
+
+
+def test_concurrent_callers_share_a_failed_fetch():
+
+    async def run():
+        cache = FlakyCache(retry_after=30)
+        results = await asyncio.gather(*(cache.get("admin") for i in range(10)),
+                                       return_exceptions=True)
+        return cache, results
+
+    cache, results = asyncio.run(run())
+
+    assert(cache.loads == 1)
+    assert(all(isinstance(r, ConnectionError) for r in results))
+
+
+def test_failed_fetch_is_not_retried_until_retry_after():
+
+    async def run():
+        cache = FlakyCache(retry_after=30)
+        for i in range(3):
+            try:
+                await cache.get("admin")
+            except ConnectionError:
+                pass
+        backed_off = cache.loads
+
+        cache.fail = False
+        cache.failures["admin"] = (cache.failures["admin"][0],
+                                   time.monotonic() - 31)
+        client = await cache.get("admin")
+        return cache, backed_off, client
+
+    cache, backed_off, client = asyncio.run(run())
+
+    assert(backed_off == 1)
+    assert(cache.loads == 2)
+    assert(client is not None)
+
+
+def test_warm_up_fetches_kinds_at_once():
+
+    async def run():
+        cache = FlakyCache(fail=False, delay=0.2)
+        start = time.monotonic()
+        await cache.warm_up()
+        return cache, time.monotonic() - start
+
+    cache, elapsed = asyncio.run(run())
+
+    assert(cache.loads == 2)
+    assert(set(cache.entries) == {"admin", "filer"})
+    assert(elapsed < 0.35)
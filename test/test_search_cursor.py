@@ -0,0 +1,33 @@
+import sys
+import json
+import base64
+import datetime
+import pytest
+sys.path.append('./')
+from types import SimpleNamespace
+from fastapi import HTTPException
+from app.api.utility.search import encode_search_cursor, decode_search_cursor
+
+
+def cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def test_cursor_round_trip():
+    row = SimpleNamespace(sort_date=datetime.datetime(2021, 3, 1, 12),
+                          filing_id="7d5ad3e4-3c8b-4f5e-9d6f-0a4a3c1b2e10")
+    after = decode_search_cursor("-filing_date",
+                                 encode_search_cursor("-filing_date", row))
+    assert(after == (row.sort_date, row.filing_id))
+
+
+@pytest.mark.parametrize("value", [
+    "not base64 json",
+    cursor(["-filing_date", "2021-03-01T12:00:00", "1; DROP TABLE filing"]),
+    cursor(["-filing_date", "2021-03-01T12:00:00", 42]),
+    cursor(["-filing_date", "yesterday", "7d5ad3e4-3c8b-4f5e-9d6f-0a4a3c1b2e10"]),
+])
+def test_tampered_cursor_is_a_bad_request(value):
+    with pytest.raises(HTTPException) as e:
+        decode_search_cursor("-filing_date", value)
+    assert(e.value.status_code == 400)
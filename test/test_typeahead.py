@@ -0,0 +1,83 @@
+import sys
+import time
+from collections import namedtuple
+sys.path.append('./')
+from app.utils.typeahead import TypeaheadIndex, typeahead_entry, normalize
+
+
+Row = namedtuple("Row", ["object_id", "filer_id", "hr_id", "updated",
+                         "first_name", "last_name", "name", "names"])
+
+
+def filer(object_id, first_name, last_name, hr_id=None, names=None):
+    names = names or [f"{last_name} {first_name}", f"{first_name} {last_name}"]
+    return Row(object_id, object_id, hr_id, None, first_name, last_name,
+               None, names)
+
+
+def entity(object_id, name, hr_id=None):
+    return Row(object_id, None, hr_id, None, None, None, name, [name])
+
+
+def index_of(*entries):
+    index = TypeaheadIndex()
+    index.replace([
+        (object_type, row.object_id) + typeahead_entry(object_type, row)
+        for object_type, row in entries
+    ])
+    return index
+
+
+def ids(results):
+    return [r.get("filer_id") or r.get("entity_id") for r in results]
+
+
+def test_normalize():
+    assert(normalize("  Smith,  John ") == "smith john")
+    assert(normalize(None) == "")
+
+
+def test_prefix_on_names_and_ids():
+    index = index_of(
+        ("filer", filer("f1", "John", "Smith", "FIL-30001")),
+        ("filer", filer("f2", "Jane", "Smithers")),
+        ("lobbying_entity", entity("e1", "The Acme Group", "LOB-30002")),
+    )
+
+    assert(sorted(ids(index.search("smi"))) == ["f1", "f2"])
+    assert(ids(index.search("smith, jo")) == ["f1"])
+    assert(ids(index.search("john s")) == ["f1"])
+    assert(ids(index.search("acme")) == ["e1"])
+    assert(ids(index.search("30002")) == ["e1"])
+    assert(ids(index.search("fil-3")) == ["f1"])
+    assert(index.search("zzz") == [])
+
+
+def test_limit_and_one_result_per_object():
+    index = index_of(*[
+        ("filer", filer(f"f{i}", "Ann", "Lee")) for i in range(20)
+    ])
+    results = index.search("lee", 5)
+    assert(len(results) == 5)
+    assert(len(set(ids(results))) == 5)
+
+
+def test_upsert_replaces_terms():
+    index = index_of(("filer", filer("f1", "John", "Smith")))
+    row = filer("f1", "John", "Jones")
+    index.upsert("filer", "f1", *typeahead_entry("filer", row))
+
+    assert(index.search("smith") == [])
+    assert(index.search("jones")[0]["last_name"] == "Jones")
+    assert(len(index.keys) == 2)
+
+
+def test_search_speed():
+    index = index_of(*[
+        ("filer", filer(f"f{i}", f"first{i}", f"last{i}", f"FIL-{i}"))
+        for i in range(100000)
+    ])
+    start = time.perf_counter()
+    for i in range(1000):
+        index.search(f"last{i}", 10)
+    assert((time.perf_counter() - start) / 1000 < 0.005)
@@ -0,0 +1,125 @@
+import sys
+import asyncio
+import hashlib
+import pytest
+sys.path.append('./')
+from fastapi import HTTPException
+from app.api.utility.uploads import receive_upload
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 100
+
+
+async def chunked(data, size=64 * 1024):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def multipart_body(data, content_type="application/pdf", boundary="xyz"):
+    return (f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="note"\r\n\r\n'
+            f"hello\r\n--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="report.pdf"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n").encode() \
+        + data + f"\r\n--{boundary}--\r\n".encode()
+
+
+def upload(s3, body, content_type, key="k", **kwargs):
+    writers = []
+
+    def open_writer(mime_type):
+        writers.append(s3.open_multipart("uploads", key, mime_type))
+        return writers[-1]
+
+    async def go():
+        return await receive_upload(chunked(body), content_type, str(len(body)),
+                                    open_writer, **kwargs)
+
+    return asyncio.run(go()), writers
+
+
+def test_raw_body(s3):
+    (sink, filename), _ = upload(s3, PDF, "application/pdf", filename="a.pdf")
+    assert(filename == "a.pdf" and sink.size == len(PDF))
+    assert(sink.sha256.hexdigest() == hashlib.sha256(PDF).hexdigest())
+    assert(s3.read_filedata("uploads", "k") == PDF)
+
+
+def test_multipart_body_streams_in_parts(s3):
+    data = PDF + b"x" * (11 * 1024 * 1024)
+    (sink, filename), (writer,) = upload(
+        s3, multipart_body(data), "multipart/form-data; boundary=xyz")
+    assert(filename == "report.pdf" and sink.size == len(data))
+    assert(len(writer.parts) == 3)
+    assert(s3.read_filedata("uploads", "k") == data)
+
+
+def test_refused_early(s3):
+    with pytest.raises(HTTPException) as e:
+        upload(s3, PDF, "text/html")
+    assert(e.value.status_code == 415)
+
+    # declared a pdf, isn't one
+    with pytest.raises(HTTPException) as e:
+        upload(s3, multipart_body(b"<html>" * 10), "multipart/form-data; boundary=xyz")
+    assert(e.value.status_code == 415)
+
+    with pytest.raises(HTTPException) as e:
+        upload(s3, PDF, "application/pdf", max_bytes=100)
+    assert(e.value.status_code == 413)
+
+
+def test_too_large_while_streaming_is_aborted(s3):
+    data = PDF + b"x" * (6 * 1024 * 1024)
+
+    async def go():
+        writers = []
+
+        def open_writer(mime_type):
+            writers.append(s3.open_multipart("uploads", "big", mime_type))
+            return writers[-1]
+
+        # no Content-Length, the size is only found out on the way
+        with pytest.raises(HTTPException) as e:
+            await receive_upload(chunked(data), "application/pdf", None,
+                                 open_writer, max_bytes=5 * 1024 * 1024 + 10)
+        assert(e.value.status_code == 413)
+        assert(writers[0].upload_id is None)
+
+    asyncio.run(go())
+    assert(s3.client.list_objects_v2(Bucket="uploads").get("KeyCount") == 0)
+
+
+def test_body_after_the_file_is_not_read(s3):
+    read = []
+
+    async def endless():
+        # no Content-Length, the body goes on after the file
+        async for chunk in chunked(multipart_body(PDF)):
+            read.append(chunk)
+            yield chunk
+        while True:
+            read.append(b"x")
+            yield b"x" * 64 * 1024
+
+    async def go():
+        return await receive_upload(endless(), "multipart/form-data; boundary=xyz",
+                                    None, lambda m: s3.open_multipart("uploads", "k", m))
+
+    sink, filename = asyncio.run(go())
+    assert(sink.size == len(PDF))
+    assert(b"x" not in read)
+
+
+def test_multipart_body_is_bounded_before_the_file(s3):
+    padding = ("--xyz\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\n"
+               + "a" * 200 * 1024 + "\r\n").encode()
+    body = padding + multipart_body(PDF)
+
+    async def go():
+        return await receive_upload(chunked(body), "multipart/form-data; boundary=xyz",
+                                    None, lambda m: s3.open_multipart("uploads", "k", m),
+                                    max_bytes=len(PDF))
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(go())
+    assert(e.value.status_code == 413)